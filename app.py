@@ -1,221 +1,270 @@
+import os
+import tempfile
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-import feedparser
-import requests
+import numpy as np
+import altair as alt
 from datetime import datetime
+import ohlcv_store
+import news
+import scheduler
+import seasonality
+import simulation
+import rebalance
+import backtest
+import radar_sweep
+import breaker
+import snapshot
+import engine
+import metrics
+from engine import PORTFOLIOS, REGIMES, SECTORS, TERMINAL_TICKERS, ALL_P_TICKERS, LAB_HISTORY_START, LAB_HORIZONS, SCAN_UNIVERSES
 
 # PAGE CONFIG
 st.set_page_config(page_title="Multi-Asset Terminal", layout="wide")
-
-# --- PORTFOLIO DEFINITIONS (Updated with Historical, Regime & Yield Data) ---
-PORTFOLIOS = {
-    "All-Weather (Dalio)": {
-        "weights": {"VTI": 0.30, "TLT": 0.40, "IEF": 0.15, "GLD": 0.075, "DBC": 0.075},
-        "hist_ret": "6.0%", "stag_pot": "High", "est_yield": 2.1
-    },
-    "60/40 Portfolio": {
-        "weights": {"VTI": 0.60, "BND": 0.40},
-        "hist_ret": "8.4%", "stag_pot": "Low", "est_yield": 2.8
-    },
-    "Fugger Portfolio": {
-        "weights": {"VTI": 0.25, "VNQ": 0.25, "BND": 0.25, "GLD": 0.25},
-        "hist_ret": "6.1%", "stag_pot": "High", "est_yield": 2.4
-    },
-    "Permanent Portfolio": {
-        "weights": {"VTI": 0.25, "TLT": 0.25, "BIL": 0.25, "GLD": 0.25},
-        "hist_ret": "5.9%", "stag_pot": "High", "est_yield": 2.2
-    },
-    "Golden Butterfly": {
-        "weights": {"VTI": 0.20, "IJS": 0.20, "TLT": 0.20, "SHV": 0.20, "GLD": 0.20},
-        "hist_ret": "7.2%", "stag_pot": "High", "est_yield": 2.3
-    },
-    "Three-Fund": {
-        "weights": {"VTI": 0.34, "VXUS": 0.33, "BND": 0.33},
-        "hist_ret": "8.9%", "stag_pot": "Low", "est_yield": 2.6
-    },
-    "Coffeehouse": {
-        "weights": {"VOO": 0.10, "IJS": 0.10, "IJV": 0.10, "VEA": 0.10, "VNQ": 0.10, "VIG": 0.10, "AGG": 0.40},
-        "hist_ret": "8.2%", "stag_pot": "Low-Mod", "est_yield": 2.9
-    },
-    "Ivy League (Swensen)": {
-        "weights": {"VTI": 0.30, "VEA": 0.15, "VWO": 0.05, "VNQ": 0.20, "IEF": 0.15, "TIP": 0.15},
-        "hist_ret": "7.5%", "stag_pot": "Moderate", "est_yield": 3.1
-    },
-    "Warren Buffett": {
-        "weights": {"VOO": 0.90, "BIL": 0.10},
-        "hist_ret": "11.2%", "stag_pot": "Low", "est_yield": 1.7
-    },
-    "Global Asset Allocation": {
-        "weights": {"VTI": 0.18, "VEA": 0.135, "VWO": 0.045, "LQD": 0.18, "TLT": 0.18, "GLD": 0.10, "DBC": 0.10, "VNQ": 0.08},
-        "hist_ret": "7.8%", "stag_pot": "Moderate", "est_yield": 2.5
-    }
-}
+this_run = metrics.start_run()  # the diagnostics panel reports what this session's rerun recorded
+
+# --- DATA MINING FUNCTIONS (shared by the tabs, the cache warmer and the refresh controls) ---
+# The computations live in engine.py so the CLI and batch jobs run the same logic; these are the cached entry points.
+
+# Failures raise inside the cached loaders: st.cache_data never stores an exception, so an empty result is not
+# served as real data for a whole TTL. The failed symbols themselves are negative-cached in the OHLCV store.
+def uncached_failure(name, default, load, *args):
+    try: return load(*args)
+    except Exception as e:
+        metrics.swallowed(name, e)
+        return default
+
+# Terminal state: one bulk download covering the longest window any indicator needs (200D SMA); prices, SMAs,
+# RSIs, the live-mode anchors and the sector leaderboard are all derived from that one in-memory frame.
+def compute_terminal_state():
+    close = engine.terminal_history()
+    if close.empty: raise engine.DataUnavailable("No terminal history")
+    return {"q": engine.terminal_quotes(close), "anchors": engine.live_anchors(close), "leaderboard": engine.sector_leaderboard(close)}
+
+# Served from the latest snapshot (memory, else disk) and recomputed behind it once stale, so a cold start never waits
+@st.cache_resource
+def get_terminal_snapshot():
+    return snapshot.TerminalState(compute_terminal_state)
+
+def get_terminal_state():
+    try: return get_terminal_snapshot().get()
+    except Exception as e:  # first-ever start and the compute failed: render the empty terminal
+        metrics.swallowed("get_terminal_state", e)
+        return {"q": engine.terminal_quotes(pd.DataFrame()), "anchors": {}, "leaderboard": engine.EMPTY_LEADERBOARD, "as_of": None}, None
+
+# Live mode: one light intraday request for the last prices of the overlay's tickers per tick.
+# The short TTL lets the overlay and crypto fragments share that request when they tick together.
+LIVE_INTERVALS = [15, 30, 60, 120, 300]
+
+@metrics.cached(st.cache_data(ttl=5, max_entries=2))
+def load_live_prices(tickers):
+    prices = ohlcv_store.last_prices(list(tickers))
+    if not prices: raise engine.DataUnavailable("No live quotes")
+    return prices
+
+def get_live_quotes(q, anchors, live):
+    if not live: return q
+    prices = uncached_failure("get_live_prices", {}, load_live_prices, tuple(engine.LIVE_TICKERS))
+    return engine.live_quotes(q, anchors, prices) if prices else q
+
+# --- PORTFOLIO LAB DATA ---
+@metrics.cached(st.cache_data(ttl=3600, max_entries=4))
+def load_portfolio_performance(portfolios):
+    # One bulk download of the whole universe; every portfolio x horizon return is a single matrix product
+    perf = engine.load_portfolio_performance(portfolios)
+    if perf.empty: raise engine.DataUnavailable("No Portfolio Lab history")
+    return perf
+
+def get_portfolio_performance(portfolios):
+    return uncached_failure("get_portfolio_performance", pd.DataFrame(), load_portfolio_performance, portfolios)
+
+# --- ROTATION DATA FUNCTIONS ---
+@metrics.cached(st.cache_data(ttl=3600, max_entries=256))  # keyed by user-typed tickers
+def load_technical_exhaustion(ticker):
+    result = engine.load_technical_exhaustion(ticker)
+    if result is None: raise engine.DataUnavailable(f"No price history for {ticker}")
+    return result
+
+def get_technical_exhaustion(ticker):
+    return uncached_failure("get_technical_exhaustion", None, load_technical_exhaustion, ticker)
+
+@st.cache_resource
+def get_seasonality_index():
+    return engine.seasonality_index()
+
+def get_seasonality(ticker, lookback="10y"):
+    # O(1) read from the persisted ticker x month index; it is only recomputed after a month closes
+    return engine.seasonal_profile(ticker, lookback, index=get_seasonality_index())
+
+@metrics.cached(st.cache_data(ttl=3600, max_entries=16))
+def load_rotation_scan(tickers, lookback="10y"):
+    scan = engine.scan_rotation_universe(tickers, lookback, index=get_seasonality_index())
+    if scan.empty: raise engine.DataUnavailable("No history for the scan universe")
+    return scan
+
+def scan_rotation_universe(tickers, lookback="10y"):
+    return uncached_failure("scan_rotation_universe", pd.DataFrame(), load_rotation_scan, tickers, lookback)
+
+# --- STRESS TEST ENGINE ---
+@metrics.cached(st.cache_data(ttl=3600, max_entries=16))
+def load_batch_stress_test(strategies, regimes):
+    batch = engine.load_batch_stress_test(strategies, regimes)
+    if batch.empty: raise engine.DataUnavailable("No history for the batch universe")
+    return batch
+
+def run_batch_stress_test(strategies, regimes):
+    return uncached_failure("run_batch_stress_test", pd.DataFrame(), load_batch_stress_test, strategies, regimes)
+
+# --- SIGNAL BACKTEST ---
+@metrics.cached(st.cache_data(ttl=3600, max_entries=8))  # keyed by user-edited thresholds
+def load_signal_backtest(start, thresholds):
+    return backtest.load_backtest(start, thresholds=thresholds)
+
+def run_signal_backtest(start, thresholds):
+    return uncached_failure("run_signal_backtest", None, load_signal_backtest, start, thresholds)
+
+# --- SHARED RESOURCES ---
+@st.cache_resource
+def get_news_manager():
+    mgr = news.NewsFeedManager(news.FEEDS)
+    if not scheduler.ENABLED: mgr.refresh()  # no warmer to fetch them: load once inline, then on manual refresh
+    return mgr
+
+def warm_quotes():
+    ohlcv_store.refresh(TERMINAL_TICKERS, ohlcv_store.period_start(engine.TERMINAL_PERIOD), max_age=ohlcv_store.WARM_MAX_AGE)
+    get_terminal_snapshot().refresh()
+
+def warm_news():
+    mgr = get_news_manager()
+    mgr.refresh()
+    headlines = {f["url"]: mgr.get(f["url"]) for f in mgr.feeds}
+    get_terminal_snapshot().update(headlines={url: entries for url, entries in headlines.items() if entries})
+
+def warm_history():
+    ohlcv_store.refresh(ALL_P_TICKERS, pd.Timestamp(LAB_HISTORY_START), max_age=ohlcv_store.WARM_MAX_AGE)
+    get_seasonality_index().update(list(SECTORS))  # no-op until a new month closes
+
+DATA_CLASSES = {"quotes": "Quotes & Terminal", "history": "Daily History (Lab & Radar)", "news": "News Headlines"}
+
+@st.cache_resource
+def get_cache_warmer():
+    # Pre-warms the on-disk store, the terminal snapshot and the headlines so the next visitor never pays a cold fetch
+    return (scheduler.CacheWarmer()
+        .register("quotes", warm_quotes)
+        .register("history", warm_history, clear=[load_portfolio_performance.clear, load_technical_exhaustion.clear])
+        .register("news", warm_news)
+        .start())
 
 # --- SIDEBAR ---
 with st.sidebar:
     st.header("⚙️ Terminal Controls")
+    warmer = get_cache_warmer()
+    refresh_classes = st.multiselect("Data to refresh", list(DATA_CLASSES), default=["quotes", "news"], format_func=DATA_CLASSES.get)
     if st.button("🔄 Refresh Market Data"):
-        st.cache_data.clear()
+        warmer.invalidate(*refresh_classes)
         st.rerun()
-    st.info("Manual refresh clears the cache and pulls the latest data.")
+    st.info("Manual refresh re-pulls only the selected data. Everything else is kept warm in the background.")
+    show_diagnostics = st.toggle("🩺 Diagnostics", help="Per-rerun timings, cache hits / misses, downloads and swallowed errors.")
+    diagnostics_panel = st.container()  # filled after the tabs so it covers the whole rerun
+
+def render_diagnostics(run):
+    st.subheader("🩺 This Rerun")
+    if run["timings"]:
+        t = pd.DataFrame(run["timings"]).T.sort_values("seconds", ascending=False)
+        st.dataframe(t.style.format({"calls": "{:.0f}", "seconds": "{:.3f}", "max": "{:.3f}"}), use_container_width=True)
+    if run["cache"]:
+        c = pd.DataFrame(run["cache"]).T
+        c["hit %"] = c["hits"] / (c["hits"] + c["misses"]) * 100
+        st.dataframe(c.style.format({"hit %": "{:.0f}"}), use_container_width=True)
+    if run["network"]:
+        st.dataframe(pd.DataFrame(run["network"]).T, use_container_width=True)
+    backoff = {**{f"host {k}": v for k, v in breaker.HOSTS.status().items()}, **{k: v for k, v in breaker.TICKERS.status().items()}}
+    if backoff:
+        st.dataframe(pd.DataFrame(backoff).T.style.format({"retry_in": "{:.0f}s"}), use_container_width=True)
+    for name, e in run["errors"].items():
+        st.warning(f"**{name}** swallowed {e['count']}× · {e['last']}")
+    if not any(run.values()): st.caption("Nothing instrumented ran (fragment-only reruns are not captured here).")
+    lru = ohlcv_store.CLOSE_CACHE.status()
+    st.caption(f"Price cache: {lru['entries']:,} series · {lru['mb']:.1f} / {lru['budget_mb']:.0f} MB · {lru['evictions']:,} evictions")
+    st.caption("Exports hold process-wide totals since start.")
+    st.download_button("Export JSON", metrics.to_json(), file_name="market_agent_metrics.json", mime="application/json")
+    st.download_button("Export Prometheus", metrics.to_prometheus(), file_name="market_agent_metrics.prom", mime="text/plain")
 
 # --- 1. TABS NAVIGATION ---
+# on_change="rerun" tracks the selected tab so only its body (and data pipeline) executes on a rerun.
 tab_terminal, tab_lab, tab_rebalance, tab_architect, tab_rotation = st.tabs([
     "🛡️ Multi-Asset Terminal", 
     "📈 Portfolio Lab", 
     "⚖️ Rebalance & Income",
     "🔬 Strategy Architect",
     "🔄 Rotation Radar"
-])
-
-with tab_terminal:
-    st.title("🛡️ Multi-Asset Terminal")
-    st.subheader("Global Asset Intel | G.A.I. Multi-Asset Overlay")
+], key="active_tab", on_change="rerun")
 
-    # --- DATA MINING FUNCTIONS ---
-    @st.cache_data(ttl=600) 
-    def get_safe_data(ticker):
-        try:
-            d = yf.download(ticker, period="5d", progress=False)
-            if not d.empty:
-                return d['Close'].dropna().iloc[-1].item()
-            return 0.0
-        except: return 0.0
-
-    @st.cache_data(ttl=600)
-    def calculate_rsi(ticker, period="1d", window=14):
-        try:
-            hp, iv = ("60d", "1d") if period == "1d" else ("2y", "1wk")
-            df = yf.download(ticker, period=hp, interval=iv, progress=False)
-            delta = df['Close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-            rs = gain / loss
-            rsi = 100 - (100 / (1 + rs))
-            return rsi.iloc[-1].item()
-        except: return 50.0
-
-    @st.cache_data(ttl=600)
-    def get_sma(ticker, window):
-        try:
-            d = yf.download(ticker, period="2y", progress=False)
-            return d['Close'].rolling(window=window).mean().iloc[-1].item()
-        except: return 0.0
-
-    @st.cache_data(ttl=300)
-    def get_news_feed(url, limit=5):
-        try:
-            feed = feedparser.parse(url)
-            return [{"title": e.title, "link": e.link} for e in feed.entries[:limit]]
-        except: return []
-
-    @st.cache_data(ttl=600)
-    def get_sector_leaderboard():
-        sectors = {"XLC": "Comm Services", "XLY": "Consumer Disc", "XLP": "Consumer Staples", "XLE": "Energy", "XLF": "Financials", "XLV": "Health Care", "XLI": "Industrials", "XLB": "Materials", "XLRE": "Real Estate", "XLK": "Technology", "XLU": "Utilities"}
-        tickers = list(sectors.keys())
-        try:
-            data = yf.download(tickers, period="max", progress=False)['Close']
-            sector_rsis = {t: calculate_rsi(t, "1d") for t in tickers}
-            daily = ((data.iloc[-1] / data.iloc[-2]) - 1) * 100
-            weekly = ((data.iloc[-1] / data.iloc[-6]) - 1) * 100
-            monthly = ((data.iloc[-1] / data.iloc[-21]) - 1) * 100
-            ytd_start = data[data.index >= f"{datetime.now().year}-01-01"].iloc[0]
-            ytd = ((data.iloc[-1] / ytd_start) - 1) * 100
-            def get_ranks(series):
-                top = series.sort_values(ascending=False).head(5)
-                bot = series.sort_values(ascending=True).head(5)
-                return [f"{sectors[t]}: {v:+.1f}% (RSI: {sector_rsis[t]:.1f})" for t, v in top.items()], [f"{sectors[t]}: {v:+.1f}% (RSI: {sector_rsis[t]:.1f})" for t, v in bot.items()]
-            return get_ranks(daily), get_ranks(weekly), get_ranks(monthly), get_ranks(ytd), sector_rsis, sectors
-        except: return ([],[]),([],[]),([],[]),([],[]), {}, {}
-
-    # --- FETCH CORE DATA ---
-    spx_now = get_safe_data("^GSPC")
-    qqq_now = get_safe_data("QQQ")
-    vxus_now = get_safe_data("VXUS")
-    vix_now = get_safe_data("^VIX")
-    tnx_now = get_safe_data("^TNX")
-    short_rate = get_safe_data("^IRX")
-    dxy_now = get_safe_data("DX-Y.NYB")
-    btc_now = get_safe_data("BTC-USD")
-    gold_now = get_safe_data("GC=F")
-    dbc_now = get_safe_data("DBC")
-    xlb_now = get_safe_data("XLB")
-
-    # --- INDICATORS & NEW FAST AVERAGES ---
-    sma_200d = get_sma("^GSPC", 200)
-    sma_20d = get_sma("^GSPC", 20)  # Fast trend for breakdown confirmation
-    tnx_200ma = get_sma("^TNX", 200)
-    btc_200ma = get_sma("BTC-USD", 200)
-    avg_rsi = (calculate_rsi("^GSPC") + calculate_rsi("QQQ") + calculate_rsi("VXUS")) / 3
-    
-    # --- NEW BOND & REAL ESTATE PRICING ---
-    tlt_now = get_safe_data("TLT")
-    tlt_200ma = get_sma("TLT", 200)
-    xlre_now = get_safe_data("XLRE")
-    xlre_200ma = get_sma("XLRE", 200)
-    xlre_20ma = get_sma("XLRE", 20)
-    xlre_rsi = calculate_rsi("XLRE")
-    
-    # --- NEW GOLD DYNAMIC AVERAGES ---
-    gold_50ma = get_sma("GC=F", 50)
-    gold_200ma = get_sma("GC=F", 200)
+# Live-mode fragments of the terminal tab (wrapped with run_every in render_terminal)
+def render_overlay(q, anchors, live):
+    q = get_live_quotes(q, anchors, live)
 
     # --- 6 PILLARS OVERLAY (AUTOMATED) ---
     cols = st.columns(6)
-    cols[0].metric("Momentum", f"{'🟢 BULLISH' if spx_now > sma_200d else '🔴 BEARISH'}", f"{((spx_now/sma_200d)-1)*100:+.1f}% vs 200D")
-    cols[1].metric("Inflation", f"{'🔴 HIGH' if (gold_now/dbc_now if dbc_now > 0 else 0) > 1.1 else '🟢 STABLE'}", "Gold/DBC Ratio")
-    cols[2].metric("Growth", f"{'🟢 EXPAND' if (xlb_now/gold_now if gold_now > 0 else 0) > 0.015 else '🟡 SLOWING'}", "Materials vs Gold")
-    cols[3].metric("Positioning", f"{'🔴 HEAVY' if vix_now > 30 else '🟡 NEUTRAL' if vix_now > 20 else '🟢 LITE'}", f"VIX {vix_now:.1f}")
-    cols[4].metric("Monetary", f"{'🔴 TIGHT' if (tnx_now - short_rate) < 0 else '🟢 EASING'}", f"Spread: {tnx_now-short_rate:.2f}%")
-    cols[5].metric("Fiscal", f"{'🔴 STRESS' if tnx_now > tnx_200ma * 1.1 else '🟢 STABLE'}", "Yield vs 200D MA")
+    for col, (pillar, state, detail) in zip(cols, engine.six_pillars(q)):
+        col.metric(pillar, state, detail)
 
     st.divider()
 
-    # --- SCORECARD ---
+    # --- SCORECARD (red conditions override green; rules in engine.scorecard) ---
     st.subheader("🎯 Asset Class Scorecard")
     sc = st.columns(5)
-    
-    # Updated to prioritize risk: If a red condition triggers, it overrides the green.
-    def get_rating(green_cond, red_cond):
-        if red_cond: return "🔴 BEARISH"
-        if green_cond: return "🟢 BULLISH"
-        return "🟡 NEUTRAL"
-
-    # Stocks: Bearish only if below 200MA OR (RSI is wildly overbought AND price breaks the 20-day MA).
-    sc[0].metric("Stocks", get_rating(
-        green_cond=spx_now > sma_200d, 
-        red_cond=spx_now < sma_200d or (avg_rsi > 80 and spx_now < sma_20d)
-    ))
-
-    # Bonds: Tracks actual TLT price vs 200MA. Small 2% buffer on the downside to prevent fake-outs.
-    sc[1].metric("Bonds", get_rating(
-        green_cond=tlt_now > tlt_200ma, 
-        red_cond=tlt_now < tlt_200ma * 0.98
-    ))
-
-    # Gold: Dynamic guardrails using 50MA and 200MA instead of static ratios.
-    sc[2].metric("Gold", get_rating(
-        green_cond=gold_now > gold_50ma, 
-        red_cond=gold_now < gold_200ma
-    ))
-
-    # Crypto: Requires a 5% crash through the 200MA to flash red, accommodating for high volatility.
-    sc[3].metric("Crypto", get_rating(
-        green_cond=btc_now > btc_200ma, 
-        red_cond=btc_now < btc_200ma * 0.95
-    ))
-
-    # Real Estate: Price vs 200MA, with a breakdown trigger similar to stocks.
-    sc[4].metric("Real Estate", get_rating(
-        green_cond=xlre_now > xlre_200ma, 
-        red_cond=xlre_now < xlre_200ma or (xlre_rsi > 80 and xlre_now < xlre_20ma)
-    ))
+    for col, (asset, rating) in zip(sc, engine.scorecard(q).items()):
+        col.metric(asset, rating)
+    if live:
+        tick = q.get("live")
+        st.caption(f"📡 {len(tick['tickers'])} live quotes, last trade {tick['as_of']:%b %d %H:%M}" if tick and tick["as_of"] is not None
+                   else "📡 No live quotes right now; showing the last close.")
+
+def render_crypto(q, anchors, live):
+    q = get_live_quotes(q, anchors, live)
+    c_cols = st.columns(3)
+    for i, (name, c) in enumerate(q["cryptos"].items()):
+        with c_cols[i]:
+            st.write(f"**{name}**")
+            st.write(f"Price: ${c['price']:,.2f} | RSI: {c['rsi']:.1f}")
+
+def await_terminal_refresh(as_of):
+    # Polls while the background recompute runs; reruns the page once it has published (or given up)
+    snap = get_terminal_snapshot()
+    if snap.as_of() != as_of or not snap.refreshing(): st.rerun()
+
+# Each tab body is an isolated fragment: its widgets rerun that tab only, not the whole dashboard.
+@st.fragment
+def render_terminal():
+    st.title("🛡️ Multi-Asset Terminal")
+    st.subheader("Global Asset Intel | G.A.I. Multi-Asset Overlay")
+
+    # --- FETCH CORE DATA (prices, indicators and fast averages from the shared history frame) ---
+    state, age = get_terminal_state()
+    q, anchors = state["q"], state["anchors"]
+    if state["as_of"] is not None:
+        as_of, snap = datetime.fromtimestamp(state["as_of"]), get_terminal_snapshot()
+        if snap.refreshing():
+            st.caption(f"🕒 Snapshot from {as_of:%b %d %H:%M} ({age / 60:.0f} min old); fresh numbers are being computed and appear here when ready.")
+            st.fragment(await_terminal_refresh, run_every=2)(state["as_of"])
+        else:
+            st.caption(f"🕒 As of {as_of:%b %d %H:%M:%S}" + (f" · last refresh failed ({snap.error}); retrying shortly" if snap.error else ""))
+    spx_now, qqq_now, vxus_now, sma_200d = q["spx_now"], q["qqq_now"], q["vxus_now"], q["sma_200d"]
+    dxy_now, tnx_now, short_rate, gold_now = q["dxy_now"], q["tnx_now"], q["short_rate"], q["gold_now"]
+    if q["missing"]:
+        st.caption(f"⚠️ No data for {', '.join(q['missing'])} (retrying with backoff); affected readings show 0 / RSI 50.")
+
+    # --- LIVE MODE: the overlay, scorecard and crypto panel rerun on a timer as their own fragments ---
+    lc1, lc2 = st.columns([1, 3])
+    live = lc1.toggle("📡 Live Quotes", help="Re-prices the pillars, scorecard and crypto panel from last trades; nothing else reruns.")
+    every = lc2.select_slider("Refresh every", LIVE_INTERVALS, value=60, format_func=lambda s: f"{s}s", disabled=not live)
+    st.fragment(render_overlay, run_every=every if live else None)(q, anchors, live)
 
     st.divider()
 
     # --- SECTOR PERFORMANCE & HEATMAP ---
-    daily, weekly, monthly, ytd, s_rsis, s_names = get_sector_leaderboard()
+    daily, weekly, monthly, ytd, s_rsis, s_names = state["leaderboard"]
     if s_rsis:
         st.subheader("📊 Sector Performance & RSI Heatmap")
         heat_cols = st.columns(11)
@@ -241,14 +290,7 @@ with tab_terminal:
             st.write(f"**Nasdaq (QQQ):** {qqq_now:,.2f} | **Intl (VXUS):** {vxus_now:,.2f}")
 
         with st.expander("₿ Crypto Intelligence Agent (BTC, ETH, SOL)", expanded=True):
-            cryptos = {"Bitcoin (BTC)": "BTC-USD", "Ethereum (ETH)": "ETH-USD", "Solana (SOL)": "SOL-USD"}
-            c_cols = st.columns(3)
-            for i, (name, ticker) in enumerate(cryptos.items()):
-                p = get_safe_data(ticker)
-                dr = calculate_rsi(ticker, "1d")
-                with c_cols[i]:
-                    st.write(f"**{name}**")
-                    st.write(f"Price: ${p:,.2f} | RSI: {dr:.1f}")
+            st.fragment(render_crypto, run_every=every if live else None)(q, anchors, live)
 
     with col_right:
         with st.expander("🌊 Liquidity & Yields", expanded=True):
@@ -259,59 +301,74 @@ with tab_terminal:
             st.write(f"**Gold Price:** ${gold_now:,.2f}")
             st.write(f"**Gold/SPX Ratio:** {gold_now/spx_now if spx_now > 0 else 0:.4f}")
 
+    # --- SIGNAL BACKTEST: the same rules over decades of history, judged by what followed each state ---
+    with st.expander("🧪 Signal Backtest (Pillars & Scorecard over History)"):
+        st.caption("Evaluates every pillar and scorecard rule on each trading day since the start year and averages the "
+                   "forward return of the signal's asset after each state. Edit a threshold to compare it with the default.")
+        b1, b2 = st.columns([1, 3])
+        bt_start = b1.selectbox("From", [1990, 2000, 2010, 2015], index=0)
+        bt_horizon = b2.radio("Forward Return", list(backtest.FORWARD_HORIZONS), index=1, horizontal=True)
+        th_cols = st.columns(4)
+        thresholds = {k: th_cols[i % 4].number_input(k, value=float(v), step=0.005 if v < 2 else 1.0, format="%.3f" if v < 2 else "%.0f")
+                      for i, (k, v) in enumerate(engine.THRESHOLDS.items())}
+        if st.button("🧪 Run Backtest"):
+            with st.spinner("Evaluating every rule over history..."):
+                st.session_state["signal_backtest"] = run_signal_backtest(f"{bt_start}-01-01", thresholds)
+        bt = st.session_state.get("signal_backtest")
+        if bt is not None:
+            stats = bt["stats"].set_index(["Signal", "State"])
+            cols = ["Asset", "Time %", "Episodes", f"{bt_horizon} Avg %", f"{bt_horizon} Hit %", f"{bt_horizon} Edge %"]
+            st.dataframe(stats[cols].style.format({c: "{:.1f}" for c in cols[1:] if c != "Episodes"}, na_rep="n/a"), use_container_width=True)
+            st.caption(f"{bt['states'].index[0]:%b %Y} – {bt['states'].index[-1]:%b %Y}. Edge: the state's average minus the "
+                       "average over all days the signal is defined. Forward windows overlap, so treat these as descriptive.")
+            st.write("**Latest State Changes**")
+            st.dataframe(bt["transitions"].tail(15).iloc[::-1], hide_index=True, use_container_width=True)
+        elif "signal_backtest" in st.session_state:
+            st.error("No history available for the backtest universe.")
+
     st.divider()
     
-    # NEWS FEEDS
-    geo_left, geo_right = st.columns(2)
-    with geo_left:
-        st.write("**🌍 Global Headlines (BBC)**")
-        for e in get_news_feed("https://feeds.bbci.co.uk/news/world/rss.xml") or []:
-            st.markdown(f"- [{e['title']}]({e['link']})")
-    with geo_right:
-        st.write("**💰 Finance Headlines (CNBC)**")
-        for e in get_news_feed("https://search.cnbc.com/rs/search/combinedcms/view.xml?partnerId=wrss01&id=100003114") or []:
-            st.markdown(f"- [{e['title']}]({e['link']})")
+    # NEWS FEEDS (served from the background fetcher's snapshot; never blocks the render)
+    news_mgr = get_news_manager()
+    geo_cols = st.columns(2)
+    for i, feed in enumerate(news_mgr.feeds):
+        with geo_cols[i % 2]:
+            st.write(f"**{feed['title']}**")
+            entries = news_mgr.get(feed["url"]) or state.get("headlines", {}).get(feed["url"], [])  # snapshot until the first fetch
+            if not entries: st.caption("Headlines loading…")
+            for e in entries:
+                st.markdown(f"- [{e['title']}]({e['link']})")
 
 # --- TAB 2: PORTFOLIO LAB ---
-with tab_lab:
+@st.fragment
+def render_lab():
     st.header("📈 Lazy Portfolio Performance Lab")
     
-    # Get flat list of tickers for live YTD calculation
-    all_p_tickers = list(set([t for p in PORTFOLIOS.values() for t in p["weights"].keys()]))
-    
-    @st.cache_data(ttl=3600)
-    def get_ytd_portfolio_data(tickers):
-        prices = {}
-        ytd_start_date = f"{datetime.now().year}-01-01"
-        for ticker in tickers:
-            try:
-                df = yf.download(ticker, start=ytd_start_date, progress=False)
-                if not df.empty:
-                    prices[ticker] = {"current": df['Close'].iloc[-1].item(), "ytd_start": df['Close'].iloc[0].item()}
-            except: continue
-        return prices
-
-    p_prices = get_ytd_portfolio_data(all_p_tickers)
-    if p_prices:
+    perf = get_portfolio_performance(PORTFOLIOS)
+    if not perf.empty:
         res = []
         for name, data in PORTFOLIOS.items():
             weights = data["weights"]
             # Build string for weights display
             weight_strings = [f"{t}: {int(w*100)}%" for t, w in weights.items()]
-            ytd_perf = sum(((p_prices[t]["current"]/p_prices[t]["ytd_start"])-1) * w for t, w in weights.items() if t in p_prices)
-            
+            row = perf.loc[name]
+            measured = row["Ann. Return (Since 2008)"]
+
             res.append({
                 "Portfolio Design": name, 
                 "Allocation Weighting": ", ".join(weight_strings),
-                "YTD %": round(ytd_perf * 100, 2),
-                "Ann. Return (Since 2008)": data["hist_ret"],
+                "YTD %": round(row["YTD %"], 2),
+                **{h: round(row[h], 2) for h in LAB_HORIZONS},
+                "Ann. Return (Since 2008)": f"{measured:.1f}%" if pd.notna(measured) else f"{data['hist_ret']}*",
                 "Stagflation Potential": data["stag_pot"]
             })
         
         st.dataframe(pd.DataFrame(res).sort_values(by="YTD %", ascending=False), use_container_width=True, hide_index=True)
+        st.caption("Returns are measured buy-and-hold from adjusted closes. * Published estimate: a holding has no price history back to 2008.")
 
 # --- TAB 3: REBALANCE & INCOME SECTION ---
-with tab_rebalance:
+@st.fragment
+def render_rebalance():
     st.header("⚖️ Rebalance & Income Projection")
     st.write("Define your target portfolio size to automatically see the suggested construction.")
     
@@ -383,49 +440,105 @@ with tab_rebalance:
     
     st.table(pd.DataFrame(rebalance_data))
 
+    # --- BULK MODE: every account in a holdings file, planned in one vectorized pass per chunk ---
+    st.divider()
+    st.subheader("📂 Bulk Rebalance (Many Accounts)")
+    st.caption("Upload a CSV or Parquet file with columns `account`, `ticker`, `value` and optionally `strategy`, with each account's rows together. "
+               "Each account is rebalanced in place to its strategy's weights.")
+    b1, b2, b3 = st.columns([2, 2, 1])
+    holdings_file = b1.file_uploader("Holdings File", type=["csv", "parquet"])
+    default_strategy = b2.selectbox("Strategy for accounts without one", ["(skip them)"] + list(PORTFOLIOS.keys()))
+    out_format = b3.radio("Trade List Format", ["CSV", "Parquet"])
+
+    if st.button("⚖️ Plan All Accounts", disabled=holdings_file is None):
+        fd, out_path = tempfile.mkstemp(prefix="trade_list_", suffix=f".{out_format.lower()}")
+        os.close(fd)
+        with st.spinner("Planning trades..."):
+            try:
+                summary = rebalance.write_trades(holdings_file, out_path, default=None if default_strategy == "(skip them)" else default_strategy)
+                previous = st.session_state.get("bulk_rebalance")
+                if previous is not None and os.path.exists(previous[1]): os.remove(previous[1])
+                st.session_state["bulk_rebalance"] = (summary, out_path)
+            except Exception as e:
+                st.error(f"Bulk Rebalance Error: {str(e)}")
+
+    bulk = st.session_state.get("bulk_rebalance")
+    if bulk is not None:
+        summary, out_path = bulk
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric("Accounts Planned", f"{summary['accounts']:,}", f"{summary['trades']:,} trades", delta_color="off")
+        m2.metric("Total Buys / Sells", f"${summary['buy_total']:,.0f}", f"-${summary['sell_total']:,.0f}", delta_color="off")
+        m3.metric("Largest Drift", f"{summary['max_abs_drift'] * 100:.1f} pts")
+        m4.metric("Est. Annual Income", f"${summary['est_annual_income']:,.0f}", f"${summary['est_annual_income'] / 12:,.0f} / month", delta_color="off")
+        for reason, n in summary["skipped"].items():
+            st.warning(f"Skipped {n:,} account(s): {reason}.")
+        if os.path.exists(out_path):
+            with open(out_path, "rb") as f:
+                st.download_button("Download Trade List", f, file_name=f"trade_list{os.path.splitext(out_path)[1]}")
+
+HEATMAP_MAX_TICKERS = 120  # above this the heatmap is drawn per cluster, not per ticker
+
+def render_correlation(corr, clusters):
+    # corr is already in dendrogram order; cells are drawn by Vega, not as a styled k x k table
+    if len(corr) > HEATMAP_MAX_TICKERS:
+        names = clusters.map(lambda c: f"C{c} ({(clusters == c).sum()})")
+        cells = corr.groupby(names.reindex(corr.index).values).mean().T.groupby(names.reindex(corr.columns).values).mean()
+        order = list(dict.fromkeys(names.reindex(corr.index)))
+        st.caption(f"{len(corr)} tickers: showing the average correlation between each pair of the {len(order)} clusters.")
+    else:
+        cells, order = corr, list(corr.index)
+    long = cells.rename_axis(index="a", columns="b").stack(future_stack=True).rename("corr").reset_index()
+    chart = alt.Chart(long).mark_rect().encode(
+        x=alt.X("b:N", sort=order, title=None), y=alt.Y("a:N", sort=order, title=None),
+        color=alt.Color("corr:Q", scale=alt.Scale(scheme="redyellowgreen", reverse=True, domain=[-1, 1]), title="Correlation"),
+        tooltip=["a", "b", alt.Tooltip("corr:Q", format=".2f")])
+    st.altair_chart(chart.properties(height=min(900, 40 + 18 * len(order))), use_container_width=True)
+    rows = []
+    for n, members in clusters.groupby(clusters):
+        block = corr.loc[members.index, members.index].to_numpy()
+        rows.append({"Cluster": n, "Size": len(members), "Tickers": ", ".join(members.index),
+                     "Avg. Correlation Within": float(np.nanmean(block[~np.eye(len(block), dtype=bool)])) if len(block) > 1 else None})
+    st.dataframe(pd.DataFrame(rows).set_index("Cluster").style.format({"Avg. Correlation Within": "{:.2f}"}, na_rep="–"), use_container_width=True)
+
 # --- TAB 4: STRATEGY ARCHITECT (Final Version with Correlation Matrix) ---
-with tab_architect:
+WEIGHT_INPUTS_MAX = 8  # longer ticker lists get a table editor instead of one input per ticker
+
+@st.fragment
+def render_architect():
     st.header("🔬 Custom Strategy & Stress Test")
     
-    REGIMES = {
-        "2008 Housing Crisis": {
-            "dates": ("2007-10-01", "2009-03-09"),
-            "summary": "The Great Recession triggered by the housing collapse. S&P 500 fell ~50%."
-        },
-        "2020 COVID Crash": {
-            "dates": ("2020-02-19", "2020-03-23"),
-            "summary": "Swift bear market due to global lockdowns. Market bottomed after Fed intervention."
-        },
-        "2022 Rate Hike Shock": {
-            "dates": ("2022-01-01", "2022-12-31"),
-            "summary": "Stocks and bonds crashed as the Fed fought 40-year high inflation."
-        },
-        "Bull Market Run (Recent)": {
-            "dates": ("2023-01-01", datetime.now().strftime("%Y-%m-%d")),
-            "summary": "Defined by the AI Revolution. Tech led most of the gains."
-        }
-    }
-
     col_build, col_dates = st.columns([2, 1])
 
     with col_build:
         st.subheader("🛠️ Build Your Tickers")
         custom_tickers_raw = st.text_input("Enter Tickers (comma separated)", value="XLE, QQQ, GLD, BND")
-        custom_tickers = [t.strip().upper() for t in custom_tickers_raw.split(",") if t.strip()]
+        custom_tickers = list(dict.fromkeys(t.strip().upper() for t in custom_tickers_raw.split(",") if t.strip()))
         
         st.write("Assign Weights (Must sum to 100%)")
-        c_weight_cols = st.columns(len(custom_tickers) if custom_tickers else 1)
         custom_weights = {}
-        for i, ticker in enumerate(custom_tickers):
-            custom_weights[ticker] = c_weight_cols[i].number_input(f"{ticker} %", min_value=0, max_value=100, value=100//len(custom_tickers))
+        if len(custom_tickers) <= WEIGHT_INPUTS_MAX:
+            c_weight_cols = st.columns(len(custom_tickers) if custom_tickers else 1)
+            for i, ticker in enumerate(custom_tickers):
+                custom_weights[ticker] = c_weight_cols[i].number_input(f"{ticker} %", min_value=0, max_value=100, value=100//len(custom_tickers))
+        else:
+            # A pasted universe: one editable table instead of an input per ticker, equal-weighted to start
+            table = st.data_editor(pd.DataFrame({"Ticker": custom_tickers, "Weight %": 100 / len(custom_tickers)}),
+                                   disabled=["Ticker"], hide_index=True, use_container_width=True, height=250,
+                                   column_config={"Weight %": st.column_config.NumberColumn(min_value=0.0, max_value=100.0, format="%.2f")})
+            custom_weights = dict(zip(table["Ticker"], table["Weight %"].fillna(0.0).astype(float)))
         
         total_w = sum(custom_weights.values())
+        weights_ok = abs(total_w - 100) < 0.01
         
         benchmark_choice = st.selectbox(
             "Compare against Benchmark:", 
             ["S&P 500 (SPY)", "Nasdaq 100 (QQQ)", "Bitcoin (BTC-USD)", "None"]
         )
         benchmark_map = {"S&P 500 (SPY)": "SPY", "Nasdaq 100 (QQQ)": "QQQ", "Bitcoin (BTC-USD)": "BTC-USD"}
+        rolling_windows = st.multiselect("Rolling Windows:", list(engine.ROLLING_WINDOWS), default=["3M", "1Y"],
+                                         help="Trailing windows for the rolling Sharpe, volatility, drawdown and correlation charts.")
+        corr_shrinkage = st.slider("Correlation Shrinkage:", 0.0, 0.5, 0.0, 0.05,
+                                   help="Pulls every pair toward the average correlation; steadies noisy estimates for short or patchy histories.")
 
     with col_dates:
         st.subheader("📅 Select Timeframe")
@@ -452,8 +565,8 @@ with tab_architect:
             end_date = None
 
     if st.button("🚀 Run Stress Test"):
-        if total_w != 100:
-            st.error(f"⚠️ Total weight must be exactly 100%. Your current total is **{total_w}%**.")
+        if not weights_ok:
+            st.error(f"⚠️ Total weight must be exactly 100%. Your current total is **{total_w:.4g}%**.")
         elif not custom_tickers:
             st.error("⚠️ Please enter at least one ticker symbol.")
         elif start_date is None or end_date is None:
@@ -461,58 +574,54 @@ with tab_architect:
         else:
             with st.spinner(f"Analyzing strategy performance..."):
                 try:
-                    tickers_to_fetch = list(set(custom_tickers + ([benchmark_map[benchmark_choice]] if benchmark_choice != "None" else [])))
-                    raw_data = yf.download(tickers_to_fetch, start=start_date, end=end_date, progress=False)
-                    data = raw_data['Close'] if 'Close' in raw_data.columns else raw_data
+                    bench_ticker = benchmark_map.get(benchmark_choice)
+                    result = engine.load_stress_test(custom_weights, start_date, end_date, bench_ticker)
 
-                    if data.empty:
+                    if result is None:
                         st.error("No historical data found for these tickers.")
                     else:
-                        # 1. Calculations
-                        returns = data[custom_tickers].pct_change().dropna()
-                        weights_arr = [custom_weights[t]/100 for t in custom_tickers]
-                        port_returns = (returns * weights_arr).sum(axis=1)
-                        cumulative_growth = (1 + port_returns).cumprod() * 100
-                        
-                        # 2. Metrics
-                        port_vol = port_returns.std() * (252**0.5) * 100
-                        port_perf = (cumulative_growth.iloc[-1] - 100)
-                        max_dd = ((cumulative_growth / cumulative_growth.cummax()) - 1).min() * 100
-                        rf_daily = 0.02 / 252
-                        sharpe_ratio = ((port_returns - rf_daily).mean() / port_returns.std()) * (252**0.5) if port_returns.std() != 0 else 0
-                        
-                        # 3. Display Metrics
+                        cumulative_growth, stats = result["cumulative_growth"], result["metrics"]
+
+                        # Display Metrics
                         m1, m2, m3, m4, m5 = st.columns(5)
-                        m1.metric("Strategy Return", f"{port_perf:+.2f}%")
-                        m2.metric("Max Drawdown", f"{max_dd:.2f}%", delta_color="inverse")
-                        m3.metric("Volatility Score", f"{port_vol:.1f}%", help="Avg S&P Vol is 15-18%.")
-                        m4.metric("Sharpe Ratio", f"{sharpe_ratio:.2f}", help="Risk-adjusted return.")
+                        m1.metric("Strategy Return", f"{stats['Return %']:+.2f}%")
+                        m2.metric("Max Drawdown", f"{stats['Max Drawdown %']:.2f}%", delta_color="inverse")
+                        m3.metric("Volatility Score", f"{stats['Volatility %']:.1f}%", help="Avg S&P Vol is 15-18%.")
+                        m4.metric("Sharpe Ratio", f"{stats['Sharpe']:.2f}", help="Risk-adjusted return.")
 
                         plot_df = pd.DataFrame({"Your Strategy": cumulative_growth}, index=cumulative_growth.index)
-                        if benchmark_choice != "None":
-                            bench_ticker = benchmark_map[benchmark_choice]
-                            bench_growth = (1 + data[bench_ticker].pct_change().dropna()).cumprod() * 100
-                            plot_df[f"Benchmark ({bench_ticker})"] = bench_growth
-                            m5.metric(f"vs {benchmark_choice.split(' ')[0]}", f"{(port_perf - (bench_growth.iloc[-1]-100)):+.2f}%")
+                        if bench_ticker:
+                            plot_df[f"Benchmark ({bench_ticker})"] = result["bench_growth"]
+                            m5.metric(f"vs {benchmark_choice.split(' ')[0]}", f"{stats['vs Benchmark %']:+.2f}%")
 
                         with st.expander("🎓 What is the Sharpe Ratio? (Novice Guide)"):
                             st.write("The Sharpe Ratio measures if your returns are worth the risk. Scores above 1.0 are good; 2.0+ is excellent.")
 
                         st.line_chart(plot_df)
                         
+                        if rolling_windows:
+                            st.subheader("📉 Rolling Analytics")
+                            rolling = engine.rolling_metrics(result["port_returns"], [engine.ROLLING_WINDOWS[w] for w in rolling_windows],
+                                                             result.get("bench_returns"))
+                            labels = dict(zip(map(engine.ROLLING_WINDOWS.get, rolling_windows), rolling_windows))
+                            r1, r2 = st.columns(2)
+                            for slot, (name, frame) in zip([r1, r2, r1, r2], rolling.items()):
+                                title = f"{name} vs {bench_ticker}" if name == "Correlation" else f"Rolling {name}"
+                                slot.caption(title)
+                                slot.line_chart(frame.rename(columns=labels).dropna(how="all"), height=220)
+
                         st.subheader("📊 Individual Asset Performance")
-                        asset_perf = {t: ((data[t].iloc[-1] / data[t].iloc[0]) - 1) * 100 for t in custom_tickers}
-                        st.bar_chart(pd.DataFrame.from_dict(asset_perf, orient='index', columns=['Return %']))
+                        st.bar_chart(pd.DataFrame.from_dict(result["asset_perf"], orient='index', columns=['Return %']))
 
-                        # --- NEW: CORRELATION MATRIX SECTION ---
+                        # --- CORRELATION MATRIX: pairwise-complete, clustered and reordered into blocks ---
                         st.divider()
                         st.subheader("🔗 Diversification Check: Correlation Matrix")
-                        
-                        corr_matrix = returns.corr()
-                        st.write("This table shows how closely your assets move together (1.0 is a perfect match).")
-                        
-                        # Apply a heatmap style for easy reading
-                        st.dataframe(corr_matrix.style.format("{:.2f}"))
+                        corr = engine.correlation_matrix(result["asset_returns"], shrinkage=corr_shrinkage)
+                        order, clusters = engine.correlation_clusters(corr)
+                        corr = corr.loc[order, order]
+                        st.write("How closely your assets move together (1.0 is a perfect match), reordered so assets that move together sit in blocks.")
+                        render_correlation(corr, clusters)
+                        st.download_button("Download Correlation Matrix (CSV)", corr.round(3).to_csv(), file_name="correlation_matrix.csv", mime="text/csv")
 
                         with st.expander("🎓 What is Correlation? (Novice Guide)"):
                             st.write("""
@@ -527,73 +636,86 @@ with tab_architect:
                 except Exception as e:
                     st.error(f"Calculation Error: {str(e)}")
 
+    # --- FORWARD SIMULATION: resample the selected history into thousands of possible futures ---
+    st.divider()
+    st.subheader("🎲 Forward Simulation (Monte Carlo)")
+    st.caption("Draws future paths from your strategy's daily returns over the selected timeframe.")
+    s1, s2, s3, s4 = st.columns(4)
+    sim_method = s1.selectbox("Method", ["Block Bootstrap", "Multivariate Normal"])
+    sim_horizon = s2.selectbox("Horizon", list(simulation.HORIZONS), index=2)
+    sim_paths = s3.select_slider("Paths", [10_000, 25_000, 50_000, 100_000], value=10_000, format_func=lambda n: f"{n:,}")
+    sim_block = s4.number_input("Block Length (days)", min_value=1, max_value=126, value=20, disabled=sim_method != "Block Bootstrap")
+    sim_parallel = st.toggle("Use a process pool", value=False, help="Spreads large runs across CPU cores; worth it from ~50k paths on multi-core hosts.")
+
+    if st.button("🎲 Run Forward Simulation"):
+        if not weights_ok or not custom_tickers or start_date is None or end_date is None:
+            st.error("⚠️ Set tickers, weights summing to 100% and a full date range first.")
+        else:
+            with st.spinner(f"Simulating {sim_paths:,} paths..."):
+                try:
+                    hist = engine.load_stress_test(custom_weights, start_date, end_date)
+                    if hist is None: raise engine.DataUnavailable("No historical data found for these tickers.")
+                    st.session_state["forward_sim"] = simulation.simulate(
+                        hist["returns"][custom_tickers], [custom_weights[t] / 100 for t in custom_tickers],
+                        horizon=simulation.HORIZONS[sim_horizon], n_paths=sim_paths,
+                        method="bootstrap" if sim_method == "Block Bootstrap" else "normal", block=int(sim_block),
+                        workers=(os.cpu_count() or 1) if sim_parallel else 0)
+                    st.session_state["forward_sim_label"] = f"{sim_paths:,} paths · {sim_horizon} · {sim_method}"
+                except Exception as e:
+                    st.error(f"Simulation Error: {str(e)}")
+
+    sim = st.session_state.get("forward_sim")
+    if sim is not None:
+        f1, f2, f3, f4 = st.columns(4)
+        f1.metric("Median Ending Value", f"${sim['terminal_bands'][50]:,.1f}", f"{sim['terminal_bands'][50] - 100:+.1f}% on $100")
+        f2.metric("5th–95th Percentile", f"${sim['terminal_bands'][5]:,.0f} – ${sim['terminal_bands'][95]:,.0f}")
+        f3.metric("Probability of Loss", f"{sim['p_loss'] * 100:.1f}%")
+        f4.metric("Median Max Drawdown", f"{sim['max_dd_bands'][50]:.1f}%", f"1-in-20 worst: {sim['max_dd_bands'][5]:.1f}%", delta_color="off")
+        st.line_chart(pd.DataFrame({f"P{p}": band for p, band in sim["fan"].items()}))
+        st.dataframe(pd.DataFrame({"Ending Value ($100 start)": sim["terminal_bands"], "Max Drawdown %": sim["max_dd_bands"]})
+                     .rename(index=lambda p: f"P{p}").style.format("{:.2f}"), use_container_width=True)
+        st.caption(f"{st.session_state['forward_sim_label']}. The chart shows percentile bands of the first {simulation.FAN_PATHS:,} paths. Past return patterns are not a forecast.")
+
+    # --- BATCH MODE: every portfolio (plus your strategy) against every regime in one pass ---
+    st.divider()
+    st.subheader("🧮 Batch Stress Test: All Portfolios × All Regimes")
+    st.caption("Runs every preset portfolio and your custom strategy (when weights sum to 100%) through every historical regime at once.")
+    if st.button("🚀 Run Batch Matrix"):
+        strategies = {name: p["weights"] for name, p in PORTFOLIOS.items()}
+        if weights_ok and custom_tickers:
+            strategies["Your Strategy"] = {t: w / 100 for t, w in custom_weights.items()}
+        with st.spinner("Stress testing every portfolio across every regime..."):
+            st.session_state["batch_grid"] = run_batch_stress_test(strategies, {k: v["dates"] for k, v in REGIMES.items()})
+
+    batch = st.session_state.get("batch_grid")
+    if batch is not None:
+        if batch.empty:
+            st.error("No historical data found for the batch universe.")
+        else:
+            metric = st.radio("Metric", ["Return %", "Max Drawdown %", "Volatility %", "Sharpe"], horizontal=True)
+            grid = batch.pivot(index="Strategy", columns="Regime", values=metric).reindex(columns=[r for r in REGIMES if r in set(batch["Regime"])])
+            st.dataframe(grid.style.format("{:.2f}", na_rep="n/a"), use_container_width=True)
+            st.caption("n/a: at least one holding has no price history for that regime.")
+
 # --- TAB 5: SECTOR ROTATION RADAR (Exhaustion & Multi-Month Seasonality) ---
-with tab_rotation:
+@st.fragment
+def render_rotation():
     st.header("🔄 Sector Rotation Radar")
     st.write("Measure technical exhaustion and forward-looking historical seasonality to anticipate capital rotation.")
     
-    # --- ROTATION DATA FUNCTIONS ---
-    @st.cache_data(ttl=3600)
-    def get_technical_exhaustion(ticker):
-        try:
-            df = yf.download(ticker, period="1y", progress=False)['Close']
-            if df.empty: return None
-            
-            # Calculate 50-day Moving Average and Standard Deviation
-            sma_50 = df.rolling(window=50).mean()
-            std_50 = df.rolling(window=50).std()
-            
-            current_price = float(df.iloc[-1].squeeze())
-            current_sma = float(sma_50.iloc[-1].squeeze())
-            current_std = float(std_50.iloc[-1].squeeze())
-            
-            if current_std == 0: return None
-            
-            # Z-Score Calculation (Rubber Band Stretch)
-            z_score = (current_price - current_sma) / current_std
-            return current_price, current_sma, z_score
-        except: return None
-
-    @st.cache_data(ttl=3600)
-    def get_seasonality(ticker):
-        try:
-            # Pull 10 years of data for deep historical context
-            df = yf.download(ticker, period="10y", progress=False)['Close']
-            if df.empty: return None
-            
-            # Resample to monthly and calculate month-over-month returns
-            monthly_data = df.resample('ME').last()
-            monthly_returns = monthly_data.pct_change() * 100
-            
-            now = datetime.now()
-            curr_m = now.month
-            curr_name = now.strftime('%B')
-            
-            next_m = 1 if curr_m == 12 else curr_m + 1
-            next_name = datetime.strptime(str(next_m), "%m").strftime('%B')
-            
-            # Isolate historical data for current and next month
-            curr_returns = monthly_returns[monthly_returns.index.month == curr_m].dropna()
-            next_returns = monthly_returns[monthly_returns.index.month == next_m].dropna()
-            
-            if curr_returns.empty or next_returns.empty: return None
-            
-            curr_win = float((curr_returns > 0).mean().squeeze()) * 100
-            curr_avg = float(curr_returns.mean().squeeze())
-            
-            next_win = float((next_returns > 0).mean().squeeze()) * 100
-            next_avg = float(next_returns.mean().squeeze())
-            
-            return {
-                "curr_name": curr_name, "curr_win": curr_win, "curr_avg": curr_avg,
-                "next_name": next_name, "next_win": next_win, "next_avg": next_avg
-            }
-        except: return None
+    radar_mode = st.radio("Mode", ["Single Ticker", "Universe Scan", "Threshold Sweep"], horizontal=True)
+    if radar_mode == "Universe Scan":
+        render_rotation_scan()
+        return
+    if radar_mode == "Threshold Sweep":
+        render_radar_sweep()
+        return
 
     # --- UI & ANALYSIS ENGINE ---
     col_input, col_info = st.columns([1, 2])
     with col_input:
         target_ticker = st.text_input("Enter Target Sector/Asset (e.g., SMH, XLK, XLE)", "SMH").upper()
+        lookback = st.selectbox("Seasonality Lookback", list(seasonality.LOOKBACKS), index=1)
         run_radar = st.button("🚀 Analyze Rotation Probabilities")
         
     with col_info:
@@ -602,7 +724,7 @@ with tab_rotation:
     if run_radar and target_ticker:
         with st.spinner(f"Running Exhaustion and Forward Seasonality models for {target_ticker}..."):
             exhaustion_data = get_technical_exhaustion(target_ticker)
-            season_data = get_seasonality(target_ticker)
+            season_data = get_seasonality(target_ticker, lookback)
             
             if exhaustion_data and season_data:
                 price, sma, z_score = exhaustion_data
@@ -633,42 +755,90 @@ with tab_rotation:
                 n_win, n_name = season_data['next_win'], season_data['next_name']
                 m5.metric(f"Forward: {n_name} Win %", f"{n_win:.0f}%", "Edge" if n_win > 55 else "Weak" if n_win < 45 else "")
                 m6.metric(f"{n_name} Avg Return", f"{season_data['next_avg']:+.2f}%")
+                st.caption(f"Seasonality from {season_data['years']} closed {c_name}s ({lookback} lookback). Medians: {c_name} {season_data['curr_median']:+.2f}% · {n_name} {season_data['next_median']:+.2f}%")
                 
                 # --- SYNTHESIS REPORT (Multi-Month Logic) ---
                 st.write("---")
                 st.write("### 🧠 AI Synthesis & Forward Rotation Probability")
                 
-                if z_score > 2.0:
-                    if c_win < 50 and n_win < 50:
-                        st.error(f"**High Fade Probability:** {target_ticker} is highly overextended (Z > 2.0) with sustained seasonal headwinds through {n_name}. Capital is highly likely to rotate out.")
-                    elif c_win >= 50 and n_win < 50:
-                        st.warning(f"**Distribution Warning:** {target_ticker} is overextended and entering a historically weak {n_name}. Smart money is likely taking profits now. Prepare for a rotation out.")
-                    elif c_win < 50 and n_win >= 50:
-                        st.warning(f"**Conflicting Signals:** Overextended and fighting current seasonal weakness, but historical tailwinds arrive in {n_name}. Expect choppy consolidation.")
-                    else:
-                        st.success(f"**Overbought but Supported:** Stretched, but strong seasonal tailwinds persist through {n_name}. Momentum might carry, but downside risk is elevated due to the stretched rubber band.")
-                
-                elif z_score < -2.0:
-                    if c_win >= 50 and n_win >= 50:
-                        st.success(f"**Prime Accumulation Zone:** Heavily oversold (Z < -2.0) with sustained historical tailwinds through {n_name}. High probability of capital rotation INTO this asset.")
-                    elif c_win < 50 and n_win >= 50:
-                        st.success(f"**Front-Running the Rotation:** Oversold and currently weak, but {n_name} historically brings strong inflows. Smart money may begin accumulating now.")
-                    elif c_win >= 50 and n_win < 50:
-                        st.warning(f"**Dead Cat Bounce Risk:** Oversold and currently supported, but severe seasonal headwinds hit in {n_name}. Keep a tight leash on any long trades.")
-                    else:
-                        st.error(f"**Falling Knife:** Oversold, but historical seasonality remains terrible through {n_name}. Wait for technical confirmation before trying to catch this.")
-                
-                else: # Neutral Z-Score (-2 to 2)
-                    if c_win >= 55 and n_win >= 55:
-                        st.success(f"**Sustained Tailwind:** Normal technical ranges, backed by strong seasonal inflows through {n_name}. Path of least resistance is up.")
-                    elif c_win < 45 and n_win < 45:
-                        st.error(f"**Sustained Headwind:** Normal technical ranges, but facing a multi-month seasonal slump through {n_name}. Capital is likely deploying elsewhere.")
-                    elif n_win > c_win + 10:
-                        st.info(f"**Forward-Looking Upgrade:** Currently neutral, but historical seasonality significantly improves next month ({n_name}). Watch for early capital inflows.")
-                    elif n_win < c_win - 10:
-                        st.warning(f"**Forward-Looking Downgrade:** Currently neutral, but historical seasonality drops off sharply in {n_name}. Upside may be capped soon.")
-                    else:
-                        st.info(f"**Holding Pattern:** {target_ticker} is trading within normal technical ranges with mixed historical seasonality. No clear rotation edge detected.")
+                level, bucket, message = engine.classify_rotation(z_score, c_win, n_win, target_ticker, n_name)
+                getattr(st, level)(f"**{bucket}:** {message}")
                     
             else:
                 st.error("Could not fetch data. Please check the ticker symbol and try again.")
+
+def render_rotation_scan():
+    col_input, col_info = st.columns([1, 2])
+    with col_input:
+        universe = st.selectbox("Universe", list(SCAN_UNIVERSES))
+        lookback = st.selectbox("Seasonality Lookback", list(seasonality.LOOKBACKS), index=1, key="scan_lookback")
+        extra_raw = st.text_area("Additional Tickers (comma separated)", "", help="Industry ETFs or index constituents to add to the scan.")
+        run_scan = st.button("🚀 Scan Universe")
+    with col_info:
+        st.info("💡 **How to read this:** Every symbol is scored with the same exhaustion z-score and forward seasonality as the single-ticker radar, then placed in the same synthesis bucket. Click a column header to sort.")
+
+    if run_scan:
+        tickers = SCAN_UNIVERSES[universe] + [t.strip().upper() for t in extra_raw.split(",") if t.strip()]
+        with st.spinner(f"Scanning {len(tickers)} symbols..."):
+            st.session_state["radar_scan"] = scan_rotation_universe(tuple(tickers), lookback)
+
+    scan = st.session_state.get("radar_scan")
+    if scan is not None:
+        if scan.empty:
+            st.error("Could not fetch data for this universe.")
+            return
+        _, c_name, _, n_name = engine.month_names()
+        table = scan.rename(columns={"curr_win": f"{c_name} Win %", "curr_avg": f"{c_name} Avg %", "next_win": f"{n_name} Win %", "next_avg": f"{n_name} Avg %"})
+        st.dataframe(table.style.format({c: "{:,.2f}" for c in table.columns if c != "Signal"}), use_container_width=True)
+        st.caption(f"{len(table)} symbols scored · " + " · ".join(f"{b}: {n}" for b, n in table["Signal"].value_counts().items()))
+
+def render_radar_sweep():
+    col_input, col_info = st.columns([1, 2])
+    with col_input:
+        universe = st.selectbox("Universe", list(SCAN_UNIVERSES), key="sweep_universe")
+        lookback = st.selectbox("Seasonality Lookback", list(seasonality.LOOKBACKS), index=1, key="sweep_lookback")
+        start_year = st.number_input("History From", min_value=1990, max_value=datetime.now().year - 6, value=int(radar_sweep.SWEEP_START[:4]))
+        use_pool = st.toggle("Use every CPU core", value=True, help="Spreads the grid over a process pool that shares one memory-mapped copy of the prices.")
+    with col_info:
+        st.info("💡 **How to read this:** Each combination of cut-offs re-buckets every trading day of every symbol. Score is the "
+                "average forward 1M / 2M return beyond the universe average, signed by the bucket's call (rotate in +, out −). "
+                "Seasonality is point-in-time: only years before each day count.")
+        g_cols = st.columns(len(engine.RADAR_PARAMS))
+        grid = {}
+        for col, (k, default) in zip(g_cols, radar_sweep.SWEEP_GRID.items()):
+            raw = col.text_input(k, ", ".join(f"{v:g}" for v in default), key=f"sweep_{k}")
+            try: grid[k] = [int(v) if k == "window" else float(v) for v in raw.split(",") if v.strip()]
+            except ValueError: col.error("Numbers only")
+    run_sweep = st.button("🧪 Run Threshold Sweep")
+
+    if run_sweep:
+        if any(not grid.get(k) for k in engine.RADAR_PARAMS):
+            st.error("⚠️ Give every parameter at least one value.")
+        else:
+            n = 1
+            for values in grid.values(): n *= len(values)
+            with st.spinner(f"Scoring {n:,} combinations..."):
+                try:
+                    st.session_state["radar_sweep"] = radar_sweep.load_sweep(
+                        SCAN_UNIVERSES[universe], f"{start_year}-01-01", grid, lookback, workers=(os.cpu_count() or 1) if use_pool else 0)
+                except Exception as e:
+                    st.error(f"Sweep Error: {str(e)}")
+
+    result = st.session_state.get("radar_sweep")
+    if result is not None:
+        pct = [c for c in result.columns if c.endswith("%") or c == "Score"]
+        st.dataframe(result.style.format({c: "{:.2f}" for c in pct}).apply(
+            lambda r: ["background-color: rgba(255, 215, 0, 0.25)" if r["Current"] else ""] * len(r), axis=1), use_container_width=True)
+        current = result.index[result["Current"]]
+        st.caption(f"{len(result):,} combinations. " + (f"The live settings rank #{current[0] + 1} (highlighted)." if len(current)
+                   else "The live settings are not in this grid.") + " Forward windows overlap, so compare scores rather than read them as returns.")
+
+# --- TAB DISPATCH (lazy: closed tabs are not executed) ---
+for tab, render in [(tab_terminal, render_terminal), (tab_lab, render_lab), (tab_rebalance, render_rebalance),
+                    (tab_architect, render_architect), (tab_rotation, render_rotation)]:
+    if tab.open:
+        with tab: render()
+
+# --- DIAGNOSTICS (rendered last so it sees every data call this rerun made) ---
+if show_diagnostics:
+    with diagnostics_panel: render_diagnostics(metrics.snapshot(this_run))
@@ -0,0 +1,139 @@
+"""Historical backtest of the six pillars and the Asset Class Scorecard.
+
+The terminal evaluates its rules for today only. Here every input the rules
+read (prices, SMAs, RSIs) is rebuilt as a daily series over decades of
+history in one vectorized pass, and the same rule tables from engine.py
+(PILLAR_RULES, SCORECARD_RULES) are evaluated on whole columns at once, so a
+backtest cannot drift from what the dashboard shows. `thresholds` overrides
+engine.THRESHOLDS to try other cut-offs.
+
+Dates follow the S&P 500 trading calendar. Each input is computed on its own
+trading days and then carried forward as-of that calendar, so crypto's
+weekend bars count towards its SMAs but signals are only read on equity
+days. A rule is undefined (None) on a day when any input it reads has no
+history yet, e.g. Crypto before BTC-USD has 200 days.
+
+Forward returns are read over FORWARD_HORIZONS trading days from each
+signal's asset (SIGNAL_ASSETS). They overlap from one day to the next, so
+per-state averages are descriptive, not independent samples.
+"""
+import metrics
+import engine
+from engine import PRICE_FIELDS, SMA_FIELDS, AVG_RSI_TICKERS, RSI_WINDOW, PILLAR_RULES, SCORECARD_RULES, THRESHOLDS
+
+BACKTEST_START = "1990-01-01"  # VIX history begins here
+CALENDAR_TICKER = "^GSPC"
+FORWARD_HORIZONS = {"1M": 21, "3M": 63, "6M": 126, "12M": 252}
+# Whose forward return a signal is judged on: pillars read the broad market, scorecard rows their own asset
+SIGNAL_ASSETS = {**{p: "^GSPC" for p in PILLAR_RULES},
+                 "Stocks": "^GSPC", "Bonds": "TLT", "Gold": "GC=F", "Crypto": "BTC-USD", "Real Estate": "XLRE"}
+BACKTEST_TICKERS = sorted(set(PRICE_FIELDS.values()) | {t for t, _ in SMA_FIELDS.values()} | set(AVG_RSI_TICKERS)
+                          | {"XLRE"} | set(SIGNAL_ASSETS.values()))
+
+
+class _Reads(dict):
+    # Stand-in quote that answers every field with 1.0 and remembers which ones a rule asked for
+    def __missing__(self, key):
+        self[key] = 1.0
+        return 1.0
+
+
+def _inputs(rule):
+    reads = _Reads()
+    rule(reads, THRESHOLDS)
+    return list(reads)
+
+
+def _asof(s, calendar):
+    return s.reindex(s.index.union(calendar)).ffill().reindex(calendar)
+
+
+@metrics.timed
+def rule_inputs(close):
+    """Every field engine.terminal_quotes produces, as a daily series (date x field) on the SPX calendar."""
+    import pandas as pd
+    close = close.astype(float)  # the store serves float32; sums over 200 days want the headroom
+    calendar = engine.close_series(close, CALENDAR_TICKER).index
+    if calendar.empty: raise engine.DataUnavailable(f"No {CALENDAR_TICKER} history to align the backtest on")
+    fields = {}
+    for field, t in PRICE_FIELDS.items():
+        fields[field] = _asof(engine.close_series(close, t), calendar)
+    for field, (t, w) in SMA_FIELDS.items():
+        fields[field] = _asof(engine.close_series(close, t).rolling(w).mean(), calendar)
+    rsis = {t: _asof(engine.rsi_history(engine.close_series(close, t).to_frame(), RSI_WINDOW).iloc[:, 0], calendar)
+            for t in sorted(set(AVG_RSI_TICKERS) | {"XLRE"})}
+    fields["avg_rsi"] = sum(rsis[t] for t in AVG_RSI_TICKERS) / len(AVG_RSI_TICKERS)  # undefined until all three exist
+    fields["xlre_rsi"] = rsis["XLRE"]
+    return pd.DataFrame(fields, index=calendar).astype(float)
+
+
+@metrics.timed
+def signal_states(fields, thresholds=None):
+    """Daily state of every pillar and scorecard rule (date x signal), None where an input is missing."""
+    import pandas as pd
+    q = {c: fields[c].to_numpy() for c in fields.columns}
+    states = pd.DataFrame({**engine.pillar_states(q, thresholds), **engine.scorecard(q, thresholds)}, index=fields.index)
+    for name, rule in {**PILLAR_RULES, **SCORECARD_RULES}.items():
+        states[name] = states[name].where(fields[_inputs(rule)].notna().all(axis=1), None)
+    return states
+
+
+def forward_returns(close, calendar, horizons=FORWARD_HORIZONS):
+    """{asset: date x horizon frame} of % returns over the next h trading days of `calendar`."""
+    import pandas as pd
+    out = {}
+    for t in sorted(set(SIGNAL_ASSETS.values())):
+        p = _asof(engine.close_series(close, t), calendar).astype(float)
+        out[t] = pd.DataFrame({h: (p.shift(-n) / p - 1) * 100 for h, n in horizons.items()})
+    return out
+
+
+@metrics.timed
+def signal_stats(states, fwd, horizons=FORWARD_HORIZONS):
+    """Per signal x state: time spent in it, how many separate episodes, and the asset's forward returns.
+
+    "edge" is the state's average forward return minus the average over every day the signal is defined.
+    """
+    import pandas as pd
+    rows = []
+    for name in states.columns:
+        s = states[name]
+        r = fwd[SIGNAL_ASSETS[name]]
+        defined = s.notna()
+        if not defined.any(): continue
+        episodes = (s != s.shift()) & defined
+        base = r[defined].mean()
+        grouped = r[defined].groupby(s[defined])
+        mean, hit, n = grouped.mean(), (r[defined] > 0).where(r[defined].notna()).groupby(s[defined]).mean() * 100, grouped.size()
+        for state, days in n.items():
+            row = {"Signal": name, "State": state, "Asset": SIGNAL_ASSETS[name], "Days": int(days),
+                   "Time %": days / defined.sum() * 100, "Episodes": int(episodes[s == state].sum()),
+                   "Since": s[defined].index[0].date()}
+            for h in horizons:
+                row[f"{h} Avg %"] = mean.loc[state, h]
+                row[f"{h} Hit %"] = hit.loc[state, h]
+                row[f"{h} Edge %"] = mean.loc[state, h] - base[h]
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+@metrics.timed
+def run(close, thresholds=None, horizons=FORWARD_HORIZONS):
+    """Backtest every pillar and scorecard rule over `close` (daily closes of BACKTEST_TICKERS).
+
+    Returns {"fields": inputs, "states": daily states, "stats": per-state summary, "transitions": state changes}.
+    """
+    fields = rule_inputs(close)
+    states = signal_states(fields, thresholds)
+    stats = signal_stats(states, forward_returns(close, fields.index, horizons), horizons)
+    changed = (states != states.shift()) & states.notna() & states.shift().notna()
+    transitions = states.where(changed).stack().dropna().rename("State").reset_index()
+    transitions.columns = ["Date", "Signal", "State"]
+    return {"fields": fields, "states": states, "stats": stats, "transitions": transitions}
+
+
+@metrics.timed
+def load_backtest(start=BACKTEST_START, end=None, thresholds=None):
+    close = engine.load_close(BACKTEST_TICKERS, start=start, end=end)
+    if close.empty: raise engine.DataUnavailable("No history for the backtest universe")
+    return run(close, thresholds)
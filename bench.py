@@ -0,0 +1,171 @@
+"""Reproducible performance benchmarks against recorded market data.
+
+    python bench.py record --fixtures fixtures/        # once, needs network
+    python bench.py run --fixtures fixtures/ --save baseline.json
+    python bench.py run --fixtures fixtures/ --baseline baseline.json
+
+`record` runs every scenario against the live endpoints through a
+RecordingProvider, capturing each price and feed response. `run` replays
+them with the network out of the picture. Every scenario starts cold (empty
+OHLCV store, cleared Streamlit caches, background warmer off) and reports
+wall time, provider calls (what would have been network requests) and peak
+Python memory. With --baseline, each metric is shown next to the saved run.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Must be set before the app modules read them
+os.environ["MARKET_AGENT_WARMER"] = "off"
+os.environ["MARKET_AGENT_CACHE_DIR"] = CACHE_DIR = tempfile.mkdtemp(prefix="market-bench-")  # wiped before every scenario
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+TABS = {
+    "tab:terminal": "🛡️ Multi-Asset Terminal",
+    "tab:lab": "📈 Portfolio Lab",
+    "tab:rebalance": "⚖️ Rebalance & Income",
+    "tab:architect": "🔬 Strategy Architect",
+    "tab:rotation": "🔄 Rotation Radar",
+}
+
+
+def _render_tab(label):
+    def run():
+        from streamlit.testing.v1 import AppTest
+        at = AppTest.from_file(APP, default_timeout=300)
+        at.session_state["active_tab"] = label
+        at.run()
+        if at.exception: raise RuntimeError(at.exception[0].value)
+    return run
+
+
+def _stress():
+    import engine
+    engine.load_stress_test({"XLE": 25, "QQQ": 25, "GLD": 25, "BND": 25}, "2020-01-01", None, "SPY")
+
+
+def _stress_batch():
+    import engine
+    engine.load_batch_stress_test()
+
+
+def _leaderboard():
+    import engine
+    engine.sector_leaderboard(engine.terminal_history())
+
+
+def _radar():
+    import engine
+    engine.load_technical_exhaustion("SMH")
+    engine.seasonal_profile("SMH", "10y")
+
+
+def _radar_scan():
+    import engine
+    engine.scan_rotation_universe(engine.SCAN_UNIVERSES["Sectors + Industry ETFs"])
+
+
+def _news():
+    import news
+    news.NewsFeedManager().refresh()
+
+
+SCENARIOS = {**{name: _render_tab(label) for name, label in TABS.items()},
+             "stress": _stress, "stress:batch": _stress_batch, "leaderboard": _leaderboard,
+             "radar": _radar, "radar:scan": _radar_scan, "news": _news}
+
+
+def _reset():
+    # Cold start: empty on-disk store, no in-process caches and no backoffs left over from the last scenario
+    import breaker
+    import ohlcv_store
+    import streamlit as st
+    shutil.rmtree(ohlcv_store.CACHE_DIR, ignore_errors=True)
+    ohlcv_store.CLOSE_CACHE.clear()
+    breaker.TICKERS.reset()
+    breaker.HOSTS.reset()
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+
+def measure(fn, provider):
+    _reset()
+    before = dict(provider.calls)
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fn()
+    wall = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    calls = {k: v - before.get(k, 0) for k, v in provider.calls.items()}
+    return {"wall_s": wall, "downloads": calls.get("download", 0), "feeds": calls.get("feed", 0), "peak_mb": peak / 2**20}
+
+
+def run_suite(provider, names, repeat, warmup=0):
+    results = {}
+    for name in names:
+        # Untimed runs first so lazy imports and first-use allocations are not charged to the scenario
+        for _ in range(warmup): measure(SCENARIOS[name], provider)
+        runs = [measure(SCENARIOS[name], provider) for _ in range(repeat)]
+        results[name] = {"wall_s": statistics.median(r["wall_s"] for r in runs),
+                         **{k: max(r[k] for r in runs) for k in ("downloads", "feeds", "peak_mb")}}
+        print(f"  {name:<16} {results[name]['wall_s']:7.2f}s", file=sys.stderr)
+    return results
+
+
+def report(results, baseline=None):
+    cols = ["wall_s", "downloads", "feeds", "peak_mb"]
+    lines = [f"{'scenario':<16}" + "".join(f"{c:>22}" for c in cols)]
+    for name, r in results.items():
+        cells = []
+        for c in cols:
+            cell = f"{r[c]:.2f}" if isinstance(r[c], float) else str(r[c])
+            base = (baseline or {}).get(name, {}).get(c)
+            if base is not None:
+                delta = f"{(r[c] - base) / base * 100:+.0f}%" if base else ("=" if r[c] == base else "new")
+                cell += f" ({base:.2f} {delta})" if isinstance(base, float) else f" ({base} {delta})"
+            cells.append(f"{cell:>22}")
+        lines.append(f"{name:<16}" + "".join(cells))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="bench.py", description=__doc__.split("\n\n")[0])
+    parser.add_argument("mode", choices=["record", "run"])
+    parser.add_argument("--fixtures", required=True, help="fixture directory (written by record, read by run)")
+    parser.add_argument("--only", nargs="+", choices=list(SCENARIOS), help="subset of scenarios")
+    parser.add_argument("--repeat", type=int, default=3, help="cold runs per scenario; wall time is the median")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed runs per scenario before measuring (replay only)")
+    parser.add_argument("--save", help="write results as JSON (e.g. a new baseline)")
+    parser.add_argument("--baseline", help="JSON from an earlier --save to compare against")
+    args = parser.parse_args(argv)
+
+    import providers
+    if args.mode == "record":
+        provider = providers.set_provider(providers.RecordingProvider(args.fixtures))
+        repeat, warmup = 1, 0
+    else:
+        provider = providers.set_provider(providers.ReplayProvider(args.fixtures))
+        repeat, warmup = args.repeat, args.warmup
+
+    results = run_suite(provider, args.only or list(SCENARIOS), repeat, warmup)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f: baseline = json.load(f)["results"]
+    print(report(results, baseline))
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"provider": provider.name, "fixtures": os.path.abspath(args.fixtures), "repeat": repeat,
+                       "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, f, indent=2)
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
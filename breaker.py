@@ -0,0 +1,79 @@
+"""Negative caching and circuit breaking for upstream symbols and hosts.
+
+A failed ticker or host is not retried for NEGATIVE_TTL seconds, so a typo or
+a delisted ETF costs one request rather than one per rerun. After
+TRIP_AFTER consecutive failures the breaker opens and the retry delay
+doubles with every further failure (BACKOFF_BASE up to BACKOFF_MAX). Once a
+delay runs out, one caller is let through as a probe: success closes the
+breaker, failure reopens it with a longer delay.
+
+Two process-wide breakers are kept: TICKERS (keyed by symbol) and HOSTS
+(keyed by host, e.g. the Yahoo Finance API or an RSS feed's domain).
+"""
+import os
+import threading
+import time
+
+NEGATIVE_TTL = float(os.environ.get("MARKET_AGENT_NEGATIVE_TTL", 120))
+TRIP_AFTER = 3
+BACKOFF_BASE = 300
+BACKOFF_MAX = 6 * 3600
+
+
+class CircuitBreaker:
+    def __init__(self, negative_ttl=NEGATIVE_TTL, trip_after=TRIP_AFTER, backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX):
+        self.negative_ttl = negative_ttl
+        self.trip_after = trip_after
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+        self._state = {}  # key -> {"failures", "until", "error"}
+
+    def _delay(self, failures):
+        if failures < self.trip_after: return self.negative_ttl
+        return min(self.backoff_base * 2 ** (failures - self.trip_after), self.backoff_max)
+
+    def allow(self, keys):
+        """Subset of `keys` that may hit upstream now; an expired entry is leased to one probe caller."""
+        now = time.time()
+        allowed = []
+        with self._lock:
+            for key in keys:
+                s = self._state.get(key)
+                if s is None:
+                    allowed.append(key)
+                elif now >= s["until"]:
+                    s["until"] = now + self.negative_ttl  # others keep getting the negative answer while the probe runs
+                    allowed.append(key)
+        return allowed
+
+    def blocked(self, key):
+        with self._lock:
+            s = self._state.get(key)
+            return s is not None and time.time() < s["until"]
+
+    def failure(self, key, error=None):
+        with self._lock:
+            s = self._state.setdefault(key, {"failures": 0, "until": 0.0, "error": None})
+            s["failures"] += 1
+            s["until"] = time.time() + self._delay(s["failures"])
+            s["error"] = str(error) if error is not None else s["error"]
+
+    def success(self, key):
+        with self._lock:
+            self._state.pop(key, None)
+
+    def reset(self, key=None):
+        with self._lock:
+            if key is None: self._state.clear()
+            else: self._state.pop(key, None)
+
+    def status(self):
+        now = time.time()
+        with self._lock:
+            return {k: {"failures": s["failures"], "open": s["failures"] >= self.trip_after,
+                        "retry_in": max(0.0, s["until"] - now), "error": s["error"]} for k, s in self._state.items()}
+
+
+TICKERS = CircuitBreaker()
+HOSTS = CircuitBreaker()
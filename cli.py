@@ -0,0 +1,377 @@
+"""Command-line entry point for the dashboard's computations.
+
+Runs the same engine functions as the Streamlit app without starting a
+server, for cron jobs and batch reports:
+
+    python cli.py terminal
+    python cli.py leaderboard
+    python cli.py lab
+    python cli.py stress --weights XLE=25,QQQ=25,GLD=25,BND=25 --regime "2022 Rate Hike Shock"
+    python cli.py stress --batch
+    python cli.py simulate --weights SPY=60,BND=40 --horizon 252 --paths 100000
+    python cli.py rebalance holdings.parquet --out trades.csv --default "60/40 Portfolio"
+    python cli.py backtest --start 1990-01-01 --set vix_heavy=25 --out states.csv
+    python cli.py corr --universe "Sectors + Industry ETFs" --start 2015-01-01 --out corr.csv
+    python cli.py radar SMH --lookback 10y
+    python cli.py scan --universe "Sectors + Industry ETFs"
+    python cli.py sweep --universe "Sectors + Industry ETFs" --z 1.5,2,2.5 --window 20,50,100
+    python cli.py watch --radar SMH,XLK,XLE --every 300 --sink alerts.jsonl
+
+Every command accepts --json for machine-readable output. Data-heavy modules
+are imported inside the command that needs them, so `--help` and argument
+errors return immediately.
+"""
+import argparse
+import json
+import sys
+
+
+def _frame(df, as_json):
+    if as_json: return json.loads(df.to_json(orient="index"))
+    return df.round(2).to_string()
+
+
+def cmd_terminal(args):
+    import engine
+    q = engine.terminal_quotes(engine.terminal_history())
+    pillars = engine.six_pillars(q)
+    scorecard = engine.scorecard(q)
+    if args.json:
+        return {"pillars": {p: {"state": s, "detail": d} for p, s, d in pillars}, "scorecard": scorecard,
+                "quotes": {k: v for k, v in q.items() if k != "cryptos"}, "cryptos": q["cryptos"]}
+    lines = ["6 PILLARS"] + [f"  {p:<12} {s:<12} {d}" for p, s, d in pillars]
+    lines += ["SCORECARD"] + [f"  {a:<12} {r}" for a, r in scorecard.items()]
+    lines += ["CRYPTO"] + [f"  {n:<16} ${c['price']:,.2f}  RSI {c['rsi']:.1f}" for n, c in q["cryptos"].items()]
+    return "\n".join(lines)
+
+
+def cmd_leaderboard(args):
+    import engine
+    *horizons, rsis, names = engine.sector_leaderboard(engine.terminal_history())
+    labels = ["Daily", "Weekly", "Monthly", "YTD"]
+    if args.json:
+        return {"rsi": rsis, "names": names, **{h: {"leaders": l, "laggards": g} for h, (l, g) in zip(labels, horizons)}}
+    lines = []
+    for h, (leaders, laggards) in zip(labels, horizons):
+        lines += [f"{h} Leaders"] + [f"  + {i}" for i in leaders] + [f"{h} Laggards"] + [f"  - {i}" for i in laggards]
+    return "\n".join(lines)
+
+
+def cmd_lab(args):
+    import engine
+    perf = engine.load_portfolio_performance()
+    if perf.empty: raise SystemExit("No price history for the portfolio universe.")
+    return _frame(perf.sort_values("YTD %", ascending=False), args.json)
+
+
+def _parse_weights(raw):
+    weights = {}
+    for pair in raw.split(","):
+        ticker, _, w = pair.partition("=")
+        weights[ticker.strip().upper()] = float(w)
+    if abs(sum(weights.values()) - 100) > 1e-9:
+        raise SystemExit(f"Weights must sum to 100% (got {sum(weights.values()):g}%).")
+    return weights
+
+
+def cmd_stress(args):
+    import engine
+    if args.batch:
+        strategies = {name: p["weights"] for name, p in engine.PORTFOLIOS.items()}
+        if args.weights: strategies["Your Strategy"] = {t: w / 100 for t, w in _parse_weights(args.weights).items()}
+        batch = engine.load_batch_stress_test(strategies)
+        if batch.empty: raise SystemExit("No historical data found for the batch universe.")
+        if args.json: return batch.to_dict(orient="records")
+        return _frame(batch.set_index(["Strategy", "Regime"]), False)
+
+    if not args.weights: raise SystemExit("--weights is required unless --batch is given.")
+    if args.regime:
+        if args.regime not in engine.REGIMES: raise SystemExit(f"Unknown regime. Choose from: {', '.join(engine.REGIMES)}")
+        start, end = engine.REGIMES[args.regime]["dates"]
+    else:
+        start, end = args.start, args.end
+    try: result = engine.load_stress_test(_parse_weights(args.weights), start, end, args.benchmark)
+    except engine.DataUnavailable as e: raise SystemExit(str(e))
+    if result is None: raise SystemExit("No historical data found for these tickers.")
+    metrics = {k: float(v) for k, v in result["metrics"].items()}
+    if args.json: return {"start": str(start), "end": str(end), "metrics": metrics, "asset_perf": {t: float(v) for t, v in result["asset_perf"].items()}}
+    return "\n".join(f"{k:<16} {v:+.2f}" for k, v in metrics.items())
+
+
+def cmd_simulate(args):
+    import engine
+    import simulation
+    weights = _parse_weights(args.weights)
+    if args.regime:
+        if args.regime not in engine.REGIMES: raise SystemExit(f"Unknown regime. Choose from: {', '.join(engine.REGIMES)}")
+        start, end = engine.REGIMES[args.regime]["dates"]
+    else:
+        start, end = args.start, args.end
+    try: hist = engine.load_stress_test(weights, start, end)
+    except engine.DataUnavailable as e: raise SystemExit(str(e))
+    if hist is None: raise SystemExit("No historical data found for these tickers.")
+    tickers = list(weights)
+    try:
+        sim = simulation.simulate(hist["returns"][tickers], [weights[t] / 100 for t in tickers], horizon=args.horizon,
+                                  n_paths=args.paths, method=args.method, block=args.block, seed=args.seed, workers=args.workers)
+    except ValueError as e: raise SystemExit(str(e))
+    summary = {"terminal": {f"p{p}": float(v) for p, v in sim["terminal_bands"].items()},
+               "max_drawdown": {f"p{p}": float(v) for p, v in sim["max_dd_bands"].items()},
+               "p_loss": sim["p_loss"]}
+    if args.json: return {"start": str(start), "end": str(end), "horizon": args.horizon, "paths": args.paths, "method": args.method, **summary}
+    lines = [f"{args.paths:,} paths x {args.horizon} days ({args.method}, history {start} to {end or 'today'}), start = 100"]
+    lines += [f"  P{p:<3} ending {sim['terminal_bands'][p]:8.2f}   max drawdown {sim['max_dd_bands'][p]:+7.2f}%" for p in simulation.PERCENTILES]
+    lines.append(f"  probability of loss {sim['p_loss'] * 100:.1f}%")
+    return "\n".join(lines)
+
+
+def cmd_rebalance(args):
+    import pandas as pd
+    import rebalance
+    strategies = None
+    if args.map:
+        mapping = pd.read_parquet(args.map) if args.map.lower().endswith(".parquet") else pd.read_csv(args.map, dtype=str)
+        strategies = dict(zip(mapping["account"].astype(str), mapping["strategy"]))
+    try:
+        summary = rebalance.write_trades(args.holdings, args.out, strategies=strategies, default=args.default,
+                                         min_trade=args.min_trade, include_balanced=args.all)
+    except (OSError, ValueError) as e: raise SystemExit(str(e))
+    if args.json: return {"out": args.out, **summary}
+    lines = [f"{summary['accounts']:,} accounts, {summary['holdings']:,} holdings -> {summary['trades']:,} trades written to {args.out}",
+             f"  buys  ${summary['buy_total']:,.2f}", f"  sells ${summary['sell_total']:,.2f}",
+             f"  largest drift {summary['max_abs_drift'] * 100:.1f} pts",
+             f"  est. annual income ${summary['est_annual_income']:,.2f} (${summary['est_annual_income'] / 12:,.2f} / month)"]
+    lines += [f"  skipped {n:,} account(s): {reason}" for reason, n in summary["skipped"].items()]
+    return "\n".join(lines)
+
+
+def cmd_backtest(args):
+    import engine
+    import backtest
+    thresholds = {}
+    for pair in args.set or []:
+        key, _, value = pair.partition("=")
+        if key not in engine.THRESHOLDS: raise SystemExit(f"Unknown threshold {key!r}; expected one of {', '.join(engine.THRESHOLDS)}")
+        try: thresholds[key] = float(value)
+        except ValueError: raise SystemExit(f"Bad value in {pair!r}; use NAME=NUMBER")
+    res = backtest.load_backtest(args.start, args.end, thresholds)
+    stats = res["stats"]
+    if args.signal: stats = stats[stats["Signal"].isin(args.signal)]
+    if args.out: res["states"].to_csv(args.out)
+    if args.json:
+        return {"thresholds": {**engine.THRESHOLDS, **thresholds}, "stats": stats.to_dict(orient="records"),
+                "current": res["states"].iloc[-1].to_dict(), "states": args.out}
+    horizon = args.horizon
+    cols = ["Asset", "Days", "Time %", "Episodes", f"{horizon} Avg %", f"{horizon} Hit %", f"{horizon} Edge %"]
+    lines = [f"{res['states'].index[0]:%Y-%m-%d} to {res['states'].index[-1]:%Y-%m-%d}, forward returns over {horizon}"]
+    lines.append(_frame(stats.set_index(["Signal", "State"])[cols], False))
+    if args.out: lines.append(f"daily states written to {args.out}")
+    return "\n".join(lines)
+
+
+def cmd_corr(args):
+    import engine
+    tickers = list(engine.SCAN_UNIVERSES[args.universe]) if args.universe else []
+    tickers += [t.strip().upper() for t in (args.tickers or "").split(",") if t.strip()]
+    if len(tickers) < 2: raise SystemExit("Need at least two tickers: pass --universe and/or --tickers.")
+    corr = engine.load_correlation(list(dict.fromkeys(tickers)), args.start, args.end, args.shrinkage)
+    if corr is None: raise SystemExit("No price history for these tickers.")
+    order, clusters = engine.correlation_clusters(corr, args.min_corr)
+    corr = corr.loc[order, order]
+    if args.out: corr.round(3).to_csv(args.out)
+    groups = {int(n): list(members.index) for n, members in clusters.groupby(clusters)}
+    if args.json: return {"order": order, "clusters": groups, "matrix": args.out}
+    lines = [f"{len(order)} tickers in {len(groups)} clusters (average correlation >= {args.min_corr:g})"]
+    lines += [f"  C{n:<3} {', '.join(members)}" for n, members in groups.items()]
+    if args.out: lines.append(f"matrix written to {args.out}")
+    return "\n".join(lines)
+
+
+def cmd_radar(args):
+    import engine
+    ticker = args.ticker.upper()
+    exhaustion = engine.load_technical_exhaustion(ticker)
+    season = engine.seasonal_profile(ticker, args.lookback)
+    if not (exhaustion and season): raise SystemExit(f"Could not fetch data for {ticker}.")
+    price, sma, z = exhaustion
+    level, bucket, message = engine.classify_rotation(z, season["curr_win"], season["next_win"], ticker, season["next_name"])
+    if args.json:
+        return {"ticker": ticker, "price": price, "sma_50": sma, "z_score": z, "seasonality": season,
+                "level": level, "signal": bucket, "message": message}
+    return "\n".join([
+        f"{ticker}  ${price:,.2f}  50-SMA ${sma:,.2f}  Z {z:+.2f}",
+        f"{season['curr_name']}: win {season['curr_win']:.0f}%  avg {season['curr_avg']:+.2f}%   "
+        f"{season['next_name']}: win {season['next_win']:.0f}%  avg {season['next_avg']:+.2f}%  ({season['years']} yrs, {args.lookback})",
+        f"{bucket}: {message}",
+    ])
+
+
+def cmd_scan(args):
+    import engine
+    tickers = list(engine.SCAN_UNIVERSES[args.universe]) if args.universe else []
+    tickers += [t.strip().upper() for t in (args.tickers or "").split(",") if t.strip()]
+    if not tickers: raise SystemExit("Nothing to scan: pass --universe and/or --tickers.")
+    scan = engine.scan_rotation_universe(tickers, args.lookback)
+    if scan.empty: raise SystemExit("Could not fetch data for this universe.")
+    return _frame(scan, args.json)
+
+
+def cmd_sweep(args):
+    import os
+    import engine
+    import radar_sweep
+    tickers = list(engine.SCAN_UNIVERSES[args.universe]) if args.universe else []
+    tickers += [t.strip().upper() for t in (args.tickers or "").split(",") if t.strip()]
+    if not tickers: raise SystemExit("Nothing to sweep: pass --universe and/or --tickers.")
+    grid = dict(radar_sweep.SWEEP_GRID)
+    for k in grid:
+        raw = getattr(args, k)
+        if raw: grid[k] = [int(v) if k == "window" else float(v) for v in raw.split(",") if v.strip()]
+    workers = args.workers if args.workers is not None else os.cpu_count() or 1
+    result = radar_sweep.load_sweep(list(dict.fromkeys(tickers)), args.start, grid, args.lookback, workers)
+    if args.out: result.to_csv(args.out, index=False)
+    if args.json: return {"grid": grid, "results": result.head(args.top).to_dict(orient="records"), "out": args.out}
+    lines = [f"{len(result):,} combinations over {len(tickers)} tickers since {args.start}; best first"]
+    lines.append(result.head(args.top).round(3).to_string(index=False))
+    current = result.index[result["Current"]]
+    if len(current): lines.append(f"live settings rank #{current[0] + 1}")
+    if args.out: lines.append(f"all combinations written to {args.out}")
+    return "\n".join(lines)
+
+
+def _tickers(raw):
+    return [t.strip().upper() for t in raw.split(",") if t.strip()] if raw.lower() != "none" else []
+
+
+def cmd_watch(args):
+    import watcher
+    watchlist = {}
+    if args.watchlist:
+        with open(args.watchlist) as f: watchlist.update(json.load(f))
+    if args.no_terminal: watchlist["terminal"] = False
+    if args.sectors is not None: watchlist["sectors"] = _tickers(args.sectors)
+    if args.radar is not None: watchlist["radar"] = _tickers(args.radar)
+    if args.rsi_low is not None: watchlist["rsi_low"] = args.rsi_low
+    if args.rsi_high is not None: watchlist["rsi_high"] = args.rsi_high
+    w = watcher.Watcher(watchlist, watcher.make_sink(args.sink), args.state or watcher.STATE_PATH)
+    if args.once:
+        events = w.tick()
+        if args.json: return {"events": events, "signals": w.state["states"]}
+        return f"{len(w.state['states'])} signals checked, {len(events)} transition(s)"
+    try: w.run(args.every)
+    except KeyboardInterrupt: w.stop()
+    if args.json: return {"stopped": True, "error": w.error}
+    return f"watcher stopped (last tick failed: {w.error})" if w.error else "watcher stopped"
+
+
+def build_parser():
+    # Choices are literal here so building the parser never imports the engine's dependencies
+    parser = argparse.ArgumentParser(prog="cli.py", description="Multi-Asset Terminal computations without the Streamlit UI.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--json", action="store_true", help="print JSON instead of a text report")
+
+    sub.add_parser("terminal", parents=[common], help="six pillars, asset scorecard and crypto panel").set_defaults(func=cmd_terminal)
+    sub.add_parser("leaderboard", parents=[common], help="sector leaders / laggards and RSI").set_defaults(func=cmd_leaderboard)
+    sub.add_parser("lab", parents=[common], help="Portfolio Lab returns for every preset portfolio").set_defaults(func=cmd_lab)
+
+    p = sub.add_parser("stress", parents=[common], help="stress test a custom strategy, or every portfolio x regime with --batch")
+    p.add_argument("--weights", help="TICKER=PCT pairs summing to 100, e.g. XLE=25,QQQ=25,GLD=25,BND=25")
+    p.add_argument("--regime", help="preset historical regime name (overrides --start/--end)")
+    p.add_argument("--start", default="2020-01-01")
+    p.add_argument("--end", default=None)
+    p.add_argument("--benchmark", help="benchmark ticker, e.g. SPY")
+    p.add_argument("--batch", action="store_true", help="run every preset portfolio (plus --weights, if given) through every regime")
+    p.set_defaults(func=cmd_stress)
+
+    p = sub.add_parser("simulate", parents=[common], help="Monte Carlo forward simulation of a custom strategy")
+    p.add_argument("--weights", required=True, help="TICKER=PCT pairs summing to 100")
+    p.add_argument("--regime", help="sample history from a preset regime (overrides --start/--end)")
+    p.add_argument("--start", default="2015-01-01")
+    p.add_argument("--end", default=None)
+    p.add_argument("--horizon", type=int, default=252, help="trading days to simulate (default 252 = 1 year)")
+    p.add_argument("--paths", type=int, default=10_000)
+    p.add_argument("--method", default="bootstrap", choices=["bootstrap", "normal"])
+    p.add_argument("--block", type=int, default=20, help="bootstrap block length in days")
+    p.add_argument("--seed", type=int, default=None)
+    p.add_argument("--workers", type=int, default=0, help="process pool size (0 = run in-process)")
+    p.set_defaults(func=cmd_simulate)
+
+    p = sub.add_parser("rebalance", parents=[common], help="bulk rebalance every account in a holdings file")
+    p.add_argument("holdings", help="CSV or Parquet with account, ticker, value and optionally strategy columns, grouped by account")
+    p.add_argument("--out", required=True, help="trade list to write (.csv or .parquet)")
+    p.add_argument("--map", help="CSV or Parquet of account, strategy pairs; overrides the holdings file's strategy column")
+    p.add_argument("--default", help="strategy for accounts with none, e.g. \"60/40 Portfolio\" (otherwise they are skipped)")
+    p.add_argument("--min-trade", type=float, default=1.0, help="smallest $ difference worth trading")
+    p.add_argument("--all", action="store_true", help="also write BALANCED rows, not only trades")
+    p.set_defaults(func=cmd_rebalance)
+
+    p = sub.add_parser("backtest", parents=[common], help="six pillars and scorecard rules over history, with forward returns per state")
+    p.add_argument("--start", default="1990-01-01")
+    p.add_argument("--end", default=None)
+    p.add_argument("--set", action="append", metavar="NAME=VALUE", help="override a rule threshold, e.g. vix_heavy=25 (repeatable)")
+    p.add_argument("--signal", action="append", help="only report this pillar / asset (repeatable)")
+    p.add_argument("--horizon", default="3M", choices=["1M", "3M", "6M", "12M"], help="forward return shown in the text report")
+    p.add_argument("--out", help="write the daily state of every signal to this CSV")
+    p.set_defaults(func=cmd_backtest)
+
+    p = sub.add_parser("corr", parents=[common], help="pairwise correlation matrix and hierarchical clusters for a ticker set")
+    p.add_argument("--universe", choices=["SPDR Sectors (11)", "Sectors + Industry ETFs"])
+    p.add_argument("--tickers", help="extra comma-separated tickers")
+    p.add_argument("--start", default="2015-01-01")
+    p.add_argument("--end", default=None)
+    p.add_argument("--shrinkage", type=float, default=0.0, help="0-1, pull toward the average correlation")
+    p.add_argument("--min-corr", type=float, default=0.5, help="average correlation that holds a cluster together")
+    p.add_argument("--out", help="write the reordered matrix to this CSV")
+    p.set_defaults(func=cmd_corr)
+
+    p = sub.add_parser("radar", parents=[common], help="exhaustion z-score and seasonality for one ticker")
+    p.add_argument("ticker")
+    p.add_argument("--lookback", default="10y", choices=["5y", "10y", "20y"])
+    p.set_defaults(func=cmd_radar)
+
+    p = sub.add_parser("scan", parents=[common], help="rotation radar over a whole universe")
+    p.add_argument("--universe", choices=["SPDR Sectors (11)", "Sectors + Industry ETFs"])
+    p.add_argument("--tickers", help="extra comma-separated tickers")
+    p.add_argument("--lookback", default="10y", choices=["5y", "10y", "20y"])
+    p.set_defaults(func=cmd_scan)
+
+    p = sub.add_parser("sweep", parents=[common], help="score a grid of rotation radar cut-offs by forward 1M / 2M returns")
+    p.add_argument("--universe", choices=["SPDR Sectors (11)", "Sectors + Industry ETFs"])
+    p.add_argument("--tickers", help="extra comma-separated tickers")
+    p.add_argument("--start", default="1999-01-01")
+    p.add_argument("--lookback", default="10y", choices=["5y", "10y", "20y"])
+    p.add_argument("--z", help="comma-separated z-score cut-offs (default 1.5,2,2.5)")
+    p.add_argument("--window", help="comma-separated z-score windows in days (default 20,50,100)")
+    p.add_argument("--win-split", dest="win_split", help="comma-separated seasonal win %% splits (default 45,50,55)")
+    p.add_argument("--win-band", dest="win_band", help="comma-separated win %% bands for 'sustained' (default 5,10)")
+    p.add_argument("--swing", help="comma-separated month-over-month win %% swings (default 5,10,15)")
+    p.add_argument("--workers", type=int, default=None, help="process pool size (default: every CPU core; 0 = in-process)")
+    p.add_argument("--top", type=int, default=15, help="rows in the report")
+    p.add_argument("--out", help="write every combination to this CSV")
+    p.set_defaults(func=cmd_sweep)
+
+    p = sub.add_parser("watch", parents=[common], help="emit an event whenever a pillar, rating, sector RSI band or radar bucket changes")
+    p.add_argument("--watchlist", help="JSON file with any of: terminal, sectors, radar, rsi_low, rsi_high, lookback")
+    p.add_argument("--sectors", help="comma-separated tickers for RSI band alerts (default: the SPDR sectors; 'none' to skip)")
+    p.add_argument("--radar", help="comma-separated tickers for radar bucket alerts (default: the SPDR sectors; 'none' to skip)")
+    p.add_argument("--no-terminal", action="store_true", help="skip the six pillars and the scorecard")
+    p.add_argument("--rsi-low", type=float, default=None)
+    p.add_argument("--rsi-high", type=float, default=None)
+    p.add_argument("--every", type=float, default=300, help="seconds between checks")
+    p.add_argument("--once", action="store_true", help="check once and exit (for cron)")
+    p.add_argument("--sink", default="-", help="'-' for stdout, a file to append JSON lines to, or an http(s) webhook URL")
+    p.add_argument("--state", help="state file (default: watcher_state.json in the cache directory)")
+    p.set_defaults(func=cmd_watch)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    out = args.func(args)
+    print(json.dumps(out, indent=2, default=str) if args.json else out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
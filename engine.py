@@ -0,0 +1,817 @@
+"""Headless compute core shared by the dashboard, the CLI and batch jobs.
+
+Everything here is plain functions over price frames: indicators, the
+six-pillar overlay, the asset scorecard, the sector leaderboard, Portfolio
+Lab returns, stress-test metrics and the rotation radar. Nothing imports
+Streamlit, and pandas / numpy / the OHLCV store (and with it yfinance) are
+imported inside the functions that need them, so importing this module and
+reading the config tables below costs only the standard library.
+
+`load_*` helpers fetch from the local OHLCV store; the other functions take
+frames that are already in memory.
+"""
+from datetime import datetime
+import metrics
+
+# --- PORTFOLIO DEFINITIONS (Updated with Historical, Regime & Yield Data) ---
+PORTFOLIOS = {
+    "All-Weather (Dalio)": {
+        "weights": {"VTI": 0.30, "TLT": 0.40, "IEF": 0.15, "GLD": 0.075, "DBC": 0.075},
+        "hist_ret": "6.0%", "stag_pot": "High", "est_yield": 2.1
+    },
+    "60/40 Portfolio": {
+        "weights": {"VTI": 0.60, "BND": 0.40},
+        "hist_ret": "8.4%", "stag_pot": "Low", "est_yield": 2.8
+    },
+    "Fugger Portfolio": {
+        "weights": {"VTI": 0.25, "VNQ": 0.25, "BND": 0.25, "GLD": 0.25},
+        "hist_ret": "6.1%", "stag_pot": "High", "est_yield": 2.4
+    },
+    "Permanent Portfolio": {
+        "weights": {"VTI": 0.25, "TLT": 0.25, "BIL": 0.25, "GLD": 0.25},
+        "hist_ret": "5.9%", "stag_pot": "High", "est_yield": 2.2
+    },
+    "Golden Butterfly": {
+        "weights": {"VTI": 0.20, "IJS": 0.20, "TLT": 0.20, "SHV": 0.20, "GLD": 0.20},
+        "hist_ret": "7.2%", "stag_pot": "High", "est_yield": 2.3
+    },
+    "Three-Fund": {
+        "weights": {"VTI": 0.34, "VXUS": 0.33, "BND": 0.33},
+        "hist_ret": "8.9%", "stag_pot": "Low", "est_yield": 2.6
+    },
+    "Coffeehouse": {
+        "weights": {"VOO": 0.10, "IJS": 0.10, "IJV": 0.10, "VEA": 0.10, "VNQ": 0.10, "VIG": 0.10, "AGG": 0.40},
+        "hist_ret": "8.2%", "stag_pot": "Low-Mod", "est_yield": 2.9
+    },
+    "Ivy League (Swensen)": {
+        "weights": {"VTI": 0.30, "VEA": 0.15, "VWO": 0.05, "VNQ": 0.20, "IEF": 0.15, "TIP": 0.15},
+        "hist_ret": "7.5%", "stag_pot": "Moderate", "est_yield": 3.1
+    },
+    "Warren Buffett": {
+        "weights": {"VOO": 0.90, "BIL": 0.10},
+        "hist_ret": "11.2%", "stag_pot": "Low", "est_yield": 1.7
+    },
+    "Global Asset Allocation": {
+        "weights": {"VTI": 0.18, "VEA": 0.135, "VWO": 0.045, "LQD": 0.18, "TLT": 0.18, "GLD": 0.10, "DBC": 0.10, "VNQ": 0.08},
+        "hist_ret": "7.8%", "stag_pot": "Moderate", "est_yield": 2.5
+    }
+}
+
+# --- HISTORICAL STRESS REGIMES ---
+REGIMES = {
+    "2008 Housing Crisis": {
+        "dates": ("2007-10-01", "2009-03-09"),
+        "summary": "The Great Recession triggered by the housing collapse. S&P 500 fell ~50%."
+    },
+    "2020 COVID Crash": {
+        "dates": ("2020-02-19", "2020-03-23"),
+        "summary": "Swift bear market due to global lockdowns. Market bottomed after Fed intervention."
+    },
+    "2022 Rate Hike Shock": {
+        "dates": ("2022-01-01", "2022-12-31"),
+        "summary": "Stocks and bonds crashed as the Fed fought 40-year high inflation."
+    },
+    "Bull Market Run (Recent)": {
+        "dates": ("2023-01-01", datetime.now().strftime("%Y-%m-%d")),
+        "summary": "Defined by the AI Revolution. Tech led most of the gains."
+    }
+}
+
+
+
+# --- TERMINAL UNIVERSE ---
+SECTORS = {"XLC": "Comm Services", "XLY": "Consumer Disc", "XLP": "Consumer Staples", "XLE": "Energy", "XLF": "Financials", "XLV": "Health Care", "XLI": "Industrials", "XLB": "Materials", "XLRE": "Real Estate", "XLK": "Technology", "XLU": "Utilities"}
+CRYPTOS = {"Bitcoin (BTC)": "BTC-USD", "Ethereum (ETH)": "ETH-USD", "Solana (SOL)": "SOL-USD"}
+TERMINAL_TICKERS = sorted(set(
+    ["^GSPC", "QQQ", "VXUS", "^VIX", "^TNX", "^IRX", "DX-Y.NYB", "GC=F", "DBC", "TLT"]
+    + list(CRYPTOS.values()) + list(SECTORS.keys())
+))
+TERMINAL_PERIOD = "2y"  # longest window any terminal indicator needs (200D SMA)
+
+# --- PORTFOLIO LAB UNIVERSE ---
+ALL_P_TICKERS = sorted(set([t for p in PORTFOLIOS.values() for t in p["weights"].keys()]))
+LAB_HISTORY_START = "2008-01-01"
+LAB_HORIZONS = {"1M %": 1, "3M %": 3, "1Y %": 12, "3Y %": 36}  # trailing months
+
+# --- ROTATION RADAR UNIVERSE ---
+INDUSTRY_ETFS = ["SMH", "SOXX", "IGV", "HACK", "CIBR", "FDN", "SKYY", "BOTZ", "XBI", "IBB", "IHI", "XPH", "KRE", "KBE", "KIE", "IAI",
+                 "XHB", "ITB", "XRT", "IYT", "JETS", "ITA", "PAVE", "XME", "COPX", "LIT", "URA", "GDX", "GDXJ", "SIL", "XOP",
+                 "OIH", "TAN", "ICLN", "VNQ", "REM", "KWEB", "ARKK", "MOO", "WOOD"]
+SCAN_UNIVERSES = {"SPDR Sectors (11)": list(SECTORS), "Sectors + Industry ETFs": list(SECTORS) + INDUSTRY_ETFS}
+SCAN_CHUNK = 50
+
+
+# --- DATA ACCESS ---
+class DataUnavailable(LookupError):
+    """No usable price history for a request; raised so callers don't cache an empty result as a real one."""
+
+
+def missing_tickers(close, tickers):
+    # Requested symbols the store could not serve (failed, or skipped by the circuit breaker)
+    return [t for t in tickers if t not in close.columns or close[t].dropna().empty]
+
+
+@metrics.timed
+def load_close(tickers, **kwargs):
+    # float32 Close prices (date x ticker), shared through the OHLCV store's in-memory LRU; kwargs as for get_close
+    import ohlcv_store
+    return ohlcv_store.get_close(tickers, **kwargs)
+
+
+@metrics.timed
+def load_close_parallel(tickers, chunk=SCAN_CHUNK, max_workers=8, **kwargs):
+    # Large universes: one bulk request per chunk, chunks fetched concurrently
+    from concurrent.futures import ThreadPoolExecutor
+    import pandas as pd
+    tickers = list(dict.fromkeys(tickers))
+    chunks = [tickers[i:i + chunk] for i in range(0, len(tickers), chunk)]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks) or 1)) as pool:
+        frames = [f for f in pool.map(metrics.propagate(lambda c: load_close(c, **kwargs)), chunks) if not f.empty]
+    if not frames: return pd.DataFrame()
+    close = pd.concat(frames, axis=1).dropna(how="all")
+    return close.loc[:, ~close.columns.duplicated()]
+
+
+def terminal_history():
+    return load_close(TERMINAL_TICKERS, period=TERMINAL_PERIOD)
+
+
+def seasonality_index():
+    import seasonality
+    return seasonality.SeasonalityIndex()
+
+
+# --- INDICATORS (derived from an in-memory close frame) ---
+def close_series(close, ticker):
+    import pandas as pd
+    if ticker not in close.columns: return pd.Series(dtype=float)
+    # Crypto trades on weekends, so each column is trimmed to its own trading days.
+    return close[ticker].dropna()
+
+
+def last_price(close, ticker):
+    s = close_series(close, ticker)
+    return float(s.iloc[-1]) if not s.empty else 0.0
+
+
+def rsi_history(df, window=14):
+    # Column-wise RSI on every row (NaN until a full window); simple moving averages of gains and losses.
+    # A window with no movement at all reads 50, as it does on the terminal.
+    delta = df.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
+    rs = gain / loss
+    rsi = 100 - (100 / (1 + rs))
+    return rsi.mask(rsi.isna() & gain.notna() & loss.notna(), 50.0)
+
+
+def rsi_frame(df, window=14):
+    # Column-wise RSI: one vectorized pass over every ticker in the frame, latest value per column
+    import pandas as pd
+    rsi = rsi_history(df, window)
+    return rsi.iloc[-1].fillna(50.0) if not rsi.empty else pd.Series(50.0, index=df.columns)
+
+
+@metrics.timed
+def rsi(close, ticker, period="1d", window=14):
+    try:
+        s = close_series(close, ticker)
+        if period != "1d": s = s.resample("W").last()
+        return float(rsi_frame(s.to_frame(), window).iloc[0])
+    except Exception as e:
+        metrics.swallowed("engine.rsi", e)
+        return 50.0
+
+
+@metrics.timed
+def sma(close, ticker, window):
+    s = close_series(close, ticker)
+    return float(s.rolling(window=window).mean().iloc[-1]) if len(s) >= window else 0.0
+
+
+# --- TERMINAL STATE: PRICES, SIX PILLARS, SCORECARD ---
+# Every value the terminal tab displays or rates, keyed by the names the dashboard has always used
+PRICE_FIELDS = {"spx_now": "^GSPC", "qqq_now": "QQQ", "vxus_now": "VXUS", "vix_now": "^VIX", "tnx_now": "^TNX", "short_rate": "^IRX",
+                "dxy_now": "DX-Y.NYB", "btc_now": "BTC-USD", "gold_now": "GC=F", "dbc_now": "DBC", "xlb_now": "XLB",
+                "tlt_now": "TLT", "xlre_now": "XLRE"}
+SMA_FIELDS = {"sma_200d": ("^GSPC", 200), "sma_20d": ("^GSPC", 20),  # 20D: fast trend for breakdown confirmation
+              "tnx_200ma": ("^TNX", 200), "btc_200ma": ("BTC-USD", 200), "tlt_200ma": ("TLT", 200),
+              "xlre_200ma": ("XLRE", 200), "xlre_20ma": ("XLRE", 20), "gold_50ma": ("GC=F", 50), "gold_200ma": ("GC=F", 200)}
+AVG_RSI_TICKERS = ["^GSPC", "QQQ", "VXUS"]
+RSI_WINDOW = 14
+LIVE_TICKERS = sorted(set(PRICE_FIELDS.values()) | set(CRYPTOS.values()))  # everything the live overlay re-prices
+
+
+@metrics.timed
+def terminal_quotes(close):
+    q = {field: last_price(close, t) for field, t in PRICE_FIELDS.items()}
+    q.update({field: sma(close, t, w) for field, (t, w) in SMA_FIELDS.items()})
+    q["avg_rsi"] = sum(rsi(close, t) for t in AVG_RSI_TICKERS) / len(AVG_RSI_TICKERS)
+    q["xlre_rsi"] = rsi(close, "XLRE")
+    q["cryptos"] = {name: {"price": last_price(close, t), "rsi": rsi(close, t, "1d")} for name, t in CRYPTOS.items()}
+    q["missing"] = missing_tickers(close, TERMINAL_TICKERS)  # these read as 0.0 / RSI 50 above
+    return q
+
+
+def live_anchors(close, tickers=None):
+    """Per-ticker running sums that let live_quotes move every SMA and RSI in O(1) per new price.
+
+    For a w-day SMA: the window sum, plus the bar that drops out when a new day is appended.
+    For the 14-day RSI: the gain / loss sums and the deltas that leave them. These are plain window sums,
+    matching rsi_history's simple averages, not Wilder smoothing.
+    For the radar z-score: sum and sum of squares over its window, taken around the last close so the
+    variance keeps its precision.
+    """
+    anchors = {}
+    windows = sorted({w for _, w in SMA_FIELDS.values()})
+    zw = RADAR_PARAMS["window"]
+    for t in tickers or LIVE_TICKERS:
+        v = close_series(close, t).to_numpy(dtype=float)
+        if len(v) < 2: continue
+        d = v[1:] - v[:-1]
+        a = {"date": close_series(close, t).index[-1], "last": v[-1], "prev": v[-2], "sma": {}, "rsi": None}
+        for w in windows:
+            if len(v) >= w: a["sma"][w] = {"sum": float(v[-w:].sum()), "first": float(v[-w])}
+        if len(d) >= RSI_WINDOW:
+            tail = d[-RSI_WINDOW:]
+            a["rsi"] = {"gain": float(tail[tail > 0].sum()), "loss": float(-tail[tail < 0].sum()), "first": float(tail[0]), "last": float(tail[-1])}
+        if len(v) >= zw:
+            dev = v[-zw:] - v[-1]
+            a["z"] = {"window": zw, "ref": float(v[-1]), "sum": float(dev.sum()), "sumsq": float((dev * dev).sum()), "first": float(v[-zw])}
+        anchors[t] = a
+    return anchors
+
+
+def _rsi_from_sums(gain, loss):
+    # Same convention as rsi_frame: no losses -> 100, no movement at all -> 50
+    if loss <= 0: return 100.0 if gain > 0 else 50.0
+    return 100 - 100 / (1 + gain / loss)
+
+
+def _same_day(a, ts):
+    # `price` stamped `ts` replaces the last stored bar when that bar is from the same day (a partial
+    # intraday bar); otherwise it is appended as a new day
+    return ts is not None and ts.normalize() == a["date"].normalize()
+
+
+def _live_indicators(a, price, ts):
+    # -> ({window: sma}, rsi) with `price` as today's bar
+    same_day = _same_day(a, ts)
+    smas = {}
+    for w, s in a["sma"].items():
+        out = a["last"] if same_day else s["first"]
+        smas[w] = (s["sum"] - out + price) / w
+    rsi_value = None
+    if a["rsi"] is not None:
+        r = a["rsi"]
+        old, new = (r["last"], price - a["prev"]) if same_day else (r["first"], price - a["last"])
+        gain = r["gain"] - max(old, 0) + max(new, 0)
+        loss = r["loss"] - max(-old, 0) + max(-new, 0)
+        rsi_value = _rsi_from_sums(gain, loss)
+    return smas, rsi_value
+
+
+def live_rsi(a, price, ts):
+    # RSI of one anchored ticker with `price` as today's bar (None without enough history)
+    return _live_indicators(a, price, ts)[1]
+
+
+def live_zscore(a, price, ts):
+    # Radar z-score of one anchored ticker with `price` as today's bar (None without enough history)
+    z = a.get("z")
+    if z is None: return None
+    out = a["last"] if _same_day(a, ts) else z["first"]
+    d_out, d_in = out - z["ref"], price - z["ref"]
+    s, ss, w = z["sum"] - d_out + d_in, z["sumsq"] - d_out * d_out + d_in * d_in, z["window"]
+    var = (ss - s * s / w) / (w - 1)
+    return (d_in - s / w) / var ** 0.5 if var > 0 else None
+
+
+@metrics.timed
+def live_quotes(q, anchors, prices):
+    """Copy of terminal state `q` re-priced with live {ticker: (price, timestamp)} quotes.
+
+    Only the quoted tickers move; their SMAs and RSIs are updated from the anchors, not recomputed.
+    """
+    live = {t: (float(p), ts) for t, (p, ts) in prices.items() if t in anchors and p and p > 0}
+    ind = {t: _live_indicators(anchors[t], p, ts) for t, (p, ts) in live.items()}
+    q = {**q, "cryptos": {name: dict(c) for name, c in q["cryptos"].items()}}
+    for field, t in PRICE_FIELDS.items():
+        if t in live: q[field] = live[t][0]
+    for field, (t, w) in SMA_FIELDS.items():
+        if t in ind and w in ind[t][0]: q[field] = ind[t][0][w]
+    if all(t in ind and ind[t][1] is not None for t in AVG_RSI_TICKERS):
+        q["avg_rsi"] = sum(ind[t][1] for t in AVG_RSI_TICKERS) / len(AVG_RSI_TICKERS)
+    if "XLRE" in ind and ind["XLRE"][1] is not None: q["xlre_rsi"] = ind["XLRE"][1]
+    for name, t in CRYPTOS.items():
+        if t in live: q["cryptos"][name]["price"] = live[t][0]
+        if t in ind and ind[t][1] is not None: q["cryptos"][name]["rsi"] = ind[t][1]
+    q["live"] = {"tickers": sorted(live), "as_of": max((ts for _, ts in live.values() if ts is not None), default=None)}
+    return q
+
+
+# Rule thresholds, named so a backtest can try other values (backtest.py); the dashboard uses these as-is
+THRESHOLDS = {
+    "inflation_gold_dbc": 1.1,   # Gold/DBC ratio above this reads as high inflation
+    "growth_xlb_gold": 0.015,    # Materials/Gold ratio above this reads as expansion
+    "vix_heavy": 30, "vix_neutral": 20,
+    "fiscal_tnx_200ma": 1.1,     # 10Y yield this far above its 200D MA reads as fiscal stress
+    "overbought_rsi": 80,
+    "bonds_buffer": 0.98, "crypto_buffer": 0.95,
+}
+
+# Each pillar: q, thresholds -> ([(state, condition)] in priority order, default state). Conditions use & / |
+# rather than and / or, so the same rule evaluates a single quote or whole numpy / pandas series.
+PILLAR_RULES = {
+    "Momentum": lambda q, th: ([('🟢 BULLISH', q["spx_now"] > q["sma_200d"])], '🔴 BEARISH'),
+    "Inflation": lambda q, th: ([('🔴 HIGH', (q["dbc_now"] > 0) & (q["gold_now"] > th["inflation_gold_dbc"] * q["dbc_now"]))], '🟢 STABLE'),
+    "Growth": lambda q, th: ([('🟢 EXPAND', (q["gold_now"] > 0) & (q["xlb_now"] > th["growth_xlb_gold"] * q["gold_now"]))], '🟡 SLOWING'),
+    "Positioning": lambda q, th: ([('🔴 HEAVY', q["vix_now"] > th["vix_heavy"]), ('🟡 NEUTRAL', q["vix_now"] > th["vix_neutral"])], '🟢 LITE'),
+    "Monetary": lambda q, th: ([('🔴 TIGHT', (q["tnx_now"] - q["short_rate"]) < 0)], '🟢 EASING'),
+    "Fiscal": lambda q, th: ([('🔴 STRESS', q["tnx_now"] > q["tnx_200ma"] * th["fiscal_tnx_200ma"])], '🟢 STABLE'),
+}
+
+# Each asset: q, thresholds -> (green condition, red condition), rated by get_rating
+SCORECARD_RULES = {
+    # Stocks: Bearish only if below 200MA OR (RSI is wildly overbought AND price breaks the 20-day MA).
+    "Stocks": lambda q, th: (q["spx_now"] > q["sma_200d"],
+                             (q["spx_now"] < q["sma_200d"]) | ((q["avg_rsi"] > th["overbought_rsi"]) & (q["spx_now"] < q["sma_20d"]))),
+    # Bonds: Tracks actual TLT price vs 200MA. Small 2% buffer on the downside to prevent fake-outs.
+    "Bonds": lambda q, th: (q["tlt_now"] > q["tlt_200ma"], q["tlt_now"] < q["tlt_200ma"] * th["bonds_buffer"]),
+    # Gold: Dynamic guardrails using 50MA and 200MA instead of static ratios.
+    "Gold": lambda q, th: (q["gold_now"] > q["gold_50ma"], q["gold_now"] < q["gold_200ma"]),
+    # Crypto: Requires a 5% crash through the 200MA to flash red, accommodating for high volatility.
+    "Crypto": lambda q, th: (q["btc_now"] > q["btc_200ma"], q["btc_now"] < q["btc_200ma"] * th["crypto_buffer"]),
+    # Real Estate: Price vs 200MA, with a breakdown trigger similar to stocks.
+    "Real Estate": lambda q, th: (q["xlre_now"] > q["xlre_200ma"],
+                                  (q["xlre_now"] < q["xlre_200ma"]) | ((q["xlre_rsi"] > th["overbought_rsi"]) & (q["xlre_now"] < q["xlre_20ma"]))),
+}
+
+
+def _first_state(choices, default):
+    # First state whose condition holds: a str for scalar conditions, an object array for array conditions
+    import numpy as np
+    out = np.select([np.asarray(c, dtype=bool) for _, c in choices], [s for s, _ in choices], default).astype(object)
+    return out.item() if out.ndim == 0 else out
+
+
+def pillar_states(q, thresholds=None):
+    th = {**THRESHOLDS, **(thresholds or {})}
+    return {pillar: _first_state(*rule(q, th)) for pillar, rule in PILLAR_RULES.items()}
+
+
+def six_pillars(q):
+    # [(pillar, state, detail)] for the automated 6-pillar overlay
+    spx_now, sma_200d, tnx_now, short_rate = q["spx_now"], q["sma_200d"], q["tnx_now"], q["short_rate"]
+    details = {
+        "Momentum": f"{((spx_now/sma_200d)-1)*100 if sma_200d else 0:+.1f}% vs 200D",
+        "Inflation": "Gold/DBC Ratio",
+        "Growth": "Materials vs Gold",
+        "Positioning": f"VIX {q['vix_now']:.1f}",
+        "Monetary": f"Spread: {tnx_now-short_rate:.2f}%",
+        "Fiscal": "Yield vs 200D MA",
+    }
+    return [(pillar, state, details[pillar]) for pillar, state in pillar_states(q).items()]
+
+
+# Updated to prioritize risk: If a red condition triggers, it overrides the green.
+def get_rating(green_cond, red_cond):
+    return _first_state([("🔴 BEARISH", red_cond), ("🟢 BULLISH", green_cond)], "🟡 NEUTRAL")
+
+
+def scorecard(q, thresholds=None):
+    th = {**THRESHOLDS, **(thresholds or {})}
+    return {asset: get_rating(*rule(q, th)) for asset, rule in SCORECARD_RULES.items()}
+
+
+EMPTY_LEADERBOARD = (([], []),) * 4 + ({}, {})
+
+
+@metrics.timed
+def sector_leaderboard(close):
+    # -> (daily, weekly, monthly, ytd) as (leaders, laggards) lists, {ticker: RSI}, {ticker: sector name}
+    import pandas as pd
+    sectors = SECTORS
+    tickers = list(sectors.keys())
+    try:
+        # Sectors ride along in the shared terminal download; only the YTD window (>= 21 bars) is used
+        data = close[[t for t in tickers if t in close.columns]].dropna(how="all")
+        ytd_start = pd.Timestamp(f"{datetime.now().year}-01-01")
+        if len(data) < 22 or not (data.index >= ytd_start).any(): return EMPTY_LEADERBOARD  # not enough history for the monthly base
+        data = data[data.index >= min(ytd_start, data.index[-22])]
+        sector_rsis = rsi_frame(data).to_dict()
+
+        # Every horizon against its base row at once: rows = horizon, columns = sector
+        base = pd.concat([data.iloc[[-2, -6, -21]], data[data.index >= ytd_start].iloc[[0]]])
+        base.index = ["Daily", "Weekly", "Monthly", "YTD"]
+        perf = ((data.iloc[-1] / base) - 1) * 100
+        ranks = perf.rank(axis=1, ascending=False, method="first")
+
+        def get_ranks(horizon):
+            r, v = ranks.loc[horizon], perf.loc[horizon]
+            fmt = lambda t: f"{sectors[t]}: {v[t]:+.1f}% (RSI: {sector_rsis[t]:.1f})"
+            return [fmt(t) for t in r[r <= 5].sort_values().index], [fmt(t) for t in r[r > r.count() - 5].sort_values(ascending=False).index]
+        return get_ranks("Daily"), get_ranks("Weekly"), get_ranks("Monthly"), get_ranks("YTD"), sector_rsis, {t: sectors[t] for t in data.columns}
+    except Exception as e:
+        metrics.swallowed("engine.sector_leaderboard", e)
+        return EMPTY_LEADERBOARD
+
+
+# --- PORTFOLIO LAB ---
+@metrics.timed
+def portfolio_performance(close, portfolios=PORTFOLIOS):
+    # Every portfolio x horizon return as a single (portfolio x ticker) @ (ticker x horizon) product
+    import numpy as np
+    import pandas as pd
+    weights = pd.DataFrame({name: p["weights"] for name, p in portfolios.items()}).fillna(0.0).T
+    tickers = list(weights.columns)
+    try:
+        close = close.reindex(columns=tickers).dropna(how="all").ffill()
+        last = close.index[-1]
+        bases = {"YTD %": close.index[close.index >= f"{last.year}-01-01"][0],
+                 **{h: close.index[close.index >= last - pd.DateOffset(months=m)][0] for h, m in LAB_HORIZONS.items()},
+                 "Since 2008": close.index[0]}
+        ticker_ret = (close.iloc[-1] / close.loc[list(bases.values())]) - 1  # horizon x ticker
+        ticker_ret.index = list(bases)
+    except Exception as e:
+        metrics.swallowed("engine.portfolio_performance", e)
+        return pd.DataFrame()
+
+    w = weights.to_numpy()
+    perf = w @ ticker_ret.fillna(0.0).T.to_numpy()
+    perf[(w > 0) @ ticker_ret.isna().T.to_numpy() > 0] = np.nan  # a holding without a base price voids the cell
+    out = pd.DataFrame(perf * 100, index=weights.index, columns=ticker_ret.index)
+    years = (last - bases["Since 2008"]).days / 365.25
+    out["Ann. Return (Since 2008)"] = ((1 + out.pop("Since 2008") / 100) ** (1 / years) - 1) * 100
+    return out
+
+
+def load_portfolio_performance(portfolios=PORTFOLIOS):
+    tickers = sorted({t for p in portfolios.values() for t in p["weights"]})
+    return portfolio_performance(load_close(tickers, start=LAB_HISTORY_START, max_age=3600), portfolios)
+
+
+# --- ROTATION RADAR ---
+def month_names(now=None):
+    now = now or datetime.now()
+    next_m = 1 if now.month == 12 else now.month + 1
+    return now.month, now.strftime('%B'), next_m, datetime.strptime(str(next_m), "%m").strftime('%B')
+
+
+@metrics.timed
+def technical_exhaustion(df):
+    # 50-day z-score ("rubber band stretch") of a close series -> (price, sma, z) or None
+    try:
+        if df.empty: return None
+
+        # Calculate 50-day Moving Average and Standard Deviation
+        sma_50 = df.rolling(window=RADAR_PARAMS["window"]).mean()
+        std_50 = df.rolling(window=RADAR_PARAMS["window"]).std()
+
+        current_price = float(df.iloc[-1].squeeze())
+        current_sma = float(sma_50.iloc[-1].squeeze())
+        current_std = float(std_50.iloc[-1].squeeze())
+
+        if current_std == 0: return None
+
+        # Z-Score Calculation (Rubber Band Stretch)
+        z_score = (current_price - current_sma) / current_std
+        return current_price, current_sma, z_score
+    except Exception as e:
+        metrics.swallowed("engine.technical_exhaustion", e)
+        return None
+
+
+def load_technical_exhaustion(ticker):
+    return technical_exhaustion(load_close(ticker, period="1y", max_age=3600))
+
+
+@metrics.timed
+def seasonal_profile(ticker, lookback="10y", index=None, now=None):
+    # Current / next calendar month stats for one ticker, read from the persisted seasonality index
+    try:
+        stats = (index or seasonality_index()).lookup(ticker, lookback)
+        if stats is None: return None
+
+        curr_m, curr_name, next_m, next_name = month_names(now)
+        if curr_m not in stats.index or next_m not in stats.index: return None
+        curr, nxt = stats.loc[curr_m], stats.loc[next_m]
+
+        return {
+            "curr_name": curr_name, "curr_win": float(curr["win"]), "curr_avg": float(curr["mean"]),
+            "next_name": next_name, "next_win": float(nxt["win"]), "next_avg": float(nxt["mean"]),
+            "curr_median": float(curr["median"]), "next_median": float(nxt["median"]), "years": int(curr["count"])
+        }
+    except Exception as e:
+        metrics.swallowed("engine.seasonal_profile", e)
+        return None
+
+
+# Radar cut-offs: |z| beyond `z` on a `window`-day band is stretched; seasonal win rates are split at `win_split`,
+# "sustained" means both months beyond win_split +/- win_band, and `swing` is the month-over-month change that
+# counts as an up/downgrade. radar_sweep.py searches this grid against forward returns.
+RADAR_PARAMS = {"z": 2.0, "window": 50, "win_split": 50, "win_band": 5, "swing": 10}
+
+# Synthesis buckets shared by the single-ticker radar, the universe scanner and the sweep, in priority order:
+# (level, bucket, direction of the rotation it predicts, message)
+ROTATION_BUCKETS = [
+    ("error", "High Fade Probability", -1, "{ticker} is highly overextended (Z > {z:.1f}) with sustained seasonal headwinds through {n_name}. Capital is highly likely to rotate out."),
+    ("warning", "Distribution Warning", -1, "{ticker} is overextended and entering a historically weak {n_name}. Smart money is likely taking profits now. Prepare for a rotation out."),
+    ("warning", "Conflicting Signals", 0, "Overextended and fighting current seasonal weakness, but historical tailwinds arrive in {n_name}. Expect choppy consolidation."),
+    ("success", "Overbought but Supported", 1, "Stretched, but strong seasonal tailwinds persist through {n_name}. Momentum might carry, but downside risk is elevated due to the stretched rubber band."),
+    ("success", "Prime Accumulation Zone", 1, "Heavily oversold (Z < -{z:.1f}) with sustained historical tailwinds through {n_name}. High probability of capital rotation INTO this asset."),
+    ("success", "Front-Running the Rotation", 1, "Oversold and currently weak, but {n_name} historically brings strong inflows. Smart money may begin accumulating now."),
+    ("warning", "Dead Cat Bounce Risk", -1, "Oversold and currently supported, but severe seasonal headwinds hit in {n_name}. Keep a tight leash on any long trades."),
+    ("error", "Falling Knife", -1, "Oversold, but historical seasonality remains terrible through {n_name}. Wait for technical confirmation before trying to catch this."),
+    ("success", "Sustained Tailwind", 1, "Normal technical ranges, backed by strong seasonal inflows through {n_name}. Path of least resistance is up."),
+    ("error", "Sustained Headwind", -1, "Normal technical ranges, but facing a multi-month seasonal slump through {n_name}. Capital is likely deploying elsewhere."),
+    ("info", "Forward-Looking Upgrade", 1, "Currently neutral, but historical seasonality significantly improves next month ({n_name}). Watch for early capital inflows."),
+    ("warning", "Forward-Looking Downgrade", -1, "Currently neutral, but historical seasonality drops off sharply in {n_name}. Upside may be capped soon."),
+]
+ROTATION_DEFAULT = ("info", "Holding Pattern", 0, "{ticker} is trading within normal technical ranges with mixed historical seasonality. No clear rotation edge detected.")
+
+
+def rotation_bucket_index(z_score, c_win, n_win, params=None):
+    """Index into ROTATION_BUCKETS (len() = ROTATION_DEFAULT) for scalars or whole arrays of readings."""
+    import numpy as np
+    p = {**RADAR_PARAMS, **(params or {})}
+    z, c, n = np.asarray(z_score, dtype=float), np.asarray(c_win, dtype=float), np.asarray(n_win, dtype=float)
+    over, under = z > p["z"], z < -p["z"]
+    c_up, n_up = c >= p["win_split"], n >= p["win_split"]
+    high, low = p["win_split"] + p["win_band"], p["win_split"] - p["win_band"]
+    conditions = [
+        over & (c < p["win_split"]) & (n < p["win_split"]), over & c_up & (n < p["win_split"]), over & (c < p["win_split"]) & n_up, over,
+        under & c_up & n_up, under & (c < p["win_split"]) & n_up, under & c_up & (n < p["win_split"]), under,
+        (c >= high) & (n >= high), (c < low) & (n < low), n > c + p["swing"], n < c - p["swing"],
+    ]
+    return np.select(conditions, np.arange(len(conditions)), len(conditions))
+
+
+def classify_rotation(z_score, c_win, n_win, ticker, n_name, params=None):
+    # -> (level, bucket, message) for one ticker
+    i = int(rotation_bucket_index(z_score, c_win, n_win, params))
+    level, bucket, _, message = ROTATION_BUCKETS[i] if i < len(ROTATION_BUCKETS) else ROTATION_DEFAULT
+    return level, bucket, message.format(ticker=ticker, n_name=n_name, z={**RADAR_PARAMS, **(params or {})}["z"])
+
+
+@metrics.timed
+def scan_rotation_universe(tickers, lookback="10y", index=None, now=None):
+    # Parallel bulk fetches for the z-scores; seasonality comes from the precomputed index
+    import pandas as pd
+    close = load_close_parallel(tickers, period="1y", max_age=3600)
+    if close.empty: return pd.DataFrame()
+    close = close.ffill().astype(float)  # stored as float32; the z-score maths runs in float64
+
+    # Technical exhaustion: 50-day z-score for every column at once
+    w = RADAR_PARAMS["window"]
+    price, sma_50, std = close.iloc[-1], close.rolling(w).mean().iloc[-1], close.rolling(w).std().iloc[-1]
+    z = (price - sma_50) / std.where(std != 0)
+
+    # Seasonality: one bulk index update for symbols whose stats predate the last closed month, then dict reads
+    index = index or seasonality_index()
+    index.update(list(close.columns))
+    stats = {t: index.lookup(t, lookback) for t in close.columns}
+    stats = {t: v for t, v in stats.items() if v is not None}
+    if not stats: return pd.DataFrame()
+    stats = pd.concat(stats, names=["Ticker", "month"])
+
+    curr_m, _, next_m, n_name = month_names(now)
+    curr, nxt = stats.xs(curr_m, level="month"), stats.xs(next_m, level="month")
+    out = pd.DataFrame({
+        "Price": price, "50-SMA": sma_50, "Z-Score": z,
+        "curr_win": curr["win"], "curr_avg": curr["mean"], "next_win": nxt["win"], "next_avg": nxt["mean"],
+    }).dropna(subset=["Z-Score", "curr_win", "next_win"])
+    buckets = [b for _, b, _, _ in ROTATION_BUCKETS] + [ROTATION_DEFAULT[1]]
+    out["Signal"] = [buckets[i] for i in rotation_bucket_index(out["Z-Score"], out["curr_win"], out["next_win"])]
+    out.index.name = "Ticker"
+    return out.sort_values("Z-Score")
+
+
+# --- STRESS TEST ---
+def stress_metrics(port_returns, rf_annual=0.02):
+    # Column-wise metrics for a (days x strategies) return matrix; a strategy with any missing day gets NaN
+    import numpy as np
+    r = np.asarray(port_returns, dtype=float)
+    growth = np.cumprod(1 + r, axis=0) * 100
+    std = r.std(axis=0, ddof=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std != 0, (r - rf_annual / 252).mean(axis=0) / std * (252**0.5), 0.0)
+    return {
+        "Return %": growth[-1] - 100,
+        "Max Drawdown %": ((growth / np.maximum.accumulate(growth, axis=0)) - 1).min(axis=0) * 100,
+        "Volatility %": std * (252**0.5) * 100,
+        "Sharpe": sharpe,
+    }
+
+
+ROLLING_WINDOWS = {"1M": 21, "3M": 63, "6M": 126, "1Y": 252, "3Y": 756}
+
+
+def _window_sums(a, w):
+    # Sum of every length-w window from one cumulative sum: O(n) however many windows
+    import numpy as np
+    c = np.concatenate([[0.0], np.cumsum(a)])
+    return c[w:] - c[:-w]
+
+
+@metrics.timed
+def rolling_metrics(port_returns, windows=(63, 252), bench_returns=None, rf_annual=0.02):
+    """Rolling Sharpe, volatility %, drawdown % and (with a benchmark) correlation for each window in days.
+
+    Returns {metric: DataFrame} with one column per window; each window's first w-1 days are NaN.
+    Moments come from prefix sums of the (demeaned) series, so a window costs O(n) rather than O(n x w).
+    """
+    import numpy as np
+    import pandas as pd
+    if bench_returns is not None:
+        both = pd.concat([port_returns, bench_returns], axis=1, join="inner").dropna()
+        port_returns, bench_returns = both.iloc[:, 0], both.iloc[:, 1]
+    idx = port_returns.index
+    x = port_returns.to_numpy(dtype=float)
+    xc = x - x.mean()  # demeaning keeps sum-of-squares differences from cancelling catastrophically
+    log_growth = pd.Series(np.concatenate([[0.0], np.cumsum(np.log1p(x))]))
+    if bench_returns is not None:
+        y = bench_returns.to_numpy(dtype=float)
+        yc = y - y.mean()
+
+    out = {"Sharpe": {}, "Volatility %": {}, "Drawdown %": {}}
+    if bench_returns is not None: out["Correlation"] = {}
+    for w in windows:
+        col = np.full(len(x), np.nan)
+        if w < 2 or w > len(x):
+            for m in out: out[m][w] = col
+            continue
+        sx, sxx = _window_sums(xc, w), _window_sums(xc * xc, w)
+        var_x = np.maximum(sxx - sx * sx / w, 0.0)
+        std = np.sqrt(var_x / (w - 1))
+        mean = sx / w + x.mean()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sharpe = np.where(std > 0, (mean - rf_annual / 252) / std * 252**0.5, np.nan)
+        # Drawdown from the highest level in the trailing window (its opening level included);
+        # pandas' rolling max is a linear-time monotonic-deque scan
+        peak = log_growth.rolling(w + 1, min_periods=1).max().to_numpy()[1:]
+        drawdown = (np.exp(log_growth.to_numpy()[1:] - peak) - 1) * 100
+        drawdown[:w - 1] = np.nan
+        for m, v in (("Sharpe", sharpe), ("Volatility %", std * 252**0.5 * 100)):
+            out[m][w] = col.copy()
+            out[m][w][w - 1:] = v
+        out["Drawdown %"][w] = drawdown
+        if bench_returns is not None:
+            sy, syy, sxy = _window_sums(yc, w), _window_sums(yc * yc, w), _window_sums(xc * yc, w)
+            var_y = np.maximum(syy - sy * sy / w, 0.0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                corr = np.where((var_x > 0) & (var_y > 0), (sxy - sx * sy / w) / np.sqrt(var_x * var_y), np.nan)
+            out["Correlation"][w] = col.copy()
+            out["Correlation"][w][w - 1:] = np.clip(corr, -1.0, 1.0)
+    return {m: pd.DataFrame(cols, index=idx) for m, cols in out.items()}
+
+
+@metrics.timed
+def stress_test(data, weights, benchmark=None):
+    # One custom strategy over a close frame; weights are {ticker: percent}
+    tickers = list(weights)
+    missing = missing_tickers(data, tickers + ([benchmark] if benchmark else []))
+    if missing: raise DataUnavailable(f"No price history for: {', '.join(missing)}")
+    returns = data[tickers].pct_change().dropna()
+    weights_arr = [weights[t]/100 for t in tickers]
+    port_returns = (returns * weights_arr).sum(axis=1)
+    cumulative_growth = (1 + port_returns).cumprod() * 100
+    stats = {m: float(v[0]) for m, v in stress_metrics(port_returns.to_numpy()[:, None]).items()}
+    result = {
+        "returns": returns, "port_returns": port_returns, "cumulative_growth": cumulative_growth, "metrics": stats,
+        "asset_perf": {t: ((data[t].iloc[-1] / data[t].iloc[0]) - 1) * 100 for t in tickers},
+        "asset_returns": asset_returns(data[tickers]),  # ragged, for the pairwise-complete correlation matrix
+    }
+    if benchmark:
+        result["bench_returns"] = data[benchmark].pct_change().dropna()
+        result["bench_growth"] = (1 + result["bench_returns"]).cumprod() * 100
+        result["metrics"]["vs Benchmark %"] = stats["Return %"] - (result["bench_growth"].iloc[-1] - 100)
+    return result
+
+
+def load_stress_test(weights, start, end, benchmark=None):
+    tickers = list(dict.fromkeys(list(weights) + ([benchmark] if benchmark else [])))
+    # A pasted universe is fetched like the radar scan: chunked bulk requests, run concurrently
+    data = (load_close_parallel if len(tickers) > SCAN_CHUNK else load_close)(tickers, start=start, end=end)
+    return stress_test(data, weights, benchmark) if not data.empty else None
+
+
+@metrics.timed
+def batch_stress_test(close, strategies, regimes):
+    # strategies: {name: {ticker: weight}}, regimes: {name: (start, end)} -> one row per strategy x regime
+    import numpy as np
+    import pandas as pd
+    tickers = sorted({t for w in strategies.values() for t in w})
+    close = close.reindex(columns=tickers).dropna(how="all").ffill()
+    returns = close.pct_change(fill_method=None)
+
+    # One weights-matrix multiplication prices every strategy on every day
+    weights = pd.DataFrame(strategies).reindex(tickers).fillna(0.0).to_numpy()
+    port = returns.fillna(0.0).to_numpy() @ weights
+    missing = returns.isna().to_numpy() @ (weights > 0)
+    port[missing > 0] = np.nan  # a constituent without history invalidates that day
+
+    rows = []
+    idx = returns.index
+    for regime, (r_start, r_end) in regimes.items():
+        window = port[(idx >= pd.Timestamp(r_start)) & (idx < pd.Timestamp(r_end))][1:]
+        if len(window) < 2: continue
+        stats = stress_metrics(window)
+        for j, name in enumerate(strategies):
+            rows.append({"Strategy": name, "Regime": regime, **{m: v[j] for m, v in stats.items()}})
+    return pd.DataFrame(rows)
+
+
+def load_batch_stress_test(strategies=None, regimes=None):
+    import pandas as pd
+    strategies = strategies or {name: p["weights"] for name, p in PORTFOLIOS.items()}
+    regimes = regimes or {k: v["dates"] for k, v in REGIMES.items()}
+    tickers = sorted({t for w in strategies.values() for t in w})
+    start = min(pd.Timestamp(s) for s, _ in regimes.values())
+    end = max(pd.Timestamp(e) for _, e in regimes.values())
+    close = load_close(tickers, start=start, end=end, max_age=3600)
+    return batch_stress_test(close, strategies, regimes) if not close.empty else pd.DataFrame()
+
+
+# --- CORRELATION & CLUSTERING ---
+def asset_returns(close):
+    # Daily returns per column over that column's own trading days (crypto keeps weekends, ETFs are not
+    # cut back to the shortest history), as float32; a day a ticker did not trade stays NaN
+    import numpy as np
+    return close.ffill().pct_change(fill_method=None).where(close.notna()).iloc[1:].astype(np.float32)
+
+
+@metrics.timed
+def correlation_matrix(returns, shrinkage=0.0, min_overlap=20):
+    """Pairwise-complete correlation of a (days x tickers) return frame with NaN gaps, in float32.
+
+    Each pair uses every day both tickers traded; pairs with fewer than `min_overlap` common days are NaN.
+    All pairs come from four matrix products over the NaN mask, not a loop over k^2 pairs.
+    shrinkage in [0, 1] pulls every pair toward the average correlation (constant-correlation target),
+    which damps noise in short overlaps and keeps a large matrix closer to positive semi-definite.
+    """
+    import numpy as np
+    import pandas as pd
+    x = returns.to_numpy(dtype=np.float32, copy=True)
+    mask = ~np.isnan(x)
+    x -= np.nanmean(x, axis=0)  # centre first so float32 sums of squares don't cancel away
+    x[~mask] = 0.0
+    m = mask.astype(np.float32)
+    n = m.T @ m                  # overlap days per pair
+    sx = x.T @ m                 # sum of x_i over the days x_j also traded
+    sxx = (x * x).T @ m
+    sxy = x.T @ x
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var_i = sxx - sx * sx / n
+        cov = sxy - sx * sx.T / n
+        corr = cov / np.sqrt(var_i * var_i.T)
+    corr[(n < min_overlap) | ~np.isfinite(corr)] = np.nan
+    corr = np.clip(corr, -1.0, 1.0)
+    if shrinkage:
+        off = ~np.eye(len(corr), dtype=bool)
+        target = np.nanmean(corr[off]) if np.isfinite(corr[off]).any() else 0.0
+        corr = (1 - shrinkage) * corr + shrinkage * target
+    np.fill_diagonal(corr, 1.0)
+    return pd.DataFrame(corr.astype(np.float32), index=returns.columns, columns=returns.columns)
+
+
+@metrics.timed
+def correlation_clusters(corr, min_corr=0.5):
+    """Average-linkage hierarchical clustering of a correlation matrix.
+
+    Distance is 1 - rho, so the average-linkage distance between two clusters is 1 minus their average
+    cross correlation; pairs without enough overlap count as uncorrelated.
+    Returns (dendrogram leaf order, Series ticker -> cluster number): merging stops once no two clusters
+    have an average cross correlation of at least `min_corr`, numbered in leaf order.
+    """
+    import numpy as np
+    import pandas as pd
+    k = len(corr)
+    d = 1 - np.nan_to_num(corr.to_numpy(dtype=np.float32), nan=0.0)
+    np.fill_diagonal(d, np.inf)
+    cut = 1 - min_corr
+    members = [[i] for i in range(k)]
+    size = np.ones(k, dtype=np.float32)
+    groups = None
+    for _ in range(k - 1):
+        i, j = divmod(int(np.argmin(d)), k)
+        if groups is None and d[i, j] > cut: groups = [list(g) for g in members if g is not None]
+        # Lance-Williams update for average linkage: the merged row is the size-weighted mean
+        merged = (size[i] * d[i] + size[j] * d[j]) / (size[i] + size[j])
+        d[i], d[:, i] = merged, merged
+        d[i, i] = np.inf
+        d[j], d[:, j] = np.inf, np.inf
+        members[i], members[j] = members[i] + members[j], None
+        size[i] += size[j]
+    order = next((g for g in members if g is not None), [])
+    if groups is None: groups = [order]
+    position = {leaf: p for p, leaf in enumerate(order)}
+    groups.sort(key=lambda g: min(position[i] for i in g))
+    labels = pd.Series(0, index=corr.index, dtype=int)
+    for n, g in enumerate(groups, 1): labels.iloc[g] = n
+    return [corr.index[i] for i in order], labels
+
+
+def load_correlation(tickers, start=None, end=None, shrinkage=0.0):
+    returns = asset_returns(load_close_parallel(tickers, start=start, end=end))
+    return correlation_matrix(returns, shrinkage) if not returns.empty else None
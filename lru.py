@@ -0,0 +1,55 @@
+"""Thread-safe LRU cache bounded by a byte budget and an entry count.
+
+Callers pass the size of each value when storing it; the least recently used
+entries are evicted until both limits hold again. A value larger than the
+whole budget is not cached at all.
+"""
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    def __init__(self, max_bytes, max_entries=None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.nbytes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._data = OrderedDict()  # key -> (value, nbytes), least recently used first
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None: return default
+            self._data.move_to_end(key)
+            return item[0]
+
+    def put(self, key, value, nbytes):
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None: self.nbytes -= old[1]
+            if nbytes > self.max_bytes: return
+            self._data[key] = (value, nbytes)
+            self.nbytes += nbytes
+            while self._data and (self.nbytes > self.max_bytes or (self.max_entries and len(self._data) > self.max_entries)):
+                _, (_, size) = self._data.popitem(last=False)
+                self.nbytes -= size
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            item = self._data.pop(key, None)
+            if item is not None: self.nbytes -= item[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def status(self):
+        with self._lock:
+            return {"entries": len(self._data), "max_entries": self.max_entries, "mb": self.nbytes / 1e6,
+                    "budget_mb": self.max_bytes / 1e6, "evictions": self.evictions}
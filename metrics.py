@@ -0,0 +1,186 @@
+"""Instrumentation for the data hot path.
+
+Records wall time per data function, cache hits / misses, provider
+requests with the rows and bytes they returned, and exceptions that a
+function caught and replaced with a default. Counters are cumulative for
+the process and export as JSON or Prometheus text exposition format.
+
+A thread can also collect its own share: after `start_run()` everything
+that thread records (and work it hands to helper threads through
+`propagate`) is added to the returned run as well, so `snapshot(run)` is
+one rerun's activity without the background threads' or other sessions'.
+
+Standard library only, so every module (including the CLI) can import it.
+"""
+import functools
+import json
+import threading
+import time
+from collections import defaultdict
+
+PREFIX = "market_agent"
+
+_lock = threading.Lock()
+_local = threading.local()
+_timings = defaultdict(lambda: {"calls": 0, "seconds": 0.0, "max": 0.0})
+_cache = defaultdict(lambda: {"hits": 0, "misses": 0})
+_network = defaultdict(lambda: {"requests": 0, "rows": 0, "bytes": 0, "errors": 0})
+_errors = defaultdict(lambda: {"count": 0, "last": None})
+_SECTIONS = {"timings": _timings, "cache": _cache, "network": _network, "errors": _errors}
+
+
+def start_run():
+    """Start collecting what the calling thread records into a fresh run (replacing any previous one)."""
+    _local.run = {section: defaultdict(d.default_factory) for section, d in _SECTIONS.items()}
+    return _local.run
+
+
+def propagate(fn):
+    """Wrap `fn` so that, called on another thread, it records into the calling thread's run too."""
+    run = getattr(_local, "run", None)
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        outer, _local.run = getattr(_local, "run", None), run
+        try: return fn(*args, **kwargs)
+        finally: _local.run = outer
+    return wrapper
+
+
+def _sinks(section):
+    # The process totals, plus the current thread's run when it is collecting one
+    run = getattr(_local, "run", None)
+    return (_SECTIONS[section],) if run is None else (_SECTIONS[section], run[section])
+
+
+def record_time(name, seconds):
+    with _lock:
+        for d in _sinks("timings"):
+            t = d[name]
+            t["calls"] += 1
+            t["seconds"] += seconds
+            t["max"] = max(t["max"], seconds)
+
+
+def timed(fn=None, *, name=None):
+    """Decorator: wall time per call under `name` (default module.function)."""
+    def deco(fn):
+        label = name or f"{fn.__module__}.{fn.__name__}"
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try: return fn(*args, **kwargs)
+            finally: record_time(label, time.perf_counter() - t0)
+        return wrapper
+    return deco(fn) if fn is not None else deco
+
+
+def cache_event(name, hits=0, misses=0):
+    with _lock:
+        for d in _sinks("cache"):
+            c = d[name]
+            c["hits"] += hits
+            c["misses"] += misses
+
+
+def cached(cache, name=None):
+    """Wrap a caching decorator (e.g. st.cache_data(ttl=600)) so every call is timed and counted as a hit or miss.
+
+    The function body only runs on a miss, so it flags the calling thread; the
+    outer wrapper reads the flag once the cache returns.
+    """
+    def deco(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def body(*args, **kwargs):
+            _local.missed = True
+            return fn(*args, **kwargs)
+        cached_fn = cache(body)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            outer, _local.missed = getattr(_local, "missed", False), False
+            t0 = time.perf_counter()
+            try: return cached_fn(*args, **kwargs)
+            finally:
+                record_time(label, time.perf_counter() - t0)
+                cache_event(label, hits=int(not _local.missed), misses=int(_local.missed))
+                _local.missed = outer
+        wrapper.clear = cached_fn.clear
+        return wrapper
+    return deco
+
+
+def record_network(kind, rows=0, nbytes=0, error=False):
+    with _lock:
+        for d in _sinks("network"):
+            n = d[kind]
+            n["requests"] += 1
+            n["rows"] += int(rows)
+            n["bytes"] += int(nbytes)
+            n["errors"] += int(error)
+
+
+def swallowed(name, exc):
+    """Count an exception a function caught and replaced with a default value."""
+    with _lock:
+        for d in _sinks("errors"):
+            e = d[name]
+            e["count"] += 1
+            e["last"] = f"{type(exc).__name__}: {exc}"
+
+
+def snapshot(run=None):
+    """Process totals, or those of one `run` from start_run()."""
+    sections = _SECTIONS if run is None else run
+    with _lock:
+        return {section: {k: dict(v) for k, v in sections[section].items()} for section in _SECTIONS}
+
+
+def diff(after, before):
+    # Activity between two snapshots; "max" and "last" are carried over from `after`
+    out = {}
+    for section, rows in after.items():
+        out[section] = {}
+        for key, vals in rows.items():
+            prev = before.get(section, {}).get(key, {})
+            delta = {f: (v - prev.get(f, 0) if f not in ("max", "last") else v) for f, v in vals.items()}
+            if any(delta[f] for f in delta if f not in ("max", "last")):
+                out[section][key] = delta
+    return out
+
+
+def reset():
+    with _lock:
+        for d in (_timings, _cache, _network, _errors): d.clear()
+
+
+def to_json(snap=None):
+    return json.dumps(snap if snap is not None else snapshot(), indent=2, sort_keys=True)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def to_prometheus(snap=None):
+    snap = snap if snap is not None else snapshot()
+    series = [
+        ("function_calls_total", "counter", "Calls per instrumented data function", "timings", "function", "calls"),
+        ("function_seconds_total", "counter", "Wall time spent per data function", "timings", "function", "seconds"),
+        ("function_seconds_max", "gauge", "Slowest single call per data function", "timings", "function", "max"),
+        ("cache_hits_total", "counter", "Cache hits", "cache", "cache", "hits"),
+        ("cache_misses_total", "counter", "Cache misses", "cache", "cache", "misses"),
+        ("network_requests_total", "counter", "Provider requests (price downloads, feed fetches)", "network", "kind", "requests"),
+        ("network_rows_total", "counter", "Rows returned by provider requests", "network", "kind", "rows"),
+        ("network_bytes_total", "counter", "Bytes returned by provider requests", "network", "kind", "bytes"),
+        ("network_errors_total", "counter", "Provider requests that failed", "network", "kind", "errors"),
+        ("swallowed_exceptions_total", "counter", "Exceptions caught and replaced with a default", "errors", "function", "count"),
+    ]
+    lines = []
+    for metric, kind, help_text, section, label, field in series:
+        rows = snap.get(section, {})
+        if not rows: continue
+        lines += [f"# HELP {PREFIX}_{metric} {help_text}", f"# TYPE {PREFIX}_{metric} {kind}"]
+        lines += [f'{PREFIX}_{metric}{{{label}="{_label(k)}"}} {v[field]}' for k, v in sorted(rows.items())]
+    return "\n".join(lines) + "\n"
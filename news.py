@@ -0,0 +1,76 @@
+"""RSS headline fetcher.
+
+All configured feeds are pulled concurrently through the active data provider
+(one pooled HTTP session when live, see providers.py).
+ETag / Last-Modified validators are sent back on every poll, so unchanged
+feeds answer 304 and are not re-parsed. The cache warmer (scheduler.py) calls
+`refresh` on its "news" schedule and keeps the latest headlines in memory;
+renders only read that snapshot and never wait on I/O.
+A host that keeps failing is skipped with exponential backoff (breaker.HOSTS).
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import breaker
+import metrics
+import providers
+
+FEEDS = [
+    {"title": "🌍 Global Headlines (BBC)", "url": "https://feeds.bbci.co.uk/news/world/rss.xml"},
+    {"title": "💰 Finance Headlines (CNBC)", "url": "https://search.cnbc.com/rs/search/combinedcms/view.xml?partnerId=wrss01&id=100003114"},
+]
+
+
+class NewsFeedManager:
+    def __init__(self, feeds=FEEDS, limit=5, max_workers=8):
+        self.feeds = list(feeds)
+        self.limit = limit
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="news")
+        self._lock = threading.Lock()
+        self._state = {f["url"]: {"entries": [], "etag": None, "modified": None, "fetched": None, "error": None} for f in self.feeds}
+
+    def add_feed(self, title, url):
+        with self._lock:
+            if url not in self._state:
+                self.feeds.append({"title": title, "url": url})
+                self._state[url] = {"entries": [], "etag": None, "modified": None, "fetched": None, "error": None}
+
+    @metrics.timed(name="news.fetch")
+    def _fetch(self, url):
+        with self._lock:
+            state = dict(self._state[url])
+        host = urlparse(url).netloc
+        if not breaker.HOSTS.allow([host]):
+            return None  # host is backing off; the last good headlines stay up
+        try:
+            resp = providers.get_provider().fetch_feed(url, state["etag"], state["modified"])
+            breaker.HOSTS.success(host)
+            if resp["entries"] is None:
+                update = {"fetched": time.time(), "error": None}
+            else:
+                update = {
+                    "entries": resp["entries"][:self.limit], "etag": resp["etag"], "modified": resp["modified"],
+                    "fetched": time.time(), "error": None,
+                }
+        except Exception as e:
+            metrics.swallowed("news.fetch", e)
+            breaker.HOSTS.failure(host, e)
+            resp, update = None, {"error": str(e)}  # keep serving the last good headlines
+        with self._lock:
+            self._state[url].update(update)
+        return resp["status"] if resp else None
+
+    def refresh(self):
+        # One concurrent sweep over every feed; total latency is the slowest feed, not the sum
+        with self._lock:
+            urls = list(self._state)
+        return dict(zip(urls, self._pool.map(metrics.propagate(self._fetch), urls)))
+
+    def get(self, url):
+        with self._lock:
+            return list(self._state.get(url, {}).get("entries", []))
+
+    def status(self):
+        with self._lock:
+            return {url: {k: v for k, v in s.items() if k != "entries"} for url, s in self._state.items()}
@@ -0,0 +1,236 @@
+"""Persistent OHLCV history store.
+
+One Parquet file per (interval, ticker) under CACHE_DIR. A stale series is
+refreshed by downloading only the bars after its last stored date and
+appending them, so restarts and cache expiry cost a few rows of network I/O
+instead of the full history window.
+
+On top of the files sits one in-memory LRU of Close prices as float32,
+bounded by MEMORY_BUDGET_MB: every indicator, tab and job reading a ticker
+shares that single copy instead of re-reading the Parquet file or holding
+its own full OHLCV frame.
+
+Replicas pointing at the same CACHE_DIR share the store: a ticker is
+fetched under a cross-process lock (singleflight.py), so only one process
+goes upstream for it and the others read what it wrote.
+"""
+import os
+import threading
+import numpy as np
+import pandas as pd
+import breaker
+import lru
+import metrics
+import providers
+import singleflight
+
+CACHE_DIR = os.environ.get("MARKET_AGENT_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".market_cache"))
+FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+MAX_AGE = 600  # seconds a stored series is served without touching the network
+WARM_MAX_AGE = 60  # warm jobs skip series any replica rewrote this recently
+HOST = "query.finance.yahoo.com"  # circuit-breaker key for the price API
+QUOTE_HOST = f"{HOST} (intraday)"  # live quotes trip their own breaker, so a 1m outage never blocks daily history
+MEMORY_BUDGET_MB = float(os.environ.get("MARKET_AGENT_MEMORY_MB", 256))
+MAX_CACHED_TICKERS = int(os.environ.get("MARKET_AGENT_MAX_TICKERS", 2000))
+LOCK_DIR = os.path.join(CACHE_DIR, "locks")
+CLOSE_CACHE = lru.LRUCache(int(MEMORY_BUDGET_MB * 1e6), MAX_CACHED_TICKERS)  # (interval, ticker) -> (mtime, fetched_from, Close)
+
+PERIODS = {"1d": pd.Timedelta(days=1), "5d": pd.Timedelta(days=5), "60d": pd.Timedelta(days=60), "1mo": pd.DateOffset(months=1),
+           "3mo": pd.DateOffset(months=3), "6mo": pd.DateOffset(months=6), "1y": pd.DateOffset(years=1), "2y": pd.DateOffset(years=2),
+           "5y": pd.DateOffset(years=5), "10y": pd.DateOffset(years=10), "20y": pd.DateOffset(years=20)}
+
+
+def period_start(period):
+    # Translate a yfinance-style period into a start date ("max" -> None, i.e. full history)
+    if period is None or period == "max": return None
+    if period == "ytd": return pd.Timestamp(pd.Timestamp.today().year, 1, 1)
+    return pd.Timestamp.today().normalize() - PERIODS[period]
+
+
+def _path(ticker, interval):
+    return os.path.join(CACHE_DIR, interval, f"{ticker.replace('/', '_')}.parquet")
+
+
+def read(ticker, interval="1d"):
+    try: return pd.read_parquet(_path(ticker, interval))
+    except Exception: return None
+
+
+def _mtime(ticker, interval):
+    try: return os.path.getmtime(_path(ticker, interval))
+    except OSError: return None
+
+
+def age(ticker, interval="1d"):
+    mtime = _mtime(ticker, interval)
+    return pd.Timestamp.now().timestamp() - mtime if mtime is not None else None
+
+
+def _write(ticker, interval, df, fetched_from):
+    path = _path(ticker, interval)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df = df.copy()
+    df.index.name = "Date"
+    # Earliest start ever requested; tickers younger than a window must not look "short" forever
+    df.attrs = {"fetched_from": fetched_from}
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"  # the warmer thread may write the same ticker
+    df.to_parquet(tmp)
+    os.replace(tmp, path)
+    return df
+
+
+def _split(raw, tickers):
+    # Break a (possibly multi-ticker) yf.download frame into one clean OHLCV frame per ticker
+    out = {}
+    if raw is None or raw.empty: return out
+    for t in tickers:
+        try:
+            df = raw.xs(t, axis=1, level="Ticker") if isinstance(raw.columns, pd.MultiIndex) else raw
+        except KeyError: continue
+        df = df[[c for c in FIELDS if c in df.columns]].dropna(subset=["Close"])
+        if not df.empty:
+            df.index = pd.DatetimeIndex(df.index).tz_localize(None)
+            out[t] = df
+    return out
+
+
+def _download(tickers, start, interval):
+    # The active provider is Yahoo Finance in production, recorded fixtures under replay.
+    # Symbols that failed recently (and the whole API while its breaker is open) are skipped, not re-requested.
+    tickers = breaker.TICKERS.allow(tickers)
+    if not tickers or not breaker.HOSTS.allow([HOST]): return {}
+    kwargs = {"start": start} if start is not None else {"period": "max"}
+    try: out = _split(providers.get_provider().download(list(tickers), interval=interval, **kwargs), tickers)
+    except Exception as e:
+        metrics.swallowed("ohlcv_store.download", e)
+        breaker.HOSTS.failure(HOST, e)
+        return {}
+    # The host answered: symbols that came back without bars are ticker failures, not an outage
+    breaker.HOSTS.success(HOST)
+    for t in tickers:
+        if t in out: breaker.TICKERS.success(t)
+        else: breaker.TICKERS.failure(t, "no price data returned")
+    return out
+
+
+def last_prices(tickers, interval="1m"):
+    """{ticker: (last price, bar timestamp)} from one light intraday request; nothing is written to the store."""
+    tickers = [t for t in dict.fromkeys(tickers) if not breaker.TICKERS.blocked(t)]
+    if not tickers or not breaker.HOSTS.allow([QUOTE_HOST]): return {}
+    try: bars = _split(providers.get_provider().download(tickers, interval=interval, period="1d"), tickers)
+    except Exception as e:
+        metrics.swallowed("ohlcv_store.last_prices", e)
+        breaker.HOSTS.failure(QUOTE_HOST, e)
+        return {}
+    if bars: breaker.HOSTS.success(QUOTE_HOST)  # an empty answer (e.g. no intraday bars) is not an outage
+    return {t: (float(df["Close"].iloc[-1]), df.index[-1]) for t, df in bars.items()}
+
+
+def _covers(fetched_from, start):
+    # True when a stored series fetched from `fetched_from` already reaches back to the requested start
+    if fetched_from == "max": return True
+    return start is not None and pd.Timestamp(fetched_from) <= start
+
+
+def _classify(tickers, start, interval, max_age):
+    # Split tickers into stored-and-fresh, missing / too short (backfill) and stale (grouped by last stored bar)
+    frames, backfill, stale = {}, [], {}
+    for t in tickers:
+        df = read(t, interval)
+        if df is None or not _covers(df.attrs.get("fetched_from", "max"), start):
+            backfill.append(t)
+            if df is not None: frames[t] = df  # served as-is if the backfill fails
+            continue
+        frames[t] = df
+        if df.empty or (age(t, interval) or 0) >= max_age:
+            # Re-pull from the last stored bar: it may have been a partial (intraday) bar
+            stale.setdefault(df.index[-1] if not df.empty else start, []).append(t)
+    return frames, backfill, stale
+
+
+@metrics.timed
+def refresh(tickers, start=None, interval="1d", max_age=MAX_AGE):
+    """Bring the stored series for `tickers` up to date and return them as {ticker: OHLCV frame}."""
+    tickers = list(dict.fromkeys(tickers))
+    frames, backfill, stale = _classify(tickers, start, interval, max_age)
+
+    # Hit: served from disk without a request; miss: backfilled or re-pulled
+    needed = backfill + [t for group in stale.values() for t in group]
+    metrics.cache_event(f"ohlcv_store.{interval}", hits=len(tickers) - len(needed), misses=len(needed))
+    if not needed: return frames
+
+    # Single flight across threads and replicas: whoever held a ticker's lock before us has just
+    # rewritten its file, and that fresh copy is served instead of being requested again
+    seen = {t: _mtime(t, interval) for t in needed}
+    with singleflight.hold(LOCK_DIR, [f"{interval}.{t}" for t in needed]):
+        remaining = []
+        for t in needed:
+            df = read(t, interval) if _mtime(t, interval) != seen[t] else None
+            if df is not None and _covers(df.attrs.get("fetched_from", "max"), start): frames[t] = df
+            else: remaining.append(t)
+        again, backfill, stale = _classify(remaining, start, interval, max_age)
+        frames.update(again)
+        fetching = len(backfill) + sum(map(len, stale.values()))
+        metrics.cache_event(f"ohlcv_store.single_flight.{interval}", hits=len(needed) - fetching, misses=fetching)
+        _fetch(frames, backfill, stale, start, interval)
+    return frames
+
+
+def _fetch(frames, backfill, stale, start, interval):
+    # One bulk request per distinct start date: all missing tickers, then each group of stale ones
+    if backfill:
+        for t, df in _download(backfill, start, interval).items():
+            frames[t] = _write(t, interval, df, "max" if start is None else str(start.date()))
+    for last, group in stale.items():
+        fresh = _download(group, last, interval)
+        for t in group:
+            if t not in fresh: continue  # keep serving the stored bars; the breaker decides when to retry
+            old = frames[t]
+            merged = pd.concat([old, fresh[t]])
+            merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+            frames[t] = _write(t, interval, merged, old.attrs.get("fetched_from", "max"))
+
+
+def get_history(tickers, period=None, start=None, end=None, interval="1d", max_age=MAX_AGE):
+    """Drop-in for yf.download(tickers, ...): a (Price, Ticker) column frame served from the local store."""
+    start = pd.Timestamp(start) if start is not None else period_start(period)
+    frames = refresh([tickers] if isinstance(tickers, str) else list(tickers), start, interval, max_age)
+    if not frames: return pd.DataFrame()
+    out = pd.concat(frames, axis=1, names=["Ticker", "Price"]).swaplevel(axis=1).sort_index(axis=1)
+    if start is not None: out = out[out.index >= start]
+    if end is not None: out = out[out.index < pd.Timestamp(end)]
+    return out
+
+
+@metrics.timed
+def get_close(tickers, period=None, start=None, end=None, interval="1d", max_age=MAX_AGE):
+    """Close prices as a float32 (date x ticker) frame, served from the in-memory LRU when it is current.
+
+    An entry is current while its file is unchanged, younger than `max_age` and reaches back to `start`;
+    otherwise the ticker goes through refresh() like get_history and the entry is replaced.
+    """
+    start = pd.Timestamp(start) if start is not None else period_start(period)
+    tickers = [tickers] if isinstance(tickers, str) else list(dict.fromkeys(tickers))
+    now = pd.Timestamp.now().timestamp()
+    series, stale = {}, []
+    for t in tickers:
+        entry = CLOSE_CACHE.get((interval, t))
+        mtime = _mtime(t, interval)
+        if entry is not None and entry[0] == mtime and now - mtime < max_age and _covers(entry[1], start):
+            series[t] = entry[2]
+        else:
+            stale.append(t)
+    metrics.cache_event(f"ohlcv_store.close_lru.{interval}", hits=len(series), misses=len(stale))
+
+    if stale:
+        for t, df in refresh(stale, start, interval, max_age).items():
+            close = df["Close"].astype(np.float32)
+            series[t] = close
+            mtime = _mtime(t, interval)
+            if mtime is None: continue
+            CLOSE_CACHE.put((interval, t), (mtime, df.attrs.get("fetched_from", "max"), close), close.values.nbytes + close.index.nbytes)
+    if not series: return pd.DataFrame()
+    out = pd.concat([series[t] for t in tickers if t in series], axis=1, keys=[t for t in tickers if t in series], names=["Ticker"]).sort_index()
+    if start is not None: out = out[out.index >= start]
+    if end is not None: out = out[out.index < pd.Timestamp(end)]
+    return out
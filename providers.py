@@ -0,0 +1,216 @@
+"""Pluggable market-data and news providers.
+
+Every network read in the app goes through the active provider: OHLCV bars
+(what `yf.download` served) and RSS feeds (what `requests` + `feedparser`
+served). Three backends share one interface:
+
+    LiveProvider       Yahoo Finance and the real RSS endpoints
+    RecordingProvider  wraps another provider and saves every response as a fixture
+    ReplayProvider     serves those fixtures from local files, never touching the network
+
+The active provider is chosen with MARKET_AGENT_PROVIDER ("live", "record:<dir>"
+or "replay:<dir>") or `set_provider`. Each provider counts the requests it
+served, which is how the benchmark suite reports network calls.
+
+Fixture layout: <dir>/<interval>/<ticker>.parquet holds the union of every bar
+recorded for a ticker (same format as the OHLCV store), and
+<dir>/feeds/<sha1(url)>.json holds the parsed entries of a feed.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import Counter
+import metrics
+
+TIMEOUT = 10
+
+
+class Provider:
+    name = "base"
+
+    def __init__(self):
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def _count(self, kind):
+        with self._lock:
+            self.calls[kind] += 1
+
+    def _meter(self, kind, rows=0, nbytes=0, error=False):
+        # Requests that leave the process (or stand in for it under replay) also feed the instrumentation panel
+        self._count(kind)
+        metrics.record_network(kind, rows, nbytes, error)
+
+    def download(self, tickers, interval="1d", start=None, end=None, period=None):
+        """(Price, Ticker) column frame of daily/monthly bars, like yf.download."""
+        raise NotImplementedError
+
+    def fetch_feed(self, url, etag=None, modified=None):
+        """{"status", "etag", "modified", "entries"}; entries is None when the feed answered 304."""
+        raise NotImplementedError
+
+
+class LiveProvider(Provider):
+    name = "live"
+
+    def __init__(self, pool_size=8):
+        super().__init__()
+        self.pool_size = pool_size
+        self._session = None
+
+    @property
+    def session(self):
+        # One pooled session for every feed, created on first use so importing stays cheap
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size))
+            session.mount("http://", HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size))
+            self._session = session
+        return self._session
+
+    def download(self, tickers, interval="1d", start=None, end=None, period=None):
+        import yfinance as yf  # deferred: only a cache miss pays for it
+        kwargs = {k: v for k, v in {"start": start, "end": end, "period": period}.items() if v is not None}
+        try: raw = yf.download(list(tickers), interval=interval, progress=False, **kwargs)
+        except Exception:
+            self._meter("download", error=True)
+            raise
+        self._meter("download", *_frame_size(raw))
+        return raw
+
+    def fetch_feed(self, url, etag=None, modified=None):
+        headers = {}
+        if etag: headers["If-None-Match"] = etag
+        if modified: headers["If-Modified-Since"] = modified
+        try:
+            r = self.session.get(url, headers=headers, timeout=TIMEOUT)
+            if r.status_code != 304: r.raise_for_status()
+        except Exception:
+            self._meter("feed", error=True)
+            raise
+        if r.status_code == 304:
+            self._meter("feed")
+            return {"status": 304, "etag": etag, "modified": modified, "entries": None}
+        import feedparser
+        parsed = feedparser.parse(r.content)
+        self._meter("feed", len(parsed.entries), len(r.content))
+        return {"status": r.status_code, "etag": r.headers.get("ETag"), "modified": r.headers.get("Last-Modified"),
+                "entries": [{"title": e.title, "link": e.link} for e in parsed.entries]}
+
+
+def _frame_size(raw):
+    # (bars across all tickers, in-memory bytes) of a downloaded (Price, Ticker) frame
+    if raw is None or raw.empty: return 0, 0
+    close = raw["Close"] if "Close" in raw.columns.get_level_values(0) else raw
+    return int(close.notna().to_numpy().sum()), int(raw.memory_usage(deep=True).sum())
+
+
+def _feed_path(root, url):
+    return os.path.join(root, "feeds", hashlib.sha1(url.encode()).hexdigest() + ".json")
+
+
+class RecordingProvider(Provider):
+    name = "record"
+
+    def __init__(self, root, inner=None):
+        super().__init__()
+        self.root = root
+        self.inner = inner or LiveProvider()
+        self._write_lock = threading.Lock()
+
+    def download(self, tickers, interval="1d", start=None, end=None, period=None):
+        import pandas as pd
+        import ohlcv_store
+        self._count("download")
+        raw = self.inner.download(tickers, interval=interval, start=start, end=end, period=period)
+        with self._write_lock:
+            for t, df in ohlcv_store._split(raw, list(tickers)).items():
+                path = os.path.join(self.root, interval, f"{t.replace('/', '_')}.parquet")
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                try: df = pd.concat([pd.read_parquet(path), df])
+                except Exception: pass
+                df = df[~df.index.duplicated(keep="last")].sort_index()
+                df.index.name = "Date"
+                df.to_parquet(path)
+        return raw
+
+    def fetch_feed(self, url, etag=None, modified=None):
+        self._count("feed")
+        # Record a full response: a 304 would leave nothing to replay
+        resp = self.inner.fetch_feed(url)
+        path = _feed_path(self.root, url)
+        with self._write_lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                json.dump({"url": url, "etag": resp["etag"], "modified": resp["modified"], "entries": resp["entries"]}, f)
+        if etag and etag == resp["etag"]:
+            return {**resp, "status": 304, "entries": None}
+        return resp
+
+
+class ReplayProvider(Provider):
+    name = "replay"
+
+    def __init__(self, root):
+        super().__init__()
+        self.root = root
+        if not os.path.isdir(root):
+            raise FileNotFoundError(f"No fixtures at {root}; record them with `python bench.py record`.")
+
+    def download(self, tickers, interval="1d", start=None, end=None, period=None):
+        import pandas as pd
+        import ohlcv_store
+        start = pd.Timestamp(start) if start is not None else ohlcv_store.period_start(period)
+        frames = {}
+        for t in tickers:
+            try: df = pd.read_parquet(os.path.join(self.root, interval, f"{t.replace('/', '_')}.parquet"))
+            except Exception: continue  # unknown symbol: same as Yahoo returning nothing
+            if start is not None: df = df[df.index >= start]
+            if end is not None: df = df[df.index < pd.Timestamp(end)]
+            if not df.empty: frames[t] = df
+        raw = pd.concat(frames, axis=1, names=["Ticker", "Price"]).swaplevel(axis=1).sort_index(axis=1) if frames else pd.DataFrame()
+        self._meter("download", *_frame_size(raw))
+        return raw
+
+    def fetch_feed(self, url, etag=None, modified=None):
+        try:
+            with open(_feed_path(self.root, url)) as f:
+                rec = json.load(f)
+        except OSError:
+            self._meter("feed", error=True)
+            raise
+        self._meter("feed", len(rec["entries"]) if etag != rec["etag"] else 0)
+        if etag and etag == rec["etag"]:
+            return {"status": 304, "etag": etag, "modified": modified, "entries": None}
+        return {"status": 200, "etag": rec["etag"], "modified": rec["modified"], "entries": rec["entries"]}
+
+
+def from_spec(spec):
+    # "live" | "record:<dir>" | "replay:<dir>"
+    kind, _, root = (spec or "live").partition(":")
+    if kind == "live": return LiveProvider()
+    if kind == "record": return RecordingProvider(root)
+    if kind == "replay": return ReplayProvider(root)
+    raise ValueError(f"Unknown data provider {spec!r}; expected live, record:<dir> or replay:<dir>")
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider():
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = from_spec(os.environ.get("MARKET_AGENT_PROVIDER", "live"))
+        return _provider
+
+
+def set_provider(provider):
+    global _provider
+    with _provider_lock:
+        _provider = provider
+    return provider
@@ -0,0 +1,171 @@
+"""Parameter sweep of the Rotation Radar cut-offs over a universe's history.
+
+Every trading day of every ticker is classified with engine.rotation_bucket_index
+under each point of a grid of RADAR_PARAMS (z cut-off and window, win-rate split
+and band, month-over-month swing). Each grid point is then scored by what
+followed: the bucket's predicted direction (+1 rotate in, -1 rotate out, 0 no
+call) times the ticker's forward 1M / 2M return in excess of the universe
+average that day. "Score" is the mean of the two.
+
+Seasonal win rates are point-in-time: a month's rate uses only the same
+calendar month of earlier years (`lookback` of them, at least MIN_YEARS), so
+no day sees a return that had not happened yet.
+
+The inputs (closes, win rates, forward returns) are written once as .npy files
+and every worker maps them read-only with np.load(mmap_mode="r"), so a process
+pool shares one copy through the page cache instead of pickling the arrays to
+each worker. Grid points are grouped by window, so each worker computes a
+window's z-scores once and reuses them for the rest of its points.
+"""
+import itertools
+import multiprocessing
+import os
+import shutil
+import tempfile
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import metrics
+import engine
+from engine import RADAR_PARAMS, ROTATION_BUCKETS
+
+SWEEP_START = "1999-01-01"  # SPDR sector ETFs list in Dec 1998
+SWEEP_GRID = {"z": [1.5, 2.0, 2.5], "window": [20, 50, 100], "win_split": [45, 50, 55], "win_band": [5, 10], "swing": [5, 10, 15]}
+FORWARD_DAYS = {"1M": 21, "2M": 42}
+MIN_YEARS = 5  # same-month history a win rate needs before a day is scored
+TASKS_PER_WORKER = 4
+
+_SHARED = {}  # per process: memory-mapped inputs, plus z-scores by window
+
+
+def _point_in_time_wins(close, years):
+    # Win % of each calendar month over the `years` before it, for every month through next month
+    import pandas as pd
+    monthly = close.resample("ME").last()
+    monthly.index = monthly.index.to_period("M")
+    monthly = monthly.reindex(pd.period_range(monthly.index[0], monthly.index[-1] + 1, freq="M"))
+    returns = monthly.pct_change(fill_method=None)
+    up = (returns > 0).astype(float).where(returns.notna())
+    return up.groupby(up.index.month).transform(lambda g: g.shift(1).rolling(years, min_periods=MIN_YEARS).mean()) * 100
+
+
+def prepare(close, lookback="10y", horizons=FORWARD_DAYS):
+    """Aligned (day x ticker) arrays for the sweep: closes, current / next month win %, forward excess returns."""
+    import numpy as np
+    import seasonality
+    close = close.sort_index().ffill().astype(float)
+    wins = _point_in_time_wins(close, seasonality.LOOKBACKS[lookback])
+    months = close.index.to_period("M")
+    arrays = {"close": close.to_numpy(),
+              "curr_win": wins.reindex(months).to_numpy(dtype="float32"),
+              "next_win": wins.reindex(months + 1).to_numpy(dtype="float32")}
+    c = arrays["close"]
+    for h, n in horizons.items():
+        fwd = np.full_like(c, np.nan)
+        fwd[:-n] = c[n:] / c[:-n] - 1
+        with warnings.catch_warnings():  # days where no ticker has a forward price yet
+            warnings.simplefilter("ignore", RuntimeWarning)
+            fwd -= np.nanmean(fwd, axis=1, keepdims=True)
+        arrays[f"fwd_{h}"] = fwd.astype("float32")
+    return arrays
+
+
+def _init(paths):
+    import numpy as np
+    _SHARED.clear()
+    _SHARED.update({name: np.load(path, mmap_mode="r") for name, path in paths.items()})
+
+
+def _zscores(window):
+    # Rolling z-score of every column from prefix sums: NaN until a full window, as pandas rolling(window) gives
+    import numpy as np
+    if ("z", window) in _SHARED: return _SHARED[("z", window)]
+    x = np.asarray(_SHARED["close"])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        x = x - np.nanmean(x, axis=0)  # centred, so the sum-of-squares difference keeps its precision
+        valid = ~np.isnan(x)
+        xv = np.where(valid, x, 0.0)
+        zero = np.zeros((1, x.shape[1]))
+        s1, s2, n = (np.concatenate([zero, a.cumsum(axis=0)]) for a in (xv, xv * xv, valid.astype(float)))
+        s1, s2, n = s1[window:] - s1[:-window], s2[window:] - s2[:-window], n[window:] - n[:-window]
+        mean = s1 / window
+        std = np.sqrt(np.maximum(s2 - s1 * mean, 0.0) / (window - 1))
+        z = np.full_like(x, np.nan)
+        z[window - 1:] = np.where((n == window) & (std > 0), (x[window - 1:] - mean) / std, np.nan)
+    _SHARED[("z", window)] = z
+    return z
+
+
+def _score(window, points):
+    import numpy as np
+    directions = np.array([d for _, _, d, _ in ROTATION_BUCKETS] + [0])
+    z = _zscores(window)
+    curr, nxt = _SHARED["curr_win"], _SHARED["next_win"]
+    valid = ~np.isnan(z) & ~np.isnan(curr) & ~np.isnan(nxt)
+    fwd = {k[4:]: v for k, v in _SHARED.items() if isinstance(k, str) and k.startswith("fwd_")}
+    rows = []
+    for params in points:
+        d = directions[engine.rotation_bucket_index(z, curr, nxt, {**params, "window": window})]
+        called = valid & (d != 0)
+        row = {**params, "window": window, "Days": int(valid.sum()), "Calls %": called.sum() / max(valid.sum(), 1) * 100}
+        for h, f in fwd.items():
+            mask = called & ~np.isnan(f)
+            signed = d[mask] * f[mask]
+            row[f"{h} Score %"] = float(signed.mean() * 100) if len(signed) else np.nan
+            row[f"{h} Hit %"] = float((signed > 0).mean() * 100) if len(signed) else np.nan
+        rows.append(row)
+    return rows
+
+
+def _tasks(grid, workers):
+    # (window, [other params]) chunks, grouped by window so a worker reuses each window's z-scores
+    keys = [k for k in grid if k != "window"]
+    points = [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+    per_window = max(1, len(points) * len(grid["window"]) // max(1, workers * TASKS_PER_WORKER))
+    return [(w, points[i:i + per_window]) for w in grid["window"] for i in range(0, len(points), per_window)]
+
+
+@metrics.timed
+def sweep(close, grid=None, lookback="10y", workers=0, horizons=FORWARD_DAYS):
+    """Score every point of `grid` (RADAR_PARAMS name -> values; missing names use the current value).
+
+    close: daily closes (date x ticker). workers > 1 spreads the grid over a process pool.
+    Returns one row per grid point, best "Score" first, with the live settings flagged in "Current".
+    """
+    import numpy as np
+    import pandas as pd
+    grid = {k: list((grid or SWEEP_GRID).get(k, [v])) for k, v in RADAR_PARAMS.items()}
+    if min(grid["window"]) < 2: raise ValueError("z-score windows need at least 2 days")
+    arrays = prepare(close, lookback, horizons)
+    tmp = tempfile.mkdtemp(prefix="radar_sweep_")
+    try:
+        paths = {}
+        for name, a in arrays.items():
+            paths[name] = os.path.join(tmp, f"{name}.npy")
+            np.save(paths[name], a)
+        del arrays
+        tasks = _tasks(grid, workers)
+        if workers and workers > 1 and len(tasks) > 1:
+            # spawn, not fork: the dashboard process runs background threads
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_init, initargs=(paths,)) as pool:
+                parts = list(pool.map(_score, *zip(*tasks)))
+        else:
+            _init(paths)
+            try: parts = [_score(*task) for task in tasks]
+            finally: _SHARED.clear()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    out = pd.DataFrame([row for part in parts for row in part])
+    out["Score"] = out[[f"{h} Score %" for h in horizons]].mean(axis=1)
+    out["Current"] = np.logical_and.reduce([out[k] == v for k, v in RADAR_PARAMS.items()])
+    cols = list(RADAR_PARAMS) + ["Score"] + [c for c in out.columns if c not in RADAR_PARAMS and c not in ("Score", "Current")] + ["Current"]
+    return out[cols].sort_values("Score", ascending=False, ignore_index=True)
+
+
+@metrics.timed
+def load_sweep(tickers, start=SWEEP_START, grid=None, lookback="10y", workers=0):
+    close = engine.load_close_parallel(tickers, start=start)
+    if close.empty: raise engine.DataUnavailable("No history for the sweep universe")
+    return sweep(close, grid, lookback, workers)
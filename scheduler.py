@@ -0,0 +1,78 @@
+"""Background cache warmer with per-data-class invalidation.
+
+Each data class (e.g. "quotes", "history", "news") registers a warm job and
+the in-memory caches that depend on it. A daemon thread re-runs every job on
+its own cadence so visitors hit warm data, and `invalidate` refreshes just
+the classes asked for instead of clearing every cache.
+"""
+import os
+import threading
+import time
+import metrics
+
+# Seconds between warms per data class; override with MARKET_AGENT_WARM_<CLASS>=<seconds>
+SCHEDULE = {"quotes": 300, "history": 3600, "news": 300}
+TICK = 5
+ENABLED = os.environ.get("MARKET_AGENT_WARMER", "on") != "off"  # benchmarks turn the background thread off
+
+
+class CacheWarmer:
+    def __init__(self, tick=TICK):
+        self.tick = tick
+        self.jobs = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def register(self, data_class, warm, every=None, clear=()):
+        every = every or SCHEDULE.get(data_class, 600)
+        self.jobs[data_class] = {
+            "warm": warm, "clear": list(clear), "lock": threading.Lock(),
+            "every": float(os.environ.get(f"MARKET_AGENT_WARM_{data_class.upper()}", every)),
+            "last": None, "duration": None, "error": None,
+        }
+        return self
+
+    def _run(self, data_class):
+        job = self.jobs[data_class]
+        with job["lock"]:
+            t0 = time.time()
+            try:
+                job["warm"]()
+                job["error"] = None
+            except Exception as e:
+                metrics.swallowed(f"warm.{data_class}", e)
+                job["error"] = str(e)
+            job["last"], job["duration"] = time.time(), time.time() - t0
+            metrics.record_time(f"warm.{data_class}", job["duration"])
+
+    def run_pending(self):
+        now = time.time()
+        for data_class, job in self.jobs.items():
+            if job["last"] is None or now - job["last"] >= job["every"]:
+                self._run(data_class)
+
+    def invalidate(self, *data_classes):
+        # Drop the in-memory caches of the given classes and re-pull them right away
+        for data_class in data_classes:
+            for clear in self.jobs[data_class]["clear"]:
+                clear()
+            self._run(data_class)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.run_pending()
+            self._stop.wait(self.tick)
+
+    def start(self):
+        if not ENABLED: return self
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="cache-warmer", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        return {c: {"every": j["every"], "last": j["last"], "duration": j["duration"], "error": j["error"]} for c, j in self.jobs.items()}
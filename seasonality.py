@@ -0,0 +1,90 @@
+"""Precomputed ticker x calendar-month seasonality index.
+
+Stats (win %, mean, median, count of monthly returns) are stored per ticker,
+lookback and calendar month in one small Parquet table. They only change when
+a month closes, so a lookup is a dict read; a ticker is recomputed from its
+monthly bars in the OHLCV store (refreshed incrementally) once a new month
+has closed. All lookback windows are cut from the same monthly series.
+"""
+import os
+import threading
+import pandas as pd
+import ohlcv_store
+
+LOOKBACKS = {"5y": 5, "10y": 10, "20y": 20}
+INDEX_PATH = os.path.join(ohlcv_store.CACHE_DIR, "seasonality_index.parquet")
+COLUMNS = ["ticker", "lookback", "month", "win", "mean", "median", "count", "as_of"]
+
+
+def last_closed_month():
+    return pd.Timestamp.today().to_period("M") - 1
+
+
+def compute_stats(monthly_close, as_of):
+    # Monthly closes (any DatetimeIndex) -> index rows for every lookback, using closed months only
+    closes = monthly_close.dropna()
+    closes.index = closes.index.to_period("M")
+    closes = closes[~closes.index.duplicated(keep="last")]
+    returns = (closes.pct_change() * 100).dropna()
+    returns = returns[returns.index <= as_of]
+    rows = []
+    for lookback, years in LOOKBACKS.items():
+        window = returns[returns.index > as_of - 12 * years]
+        by_month = window.groupby(window.index.month)
+        stats = pd.DataFrame({"win": (window > 0).groupby(window.index.month).mean() * 100,
+                              "mean": by_month.mean(), "median": by_month.median(), "count": by_month.size()})
+        for month, r in stats.iterrows():
+            rows.append({"lookback": lookback, "month": int(month), **r.to_dict(), "as_of": str(as_of)})
+    return rows
+
+
+class SeasonalityIndex:
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stats = {}   # (ticker, lookback) -> 12-row frame indexed by calendar month
+        self._as_of = {}   # ticker -> last closed month the stats include
+        try: self._load(pd.read_parquet(path))
+        except Exception: pass
+
+    def _load(self, table):
+        for (ticker, lookback), g in table.groupby(["ticker", "lookback"]):
+            self._stats[(ticker, lookback)] = g.set_index("month")[["win", "mean", "median", "count"]].sort_index()
+            self._as_of[ticker] = pd.Period(g["as_of"].iloc[0], "M")
+
+    def _table(self):
+        frames = [g.reset_index().assign(ticker=t, lookback=lb, as_of=str(self._as_of[t])) for (t, lb), g in self._stats.items()]
+        return pd.concat(frames, ignore_index=True)[COLUMNS] if frames else pd.DataFrame(columns=COLUMNS)
+
+    def stale(self, tickers):
+        as_of = last_closed_month()
+        return [t for t in dict.fromkeys(tickers) if self._as_of.get(t) != as_of]
+
+    def update(self, tickers):
+        # Recompute only tickers whose stats predate the last closed month, with one bulk monthly-bar request
+        stale = self.stale(tickers)
+        if not stale: return []
+        as_of = last_closed_month()
+        start = (as_of - 12 * max(LOOKBACKS.values()) - 1).to_timestamp()
+        hist = ohlcv_store.get_history(stale, start=start, interval="1mo", max_age=0)
+        if hist.empty: return []
+        rows = []
+        for t in stale:
+            if t in hist['Close'].columns:
+                rows += [{"ticker": t, **r} for r in compute_stats(hist['Close'][t], as_of)]
+        if not rows: return []
+        fresh = pd.DataFrame(rows)
+        with self._lock:
+            self._load(fresh)
+            table = self._table()
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            table.to_parquet(tmp, index=False)
+            os.replace(tmp, self.path)
+        return sorted(set(fresh["ticker"]))
+
+    def lookup(self, ticker, lookback="10y", month=None):
+        if self.stale([ticker]): self.update([ticker])
+        stats = self._stats.get((ticker, lookback))
+        if stats is None or month is None: return stats
+        return stats.loc[month] if month in stats.index else None
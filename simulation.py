@@ -0,0 +1,108 @@
+"""Forward Monte Carlo simulation of a fixed-weight strategy.
+
+Paths are drawn from the strategy's own daily history, either by block
+bootstrap (resampling runs of consecutive days, which keeps volatility
+clustering and cross-asset co-movement) or from a multivariate normal fitted
+to the asset returns. Weights are rebalanced daily, as in the historical
+stress test, so a multivariate-normal draw of the assets is equivalent to a
+normal draw of the portfolio return with mean w.mu and variance w'Σw; that
+is what gets sampled.
+
+Paths are generated in chunks of CHUNK. A chunk's returns are drawn into
+one CHUNK x horizon float64 buffer that is turned into growth in place, and
+drawdowns are tracked one day at a time, so each worker holds about
+CHUNK x horizon x 8 bytes (100 MB for 5 years) plus the FAN_PATHS paths
+kept for the chart, regardless of the path count. Every SEED_PATHS paths
+draw from their own seed spawned from one SeedSequence, and chunks are whole
+multiples of SEED_PATHS, so for a given seed the paths do not depend on the
+chunk size or on how chunks are split across workers; `workers > 1` runs the
+chunks in a process pool.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+CHUNK = 10_000
+SEED_PATHS = 1_000  # paths drawn from one spawned seed
+PERCENTILES = [5, 25, 50, 75, 95]
+HORIZONS = {"3 Months": 63, "6 Months": 126, "1 Year": 252, "3 Years": 756, "5 Years": 1260}
+FAN_PATHS = 2_000  # paths kept for the over-time percentile chart
+
+
+def _draw(out, port, method, block, seed):
+    # Fill `out` (paths x horizon) with daily portfolio returns from one seed
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    n, horizon = out.shape
+    if method == "bootstrap":
+        n_blocks = -(-horizon // block)
+        starts = rng.integers(0, len(port) - block + 1, size=(n, n_blocks))
+        for b in range(n_blocks):  # one block column at a time: no paths x horizon index array
+            days = min(block, horizon - b * block)
+            out[:, b * block:b * block + days] = port[starts[:, b, None] + np.arange(days)]
+    else:
+        mu, sigma = port
+        rng.standard_normal(out=out)
+        out *= sigma
+        out += mu
+
+
+def _chunk(port, sizes, horizon, method, block, seeds, keep):
+    # -> terminal value / max drawdown per path (start = 1.0), plus the first `keep` growth paths
+    import numpy as np
+    growth = np.empty((sum(sizes), horizon))
+    row = 0
+    for n, seed in zip(sizes, seeds):
+        _draw(growth[row:row + n], port, method, block, seed)
+        row += n
+    growth += 1.0
+    np.cumprod(growth, axis=1, out=growth)
+    peak = np.ones(len(growth))
+    max_dd = np.zeros(len(growth))
+    for day in growth.T:  # running peak and worst drawdown, one day of every path at a time
+        np.maximum(peak, day, out=peak)
+        np.minimum(max_dd, day / peak - 1.0, out=max_dd)
+    return growth[:, -1].copy(), max_dd, growth[:keep].copy()
+
+
+def simulate(returns, weights, horizon=252, n_paths=10_000, method="bootstrap", block=20, seed=None, workers=0, chunk=CHUNK):
+    """Forward-simulate a strategy from its historical daily asset returns.
+
+    returns: (days x assets) DataFrame or array; weights: same asset order, summing to 1.
+    Returns terminal value and max drawdown per path (start = 100) and percentile bands.
+    """
+    import numpy as np
+    r = np.asarray(returns, dtype=float)
+    w = np.asarray(weights, dtype=float)
+    if method == "bootstrap":
+        port = r @ w
+        if len(port) < block + 1: raise ValueError(f"Need more than {block} days of history to bootstrap {block}-day blocks")
+    elif method == "normal":
+        port = (float(r.mean(axis=0) @ w), float(np.sqrt(w @ np.cov(r, rowvar=False, ddof=1).reshape(len(w), len(w)) @ w)))
+    else:
+        raise ValueError(f"Unknown method {method!r}; expected 'bootstrap' or 'normal'")
+
+    blocks = [min(SEED_PATHS, n_paths - i) for i in range(0, n_paths, SEED_PATHS)]
+    seeds = np.random.SeedSequence(seed).spawn(len(blocks))
+    per_chunk = max(1, chunk // SEED_PATHS)
+    jobs = []
+    for i in range(0, len(blocks), per_chunk):
+        sizes = blocks[i:i + per_chunk]
+        keep = min(sum(sizes), max(0, FAN_PATHS - i * SEED_PATHS))
+        jobs.append((port, sizes, horizon, method, block, seeds[i:i + per_chunk], keep))
+    if workers and workers > 1 and len(jobs) > 1:
+        # spawn, not fork: the dashboard process runs background threads
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            parts = list(pool.map(_chunk, *zip(*jobs)))
+    else:
+        parts = [_chunk(*job) for job in jobs]
+
+    terminal = np.concatenate([p[0] for p in parts]) * 100
+    max_dd = np.concatenate([p[1] for p in parts]) * 100
+    fan = np.concatenate([p[2] for p in parts if len(p[2])]) * 100
+    return {
+        "terminal": terminal, "max_dd": max_dd,
+        "terminal_bands": dict(zip(PERCENTILES, np.percentile(terminal, PERCENTILES))),
+        "max_dd_bands": dict(zip(PERCENTILES, np.percentile(max_dd, PERCENTILES))),
+        "p_loss": float((terminal < 100).mean()),
+        "fan": {p: np.percentile(fan, p, axis=0) for p in PERCENTILES},  # value by day, from the first FAN_PATHS paths
+    }
@@ -0,0 +1,62 @@
+"""Cross-process single-flight locks for the shared on-disk store.
+
+Replicas behind a load balancer point MARKET_AGENT_CACHE_DIR at the same
+directory (a shared volume on one host, or a network mount). Before a
+process fetches a ticker it takes that ticker's lock file; a second process
+needing the same ticker blocks on the lock, then finds the series freshly
+written and reads it instead of going upstream. Locks are advisory flock()
+locks, so a crashed holder releases them with its file descriptors.
+
+Where fcntl is unavailable (Windows) locking degrades to a no-op, i.e. the
+previous per-process behaviour.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX
+    fcntl = None
+
+LOCK_TIMEOUT = float(os.environ.get("MARKET_AGENT_LOCK_TIMEOUT", 60))  # longest wait on another process's fetch
+POLL = 0.05
+
+
+def _lock_path(lock_dir, key):
+    return os.path.join(lock_dir, key.replace("/", "_") + ".lock")
+
+
+@contextmanager
+def hold(lock_dir, keys, timeout=LOCK_TIMEOUT):
+    """Hold the locks for `keys` (taken in sorted order, so overlapping sets cannot deadlock).
+
+    Yields the keys this process had to wait for: another process was fetching them, so the
+    caller should re-check its store before fetching them again. A lock still held after
+    `timeout` seconds is skipped rather than waited on forever.
+    """
+    if fcntl is None or not keys:
+        yield set()
+        return
+    os.makedirs(lock_dir, exist_ok=True)
+    held, waited = [], set()
+    try:
+        for key in sorted(set(keys)):
+            f = open(_lock_path(lock_dir, key), "a")
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    held.append(f)
+                    break
+                except BlockingIOError:
+                    waited.add(key)
+                    if time.monotonic() >= deadline:
+                        f.close()
+                        break
+                    time.sleep(POLL)
+        yield waited
+    finally:
+        for f in held:
+            fcntl.flock(f, fcntl.LOCK_UN)
+            f.close()
@@ -0,0 +1,131 @@
+"""Snapshot of the computed terminal state for instant cold starts.
+
+Everything the terminal tab shows (quotes, SMAs and RSIs, the live-mode
+anchors, the sector leaderboard, headlines) is held in one TerminalState and
+written to a compact JSON file in the shared cache directory each time it is
+recomputed. A fresh process starts from that file, so the first visitor after
+a restart is served in milliseconds. State older than MAX_AGE is still served,
+stamped with its age, while one background thread recomputes it
+(stale-while-revalidate). Only a first-ever start, with no snapshot on disk,
+computes inline.
+
+Replicas sharing MARKET_AGENT_CACHE_DIR share the snapshot: a process with
+stale state first adopts a newer file written by another replica before it
+recomputes.
+"""
+import json
+import os
+import threading
+import time
+import metrics
+import ohlcv_store
+
+SNAPSHOT_PATH = os.path.join(ohlcv_store.CACHE_DIR, "terminal_snapshot.json")
+MAX_AGE = float(os.environ.get("MARKET_AGENT_SNAPSHOT_MAX_AGE", 600))  # seconds before a served state is recomputed
+RETRY_AFTER = 60  # seconds between background attempts after a failed refresh
+VERSION = 1
+
+
+def _default(obj):
+    # Timestamps (live anchors) as ISO strings, numpy scalars as plain numbers
+    if hasattr(obj, "isoformat"): return obj.isoformat()
+    if hasattr(obj, "item"): return obj.item()
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+
+def write(state, path=SNAPSHOT_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"  # the warmer, refresh and render threads all publish
+    with open(tmp, "w") as f:
+        json.dump({**state, "version": VERSION}, f, separators=(",", ":"), default=_default)
+    os.replace(tmp, path)
+
+
+def read(path=SNAPSHOT_PATH):
+    """The snapshot at `path`, or None when there is none (or it was written by an incompatible version)."""
+    import pandas as pd
+    try:
+        with open(path) as f: state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.pop("version", None) != VERSION: return None
+    for a in state.get("anchors", {}).values():  # JSON turned the timestamps and SMA-window keys into strings
+        a["date"] = pd.Timestamp(a["date"])
+        a["sma"] = {int(w): s for w, s in a["sma"].items()}
+    return state
+
+
+class TerminalState:
+    def __init__(self, compute, path=SNAPSHOT_PATH, max_age=MAX_AGE):
+        # compute() -> {"q", "anchors", "leaderboard"}; it should raise rather than return an empty state,
+        # so a failed refresh keeps the last good snapshot up
+        self._compute, self.path, self.max_age = compute, path, max_age
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()  # single flight: one compute at a time, whoever asks for it
+        self._thread = None
+        self._state = read(path)
+        self.error, self._failed_at = None, None
+
+    def _publish(self, merge):
+        # Build the new state from the current one and publish it to memory and disk in one step, so a
+        # concurrent update() or refresh() can never publish over a state it did not see
+        with self._lock:
+            state = merge(self._state)
+            if state is None: return None
+            self._state = state
+            try: write(state, self.path)
+            except OSError as e: metrics.swallowed("snapshot.write", e)
+            return state
+
+    @metrics.timed(name="snapshot.refresh")
+    def refresh(self):
+        # Recompute now and publish; headlines carry over until update() replaces them. A caller that
+        # arrives while another refresh is computing waits for it and gets its result instead of recomputing.
+        seen = self.as_of()
+        with self._refresh_lock:
+            if self.as_of() != seen:
+                with self._lock: return self._state
+            parts = self._compute()
+            state = self._publish(lambda current: {**(current or {}), **parts, "as_of": time.time()})
+            self.error, self._failed_at = None, None
+            return state
+
+    def update(self, **parts):
+        # Patch part of the published state without recomputing the quotes; dict parts (e.g. headlines by
+        # feed URL) are merged into what is there, so a feed missing from `parts` keeps its last entries
+        def merge(current):
+            if current is None: return None
+            return {**current, **{k: {**current.get(k, {}), **v} if isinstance(v, dict) else v for k, v in parts.items()}}
+        self._publish(merge)
+
+    def _refresh_quietly(self):
+        try: self.refresh()
+        except Exception as e:
+            metrics.swallowed("snapshot.refresh", e)
+            self.error, self._failed_at = str(e), time.time()
+
+    def refresh_async(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive(): return
+            if self._failed_at is not None and time.time() - self._failed_at < RETRY_AFTER: return
+            self._thread = threading.Thread(target=self._refresh_quietly, name="terminal-snapshot", daemon=True)
+            self._thread.start()
+
+    def refreshing(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def as_of(self):
+        with self._lock: return self._state["as_of"] if self._state else None
+
+    def get(self):
+        """-> (state, age in seconds). Stale state is returned as-is and recomputed in the background."""
+        with self._lock: state = self._state
+        if state is None: return self.refresh(), 0.0
+        age = time.time() - state["as_of"]
+        if age > self.max_age:
+            disk = read(self.path)  # another replica may already have refreshed it
+            if disk is not None and disk["as_of"] > state["as_of"]:
+                with self._lock: self._state = state = disk
+                age = time.time() - state["as_of"]
+            if age > self.max_age: self.refresh_async()
+        return state, age
@@ -0,0 +1,64 @@
+import os
+import sys
+import tempfile
+import pytest
+
+# The modules live at the repo root and create their cache directory on first write; keep that out of the tree
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("MARKET_AGENT_CACHE_DIR", tempfile.mkdtemp(prefix="market_agent_tests_"))
+os.environ.setdefault("MARKET_AGENT_WARMER", "off")
+
+import providers  # noqa: E402
+
+
+class FakeProvider(providers.Provider):
+    """Daily bars on business days up to `today` for every symbol except those in `unknown`.
+
+    Each ticker's close on a day is fixed, so a re-download overlaps the stored bars exactly.
+    """
+    name = "fake"
+
+    def __init__(self, unknown=(), today="2024-06-28", error=None):
+        super().__init__()
+        self.unknown, self.today, self.error = set(unknown), today, error
+        self.requests = []  # (tickers, start) per download
+
+    def download(self, tickers, interval="1d", start=None, end=None, period=None):
+        import numpy as np
+        import pandas as pd
+        self.requests.append((list(tickers), start))
+        self._count("download")
+        if self.error is not None: raise self.error
+        days = pd.bdate_range("2020-01-01", self.today)
+        if start is not None: days = days[days >= pd.Timestamp(start)]
+        cols = {}
+        for t in tickers:
+            if t in self.unknown or days.empty: continue
+            close = 100 + (days - pd.Timestamp("2020-01-01")).days / 10 + sum(map(ord, t))
+            for f in ("Open", "High", "Low", "Close"): cols[(f, t)] = np.asarray(close, dtype=float)
+            cols[("Volume", t)] = np.full(len(days), 1_000.0)
+        if not cols: return pd.DataFrame()
+        raw = pd.DataFrame(cols, index=days)
+        raw.columns = pd.MultiIndex.from_tuples(raw.columns, names=["Price", "Ticker"])
+        return raw
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """An empty OHLCV store under tmp_path, fed by a FakeProvider, with the breakers and LRU cleared."""
+    import breaker
+    import ohlcv_store
+    monkeypatch.setattr(ohlcv_store, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(ohlcv_store, "LOCK_DIR", str(tmp_path / "locks"))
+    previous = providers.get_provider()
+    provider = providers.set_provider(FakeProvider())
+
+    def clear():
+        breaker.TICKERS.reset()
+        breaker.HOSTS.reset()
+        ohlcv_store.CLOSE_CACHE.clear()
+
+    clear()
+    yield provider
+    providers.set_provider(previous)
+    clear()
@@ -0,0 +1,64 @@
+import pytest
+import breaker
+import ohlcv_store
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(breaker.time, "time", lambda: now[0])
+    return now
+
+
+def test_failure_is_negative_cached_for_the_ttl(clock):
+    b = breaker.CircuitBreaker(negative_ttl=120)
+    b.failure("ZZZZ", "no data")
+    assert b.allow(["ZZZZ", "SMH"]) == ["SMH"]
+    assert b.blocked("ZZZZ")
+    clock[0] += 121
+    assert b.allow(["ZZZZ"]) == ["ZZZZ"]
+
+
+def test_trips_after_repeated_failures_and_backs_off_exponentially(clock):
+    b = breaker.CircuitBreaker(negative_ttl=120, trip_after=3, backoff_base=300, backoff_max=1_000)
+    delays = []
+    for _ in range(5):
+        b.failure("host")
+        delays.append(round(b.status()["host"]["retry_in"]))
+    assert delays == [120, 120, 300, 600, 1_000]
+    assert b.status()["host"]["open"]
+
+
+def test_one_probe_at_a_time_and_success_closes(clock):
+    b = breaker.CircuitBreaker(negative_ttl=120, trip_after=1, backoff_base=300)
+    b.failure("host")
+    clock[0] += 301
+    assert b.allow(["host"]) == ["host"]  # the probe
+    assert b.allow(["host"]) == []        # everyone else while it runs
+    b.success("host")
+    assert b.allow(["host"]) == ["host"] and b.status() == {}
+
+
+def test_unknown_symbol_does_not_block_the_host(store):
+    store.unknown = {"ZZZZ"}
+    assert ohlcv_store.get_close("ZZZZ", start="2024-01-01").empty
+    assert breaker.TICKERS.blocked("ZZZZ")
+    assert breaker.HOSTS.status() == {}
+    assert not ohlcv_store.get_close("SMH", start="2024-01-01").empty
+
+
+def test_partial_answer_only_fails_the_missing_symbols(store):
+    store.unknown = {"ZZZZ"}
+    close = ohlcv_store.get_close(["XLE", "ZZZZ"], start="2024-01-01")
+    assert list(close.columns) == ["XLE"]
+    assert not breaker.TICKERS.blocked("XLE") and breaker.TICKERS.blocked("ZZZZ")
+    assert breaker.HOSTS.status() == {}
+
+
+def test_request_errors_count_against_the_host(store):
+    store.error = ConnectionError("timed out")
+    assert ohlcv_store.get_close("SMH", start="2024-01-01").empty
+    assert breaker.HOSTS.blocked(ohlcv_store.HOST)
+    store.error = None
+    assert ohlcv_store.get_close("XLE", start="2024-01-01").empty  # still backing off: no request
+    assert len(store.requests) == 1
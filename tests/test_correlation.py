@@ -0,0 +1,56 @@
+import itertools
+import numpy as np
+import pandas as pd
+import pytest
+import engine
+
+
+@pytest.fixture
+def returns():
+    rng = np.random.default_rng(11)
+    factors = rng.normal(size=(500, 3))
+    x = factors @ rng.normal(size=(3, 8)) * 0.01 + rng.normal(size=(500, 8)) * 0.01
+    return pd.DataFrame(x, columns=[f"T{i}" for i in range(8)])
+
+
+def test_matches_pandas_on_complete_data(returns):
+    corr = engine.correlation_matrix(returns)
+    pd.testing.assert_frame_equal(corr.astype(float), returns.corr(), atol=1e-5)
+
+
+def test_pairwise_complete_with_gaps(returns):
+    gappy = returns.copy()
+    gappy.iloc[:300, 0] = np.nan                          # late listing
+    gappy.iloc[::3, 1] = np.nan                           # weekends / holidays
+    gappy.iloc[150:, 2] = np.nan                          # delisted before T0 lists: 0 common days
+    gappy.iloc[np.random.default_rng(0).random(500) < 0.2, 3] = np.nan
+    corr = engine.correlation_matrix(gappy, min_overlap=20)
+    pd.testing.assert_frame_equal(corr.astype(float), gappy.corr(min_periods=20), atol=1e-5)
+    assert np.isnan(corr.loc["T0", "T2"])
+    assert corr.loc["T2", "T2"] == 1.0
+
+
+def test_min_overlap(returns):
+    gappy = returns.copy()
+    gappy.iloc[:480, 0] = np.nan  # 20 common days with everything else
+    assert engine.correlation_matrix(gappy, min_overlap=20).notna().all().all()
+    assert engine.correlation_matrix(gappy, min_overlap=21).loc["T0"].drop("T0").isna().all()
+
+
+def test_shrinkage_pulls_toward_the_average(returns):
+    raw = engine.correlation_matrix(returns).to_numpy(dtype=float)
+    shrunk = engine.correlation_matrix(returns, shrinkage=0.25).to_numpy(dtype=float)
+    off = ~np.eye(len(raw), dtype=bool)
+    np.testing.assert_allclose(shrunk[off], 0.75 * raw[off] + 0.25 * raw[off].mean(), atol=1e-5)
+    np.testing.assert_array_equal(np.diag(shrunk), 1.0)
+
+
+def test_clusters_cut_on_average_correlation(returns):
+    corr = engine.correlation_matrix(returns)
+    for min_corr in (0.0, 0.2, 0.4, 0.6):
+        order, labels = engine.correlation_clusters(corr, min_corr)
+        assert sorted(order) == sorted(corr.index)
+        groups = [list(labels[labels == c].index) for c in labels.unique()]
+        # Merging stops once no two clusters average min_corr between them
+        for a, b in itertools.combinations(groups, 2):
+            assert corr.loc[a, b].to_numpy().mean() < min_corr
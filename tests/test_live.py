@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+import engine
+
+FIELDS = list(engine.PRICE_FIELDS) + list(engine.SMA_FIELDS) + ["avg_rsi", "xlre_rsi"]
+
+
+@pytest.fixture
+def close():
+    # Two years of closes: crypto every calendar day, everything else on business days
+    rng = np.random.default_rng(21)
+    days = pd.date_range("2023-01-02", periods=730, freq="D")
+    cols = {}
+    for t in engine.TERMINAL_TICKERS:
+        idx = days if t.endswith("-USD") else days[days.dayofweek < 5]
+        cols[t] = pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.015, len(idx)))), index=idx)
+    return pd.DataFrame(cols)
+
+
+def _with_price(close, prices):
+    # The full-history equivalent of a live quote: today's bar replaced, or a new day appended
+    close = close.copy()
+    for t, (p, ts) in prices.items():
+        day = ts.normalize()
+        if day not in close.index: close.loc[day] = np.nan
+        close.loc[day, t] = p
+    return close.sort_index()
+
+
+def _quotes(close, same_day, seed=0):
+    rng = np.random.default_rng(seed)
+    prices = {}
+    for t in engine.LIVE_TICKERS:
+        s = close[t].dropna()
+        ts = s.index[-1] + (pd.Timedelta(hours=15) if same_day else pd.Timedelta(days=1))
+        prices[t] = (float(s.iloc[-1] * (1 + rng.normal(0, 0.03))), ts)
+    return prices
+
+
+@pytest.mark.parametrize("same_day", [False, True], ids=["append", "replace"])
+def test_live_quotes_match_full_recompute(close, same_day):
+    q, anchors = engine.terminal_quotes(close), engine.live_anchors(close)
+    prices = _quotes(close, same_day)
+    live = engine.live_quotes(q, anchors, prices)
+    ref = engine.terminal_quotes(_with_price(close, prices))
+    for field in FIELDS:
+        assert live[field] == pytest.approx(ref[field], rel=1e-9), field
+    for name in engine.CRYPTOS:
+        assert live["cryptos"][name]["price"] == pytest.approx(ref["cryptos"][name]["price"])
+        assert live["cryptos"][name]["rsi"] == pytest.approx(ref["cryptos"][name]["rsi"], rel=1e-9)
+    assert engine.six_pillars(live) == engine.six_pillars(ref)
+    assert engine.scorecard(live) == engine.scorecard(ref)
+
+
+def test_live_quotes_leave_the_base_state_alone(close):
+    q, anchors = engine.terminal_quotes(close), engine.live_anchors(close)
+    before = {field: q[field] for field in FIELDS}
+    engine.live_quotes(q, anchors, _quotes(close, same_day=False))
+    assert {field: q[field] for field in FIELDS} == before
+
+
+@pytest.mark.parametrize("same_day", [False, True], ids=["append", "replace"])
+def test_live_rsi_matches_rsi_history(close, same_day):
+    anchors = engine.live_anchors(close)
+    for t, (p, ts) in _quotes(close, same_day, seed=1).items():
+        ref = engine.rsi_history(_with_price(close[[t]].dropna(), {t: (p, ts)}), engine.RSI_WINDOW).iloc[-1, 0]
+        assert engine.live_rsi(anchors[t], p, ts) == pytest.approx(ref, rel=1e-9), t
+
+
+def test_live_rsi_edge_cases():
+    idx = pd.bdate_range("2024-01-01", periods=20)
+    flat = engine.live_anchors(pd.DataFrame({"X": 10.0}, index=idx), ["X"])["X"]
+    assert engine.live_rsi(flat, 10.0, idx[-1] + pd.Timedelta(days=1)) == 50.0
+    rising = engine.live_anchors(pd.DataFrame({"X": np.arange(20.0) + 1}, index=idx), ["X"])["X"]
+    assert engine.live_rsi(rising, 25.0, idx[-1] + pd.Timedelta(days=1)) == 100.0
+    short = engine.live_anchors(pd.DataFrame({"X": np.arange(5.0) + 1}, index=idx[:5]), ["X"])["X"]
+    assert engine.live_rsi(short, 7.0, idx[4] + pd.Timedelta(days=1)) is None
+
+
+@pytest.mark.parametrize("same_day", [False, True], ids=["append", "replace"])
+def test_live_zscore_matches_rolling_zscore(close, same_day):
+    w = engine.RADAR_PARAMS["window"]
+    anchors = engine.live_anchors(close)
+    for t, (p, ts) in _quotes(close, same_day, seed=2).items():
+        s = _with_price(close[[t]].dropna(), {t: (p, ts)})[t]
+        ref = (s.iloc[-1] - s.rolling(w).mean().iloc[-1]) / s.rolling(w).std().iloc[-1]
+        assert engine.live_zscore(anchors[t], p, ts) == pytest.approx(ref, rel=1e-9), t
+
+
+def test_live_zscore_needs_a_full_window():
+    idx = pd.bdate_range("2024-01-01", periods=engine.RADAR_PARAMS["window"] // 2)
+    a = engine.live_anchors(pd.DataFrame({"X": np.arange(len(idx)) + 1.0}, index=idx), ["X"])["X"]
+    assert engine.live_zscore(a, 100.0, idx[-1] + pd.Timedelta(days=1)) is None
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import lru
+import metrics
+import ohlcv_store
+
+
+def test_evicts_least_recently_used_past_the_byte_budget():
+    cache = lru.LRUCache(max_bytes=100)
+    for key in "abc":
+        cache.put(key, key.upper(), 40)
+    assert cache.get("a") is None  # 120 > 100: the oldest went
+    assert cache.nbytes == 80 and cache.evictions == 1
+    cache.get("b")                 # b is now the most recent
+    cache.put("d", "D", 40)
+    assert (cache.get("b"), cache.get("c")) == ("B", None)
+
+
+def test_entry_cap_and_oversized_values():
+    cache = lru.LRUCache(max_bytes=1_000, max_entries=2)
+    for key in "abc":
+        cache.put(key, key, 1)
+    assert len(cache) == 2 and cache.get("a") is None
+    cache.put("huge", "x", 1_001)
+    assert cache.get("huge") is None and len(cache) == 2
+
+
+def test_replacing_a_key_does_not_double_count():
+    cache = lru.LRUCache(max_bytes=100)
+    cache.put("a", 1, 60)
+    cache.put("a", 2, 30)
+    assert (cache.get("a"), cache.nbytes, len(cache)) == (2, 30, 1)
+    cache.pop("a")
+    assert cache.nbytes == 0
+
+
+def test_close_prices_are_float32_and_stay_within_the_budget(store, monkeypatch):
+    one = ohlcv_store.get_close("SPY", start="2020-01-01")
+    size = one["SPY"].values.nbytes + one.index.nbytes
+    monkeypatch.setattr(ohlcv_store, "CLOSE_CACHE", lru.LRUCache(max_bytes=int(size * 2.5)))
+    close = ohlcv_store.get_close(["SPY", "QQQ", "IWM", "DIA"], start="2020-01-01")
+    assert (close.dtypes == np.float32).all()
+    status = ohlcv_store.CLOSE_CACHE.status()
+    assert status["entries"] == 2 and status["evictions"] == 2
+    assert ohlcv_store.CLOSE_CACHE.nbytes <= ohlcv_store.CLOSE_CACHE.max_bytes
+
+
+def test_current_entries_are_served_from_memory(store):
+    ohlcv_store.get_close(["SPY", "QQQ"], start="2024-01-01")
+    run = metrics.start_run()
+    again = ohlcv_store.get_close(["SPY", "QQQ"], start="2024-03-01")
+    assert metrics.snapshot(run)["cache"]["ohlcv_store.close_lru.1d"] == {"hits": 2, "misses": 0}
+    assert again.index[0] >= pd.Timestamp("2024-03-01") and len(store.requests) == 1
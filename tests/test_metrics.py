@@ -0,0 +1,48 @@
+import threading
+import pytest
+import metrics
+
+
+@pytest.fixture(autouse=True)
+def clean():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_run_only_holds_the_calling_threads_activity():
+    run = metrics.start_run()
+    metrics.record_network("download", rows=10, nbytes=800)
+    background = threading.Thread(target=lambda: metrics.record_network("download", rows=99, nbytes=9_999))
+    background.start()
+    background.join()
+    metrics.swallowed("engine.rsi", ValueError("bad"))
+    assert metrics.snapshot(run)["network"] == {"download": {"requests": 1, "rows": 10, "bytes": 800, "errors": 0}}
+    assert metrics.snapshot(run)["errors"]["engine.rsi"] == {"count": 1, "last": "ValueError: bad"}
+    assert metrics.snapshot()["network"]["download"]["requests"] == 2  # the process totals see both
+
+
+def test_propagate_carries_the_run_into_helper_threads():
+    run = metrics.start_run()
+    work = metrics.propagate(lambda: metrics.cache_event("ohlcv_store.1d", hits=3, misses=1))
+    helper = threading.Thread(target=work)
+    helper.start()
+    helper.join()
+    assert metrics.snapshot(run)["cache"] == {"ohlcv_store.1d": {"hits": 3, "misses": 1}}
+
+
+def test_a_new_run_starts_empty():
+    metrics.start_run()
+    metrics.record_time("engine.sma", 0.5)
+    run = metrics.start_run()
+    metrics.record_time("engine.rsi", 0.25)
+    assert list(metrics.snapshot(run)["timings"]) == ["engine.rsi"]
+    assert set(metrics.snapshot()["timings"]) == {"engine.sma", "engine.rsi"}
+
+
+def test_timed_and_prometheus_export():
+    run = metrics.start_run()
+    traced = metrics.timed(name="demo.work")(lambda: 42)
+    assert traced() == 42
+    assert metrics.snapshot(run)["timings"]["demo.work"]["calls"] == 1
+    assert 'market_agent_function_calls_total{function="demo.work"} 1' in metrics.to_prometheus()
@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+import ohlcv_store
+
+
+@pytest.mark.parametrize("fetched_from, start, expected", [
+    ("max", None, True),
+    ("max", pd.Timestamp("2001-01-01"), True),
+    ("2020-01-01", pd.Timestamp("2021-06-01"), True),
+    ("2020-01-01", pd.Timestamp("2020-01-01"), True),
+    ("2020-01-01", pd.Timestamp("2019-12-31"), False),
+    ("2020-01-01", None, False),  # full history asked of a series fetched from a start date
+])
+def test_covers(fetched_from, start, expected):
+    assert ohlcv_store._covers(fetched_from, start) is expected
+
+
+def test_fresh_series_are_served_without_a_request(store):
+    first = ohlcv_store.get_history("SPY", start="2024-01-01")
+    again = ohlcv_store.get_history("SPY", start="2024-03-01")
+    assert len(store.requests) == 1
+    assert again.index[0] >= pd.Timestamp("2024-03-01")
+    pd.testing.assert_frame_equal(again, first[first.index >= "2024-03-01"], check_freq=False)
+
+
+def test_stale_series_appends_only_the_new_bars(store):
+    ohlcv_store.refresh(["SPY", "QQQ"], pd.Timestamp("2024-01-01"))
+    stored = ohlcv_store.read("SPY")
+    store.today = "2024-07-05"
+    frames = ohlcv_store.refresh(["SPY", "QQQ"], pd.Timestamp("2024-01-01"), max_age=0)
+    # One request for both, starting at the last stored bar (it may have been a partial day)
+    assert store.requests[-1] == (["SPY", "QQQ"], stored.index[-1])
+    spy = frames["SPY"]
+    assert spy.index.is_unique and spy.index.is_monotonic_increasing
+    assert spy.index[-1] == pd.Timestamp("2024-07-05")
+    pd.testing.assert_frame_equal(spy.loc[:stored.index[-1]], stored, check_freq=False)
+    assert ohlcv_store.read("SPY").attrs["fetched_from"] == "2024-01-01"
+
+
+def test_earlier_start_backfills_the_full_window(store):
+    ohlcv_store.refresh(["SPY"], pd.Timestamp("2024-01-01"))
+    frames = ohlcv_store.refresh(["SPY"], pd.Timestamp("2023-01-02"))
+    assert store.requests[-1] == (["SPY"], pd.Timestamp("2023-01-02"))
+    assert frames["SPY"].index[0] == pd.Timestamp("2023-01-02")
+    assert ohlcv_store.read("SPY").attrs["fetched_from"] == "2023-01-02"
+
+
+def test_failed_refresh_keeps_serving_the_stored_bars(store):
+    ohlcv_store.refresh(["SPY"], pd.Timestamp("2024-01-01"))
+    stored = ohlcv_store.read("SPY")
+    store.error = ConnectionError("timed out")
+    frames = ohlcv_store.refresh(["SPY"], pd.Timestamp("2024-01-01"), max_age=0)
+    pd.testing.assert_frame_equal(frames["SPY"], stored)
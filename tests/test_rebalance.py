@@ -0,0 +1,78 @@
+import pandas as pd
+import pytest
+import rebalance
+
+SIXTY_FORTY = "60/40 Portfolio"  # VTI 60%, BND 40%
+ALL_WEATHER = "All-Weather (Dalio)"
+
+
+@pytest.fixture
+def holdings():
+    return pd.DataFrame({
+        "account": ["a", "a", "a", "b", "b", "c", "d"],
+        "ticker": ["VTI", "BND", "ARKK", "vti ", "VTI", "GLD", "VTI"],
+        "value": [5_000.0, 3_000.0, 2_000.0, 400.0, 600.0, 100.0, 0.0],
+        "strategy": [SIXTY_FORTY, None, None, ALL_WEATHER, None, "No Such Strategy", SIXTY_FORTY],
+    })
+
+
+def _rows(holdings, **kwargs):
+    rows, skipped = rebalance.plan(next(rebalance.read_chunks(holdings)), **kwargs)
+    return rows.set_index(["account", "ticker"]), skipped
+
+
+def test_targets_and_trades_total_per_account(holdings):
+    rows, _ = _rows(holdings)
+    by_account = rows.groupby("account")
+    pd.testing.assert_series_equal(by_account["target_value"].sum(), by_account["current_value"].sum(), check_names=False)
+    assert by_account["trade_value"].sum().abs().max() == pytest.approx(0.0, abs=1e-9)
+    assert by_account["target_weight"].sum().tolist() == pytest.approx([1.0, 1.0])
+    assert rows.loc[("a", "VTI"), "target_value"] == pytest.approx(6_000.0)
+    assert rows.loc[("a", "BND"), "trade_value"] == pytest.approx(1_000.0)
+
+
+def test_missing_and_extra_tickers(holdings):
+    rows, _ = _rows(holdings)
+    # Held outside the strategy: sold down to zero
+    arkk = rows.loc[("a", "ARKK")]
+    assert (arkk["action"], arkk["target_value"], arkk["trade_value"]) == ("SELL", 0.0, -2_000.0)
+    # In the strategy but not held: bought from zero
+    tlt = rows.loc[("b", "TLT")]
+    assert (tlt["action"], tlt["current_value"]) == ("BUY", 0.0)
+    assert tlt["target_value"] == pytest.approx(400.0)
+    # Duplicate and untidy ticker rows of one account are summed
+    assert rows.loc[("b", "VTI"), "current_value"] == pytest.approx(1_000.0)
+    assert set(rows.loc["b"].index) == set(rebalance.PORTFOLIOS[ALL_WEATHER]["weights"])
+
+
+def test_skipped_accounts(holdings):
+    rows, skipped = _rows(holdings)
+    assert skipped == {"no or unknown strategy": 1, "zero account value": 1}
+    assert set(rows.index.get_level_values("account")) == {"a", "b"}
+    rows, skipped = _rows(holdings, strategies={"c": SIXTY_FORTY})
+    assert "c" in rows.index.get_level_values("account")
+    assert skipped == {"zero account value": 1}
+
+
+def test_min_trade_leaves_small_drift_alone():
+    h = pd.DataFrame({"account": ["x", "x"], "ticker": ["VTI", "BND"], "value": [600.4, 399.6]})
+    rows, _ = rebalance.plan(h, default=SIXTY_FORTY)
+    assert set(rows["action"]) == {"BALANCED"}
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 2, 3, 50])
+def test_write_trades_matches_one_pass_plan(holdings, tmp_path, chunk_rows):
+    out = tmp_path / "trades.csv"
+    summary = rebalance.write_trades(holdings, out, include_balanced=True, chunk_rows=chunk_rows)
+    rows, _ = rebalance.plan(next(rebalance.read_chunks(holdings)))
+    written = pd.read_csv(out).sort_values(["account", "ticker"], ignore_index=True)
+    expected = rows.round(4).sort_values(["account", "ticker"], ignore_index=True)
+    pd.testing.assert_frame_equal(written, expected, check_dtype=False)
+    assert summary["accounts"] == 2 and summary["skipped"] == {"no or unknown strategy": 1, "zero account value": 1}
+    assert summary["buy_total"] == pytest.approx(summary["sell_total"])
+
+
+def test_ungrouped_accounts_are_rejected(tmp_path):
+    h = pd.DataFrame({"account": ["a", "b", "a"], "ticker": ["VTI", "VTI", "BND"], "value": [1.0, 1.0, 1.0]})
+    with pytest.raises(ValueError, match="not grouped by account"):
+        rebalance.write_trades(h, tmp_path / "trades.csv", default=SIXTY_FORTY, chunk_rows=1)
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+import engine
+
+WINDOWS = (5, 63, 252)
+
+
+@pytest.fixture
+def returns():
+    rng = np.random.default_rng(5)
+    idx = pd.bdate_range("2015-01-01", periods=900)
+    port = pd.Series(rng.normal(0.0004, 0.012, len(idx)), index=idx)
+    bench = 0.6 * port + pd.Series(rng.normal(0.0002, 0.008, len(idx)), index=idx)
+    return port, bench
+
+
+def test_matches_pandas_rolling(returns):
+    port, _ = returns
+    out = engine.rolling_metrics(port, WINDOWS, rf_annual=0.02)
+    level = pd.Series(np.concatenate([[1.0], (1 + port).cumprod().to_numpy()]))
+    for w in WINDOWS:
+        std = port.rolling(w).std()
+        pd.testing.assert_series_equal(out["Volatility %"][w], std * 252**0.5 * 100, check_names=False, rtol=1e-8)
+        sharpe = (port.rolling(w).mean() - 0.02 / 252) / std * 252**0.5
+        pd.testing.assert_series_equal(out["Sharpe"][w], sharpe, check_names=False, rtol=1e-8)
+        # Drawdown from the highest level over the window, its opening level included
+        dd = (level / level.rolling(w + 1, min_periods=1).max() - 1).iloc[1:] * 100
+        dd.iloc[:w - 1] = np.nan
+        np.testing.assert_allclose(out["Drawdown %"][w].to_numpy(), dd.to_numpy(), rtol=1e-8, atol=1e-10)
+
+
+def test_benchmark_correlation(returns):
+    port, bench = returns
+    out = engine.rolling_metrics(port, WINDOWS, bench_returns=bench.iloc[10:])  # aligned on common days
+    both = pd.concat([port, bench.iloc[10:]], axis=1, join="inner")
+    for w in WINDOWS:
+        ref = both.iloc[:, 0].rolling(w).corr(both.iloc[:, 1])
+        pd.testing.assert_series_equal(out["Correlation"][w], ref, check_names=False, rtol=1e-8)
+
+
+def test_windows_longer_than_history_are_nan(returns):
+    port, _ = returns
+    out = engine.rolling_metrics(port.iloc[:50], (63,))
+    assert all(out[m][63].isna().all() for m in out)
+
+
+def test_flat_window_has_no_sharpe():
+    flat = pd.Series(0.001, index=pd.bdate_range("2020-01-01", periods=30))
+    out = engine.rolling_metrics(flat, (10,))
+    assert out["Sharpe"][10].isna().all()
+    assert out["Volatility %"][10].iloc[9:].abs().max() < 1e-9
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+import simulation
+
+
+@pytest.fixture
+def history():
+    return np.random.default_rng(1).normal(0.0004, 0.01, size=(600, 3)), [0.5, 0.3, 0.2]
+
+
+@pytest.mark.parametrize("method", ["bootstrap", "normal"])
+def test_same_seed_same_paths_whatever_the_chunking(history, method):
+    returns, weights = history
+    runs = [simulation.simulate(returns, weights, horizon=60, n_paths=4_500, method=method, seed=7, chunk=chunk)
+            for chunk in (10_000, 2_500, 1_000)]
+    for run in runs[1:]:
+        np.testing.assert_array_equal(run["terminal"], runs[0]["terminal"])
+        np.testing.assert_array_equal(run["max_dd"], runs[0]["max_dd"])
+        for p in simulation.PERCENTILES:
+            np.testing.assert_array_equal(run["fan"][p], runs[0]["fan"][p])
+
+
+def test_different_seeds_differ(history):
+    returns, weights = history
+    a = simulation.simulate(returns, weights, horizon=60, n_paths=1_000, seed=1)
+    b = simulation.simulate(returns, weights, horizon=60, n_paths=1_000, seed=2)
+    assert not np.array_equal(a["terminal"], b["terminal"])
+
+
+def test_bootstrap_replays_history(history):
+    # One block covering the whole horizon is a run of consecutive historical days
+    returns, weights = history
+    sim = simulation.simulate(returns, weights, horizon=20, n_paths=50, block=20, seed=3)
+    port = returns @ np.asarray(weights)
+    windows = {round(float(np.prod(1 + port[i:i + 20]) * 100), 8) for i in range(len(port) - 19)}
+    assert {round(float(v), 8) for v in sim["terminal"]} <= windows
+
+
+def test_shapes_and_bands(history):
+    returns, weights = history
+    sim = simulation.simulate(returns, weights, horizon=30, n_paths=2_500, method="normal", seed=0)
+    assert sim["terminal"].shape == sim["max_dd"].shape == (2_500,)
+    assert (sim["max_dd"] <= 0).all()
+    assert sim["fan"][50].shape == (30,)
+    bands = [sim["terminal_bands"][p] for p in simulation.PERCENTILES]
+    assert bands == sorted(bands)
+    assert sim["p_loss"] == pytest.approx((sim["terminal"] < 100).mean())
+
+
+def test_rejects_short_history_and_unknown_method(history):
+    returns, weights = history
+    with pytest.raises(ValueError):
+        simulation.simulate(returns[:10], weights, block=20)
+    with pytest.raises(ValueError):
+        simulation.simulate(returns, weights, method="garch")
@@ -0,0 +1,60 @@
+import threading
+import time
+import pandas as pd
+import ohlcv_store
+import singleflight
+
+
+def _hold_in_thread(lock_dir, keys, acquired, release):
+    def run():
+        with singleflight.hold(lock_dir, keys):
+            acquired.set()
+            release.wait(5)
+    t = threading.Thread(target=run)
+    t.start()
+    acquired.wait(5)
+    return t
+
+
+def test_uncontended_keys_are_not_waited_for(tmp_path):
+    with singleflight.hold(str(tmp_path), ["1d.SPY", "1d.QQQ"]) as waited:
+        assert waited == set()
+
+
+def test_waits_for_the_holder_then_takes_over(tmp_path):
+    acquired, release = threading.Event(), threading.Event()
+    holder = _hold_in_thread(str(tmp_path), ["1d.SPY"], acquired, release)
+    threading.Timer(0.2, release.set).start()
+    t0 = time.monotonic()
+    with singleflight.hold(str(tmp_path), ["1d.SPY", "1d.QQQ"]) as waited:
+        assert time.monotonic() - t0 >= 0.15
+        assert waited == {"1d.SPY"}
+    holder.join(5)
+
+
+def test_gives_up_on_a_stuck_holder_after_the_timeout(tmp_path):
+    acquired, release = threading.Event(), threading.Event()
+    holder = _hold_in_thread(str(tmp_path), ["1d.SPY"], acquired, release)
+    t0 = time.monotonic()
+    with singleflight.hold(str(tmp_path), ["1d.SPY"], timeout=0.1) as waited:
+        assert waited == {"1d.SPY"} and time.monotonic() - t0 < 2
+    release.set()
+    holder.join(5)
+
+
+def test_concurrent_refreshes_of_a_ticker_download_it_once(store):
+    download = store.download
+
+    def slow_download(*args, **kwargs):
+        time.sleep(0.3)  # long enough for the other thread to queue on the lock
+        return download(*args, **kwargs)
+
+    store.download = slow_download
+    results = {}
+    threads = [threading.Thread(target=lambda i=i: results.update({i: ohlcv_store.refresh(["SPY"], pd.Timestamp("2024-01-01"))}))
+               for i in range(3)]
+    for t in threads: t.start()
+    for t in threads: t.join(10)
+    assert len(store.requests) == 1
+    for frames in results.values():
+        pd.testing.assert_frame_equal(frames["SPY"], results[0]["SPY"], check_freq=False)
@@ -0,0 +1,122 @@
+import threading
+import time
+import pandas as pd
+import pytest
+import snapshot
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "terminal_snapshot.json")
+
+
+def _state(as_of=None):
+    anchors = {"^GSPC": {"date": pd.Timestamp("2024-06-28"), "last": 5460.5, "prev": 5482.9,
+                         "sma": {20: {"sum": 109000.0, "first": 5400.0}, 200: {"sum": 1.0e6, "first": 4800.0}}, "rsi": None}}
+    return {"q": {"spx_now": 5460.5, "missing": []}, "anchors": anchors, "headlines": {"feed": [{"title": "t"}]},
+            "as_of": as_of or time.time()}
+
+
+def test_round_trip_restores_timestamps_and_window_keys(path):
+    state = _state()
+    snapshot.write(state, path)
+    back = snapshot.read(path)
+    assert back == state
+    assert isinstance(back["anchors"]["^GSPC"]["date"], pd.Timestamp)
+    assert list(back["anchors"]["^GSPC"]["sma"]) == [20, 200]
+
+
+def test_missing_or_other_version_reads_as_none(path, monkeypatch):
+    assert snapshot.read(path) is None
+    snapshot.write(_state(), path)
+    monkeypatch.setattr(snapshot, "VERSION", snapshot.VERSION + 1)
+    assert snapshot.read(path) is None
+
+
+def test_cold_start_computes_inline_then_serves_from_disk(path):
+    calls = []
+    compute = lambda: calls.append(1) or {"q": {"spx_now": 1.0}}
+    state, age = snapshot.TerminalState(compute, path).get()
+    assert (state["q"], age, len(calls)) == ({"spx_now": 1.0}, 0.0, 1)
+    state, age = snapshot.TerminalState(compute, path).get()  # a restarted process
+    assert state["q"] == {"spx_now": 1.0} and len(calls) == 1 and age >= 0
+
+
+def test_stale_state_is_served_while_refreshing_in_background(path):
+    snapshot.write(_state(as_of=time.time() - 3_600), path)
+    release = threading.Event()
+    ts = snapshot.TerminalState(lambda: release.wait(5) and {"q": {"spx_now": 2.0}}, path, max_age=600)
+    state, age = ts.get()
+    assert state["q"]["spx_now"] == 5460.5 and age > 600
+    assert ts.refreshing()
+    release.set()
+    ts._thread.join(5)
+    state, age = ts.get()
+    assert state["q"]["spx_now"] == 2.0 and age < 600
+    assert snapshot.read(path)["q"]["spx_now"] == 2.0
+
+
+def test_adopts_a_newer_snapshot_from_another_replica(path):
+    snapshot.write(_state(as_of=time.time() - 3_600), path)
+    ts = snapshot.TerminalState(lambda: pytest.fail("should not recompute"), path, max_age=600)
+    fresh = _state()
+    fresh["q"]["spx_now"] = 3.0
+    snapshot.write(fresh, path)
+    state, age = ts.get()
+    assert state["q"]["spx_now"] == 3.0 and age < 600
+
+
+def test_update_during_a_refresh_is_kept(path):
+    snapshot.write(_state(), path)
+    computing, release = threading.Event(), threading.Event()
+
+    def compute():
+        computing.set()
+        release.wait(5)
+        return {"q": {"spx_now": 4.0}}
+
+    ts = snapshot.TerminalState(compute, path)
+    worker = threading.Thread(target=ts.refresh)
+    worker.start()
+    computing.wait(5)
+    ts.update(headlines={"other": [{"title": "new"}]})
+    release.set()
+    worker.join(5)
+    state = snapshot.read(path)
+    assert state["q"]["spx_now"] == 4.0
+    assert state["headlines"] == {"feed": [{"title": "t"}], "other": [{"title": "new"}]}
+
+
+def test_concurrent_refreshes_compute_once(path):
+    snapshot.write(_state(), path)
+    calls, release = [], threading.Event()
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return {"q": {"spx_now": 5.0}}
+
+    ts = snapshot.TerminalState(compute, path)
+    threads = [threading.Thread(target=ts.refresh) for _ in range(4)]
+    for t in threads: t.start()
+    time.sleep(0.2)
+    release.set()
+    for t in threads: t.join(5)
+    assert len(calls) == 1
+    assert ts.get()[0]["q"]["spx_now"] == 5.0
+
+
+def test_failed_background_refresh_keeps_the_last_state_and_backs_off(path):
+    snapshot.write(_state(as_of=time.time() - 3_600), path)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        raise RuntimeError("upstream down")
+
+    ts = snapshot.TerminalState(compute, path, max_age=600)
+    ts.get()
+    ts._thread.join(5)
+    state, _ = ts.get()
+    assert state["q"]["spx_now"] == 5460.5 and ts.error == "upstream down"
+    assert not ts.refreshing() and len(calls) == 1  # RETRY_AFTER holds the next attempt back
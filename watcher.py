@@ -0,0 +1,172 @@
+"""Headless watcher that emits an event when a dashboard signal changes state.
+
+On a schedule it evaluates, for a configurable watchlist, the same rules the
+dashboard shows: the six pillars, the scorecard ratings, the sector heatmap's
+RSI bands and the rotation radar's synthesis buckets. Only transitions are
+emitted (e.g. "scorecard:Bonds" 🟢 BULLISH -> 🔴 BEARISH); a signal seen for
+the first time only sets its baseline.
+
+A tick costs one batched intraday request for the watchlist's last prices.
+SMAs, RSIs and z-scores move in O(1) from per-ticker running sums
+(engine.live_anchors), which are rebuilt once a day from the incremental
+OHLCV store together with the month's seasonal win rates. Anchors, base quotes
+and the last state of every signal persist in STATE_PATH, so a cron-driven
+`--once` run picks up where the previous one stopped.
+
+Events go to a sink: a JSON-lines file, stdout ("-") or a webhook URL that
+receives {"events": [...]} as a JSON POST. If delivery fails the new states
+are not saved, so the same transitions are sent again on the next tick.
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+import metrics
+import engine
+import ohlcv_store
+import snapshot
+from engine import SECTORS
+
+STATE_PATH = os.path.join(ohlcv_store.CACHE_DIR, "watcher_state.json")
+EVERY = 300  # seconds between ticks
+WATCHLIST = {"terminal": True, "sectors": list(SECTORS), "radar": list(SECTORS), "rsi_low": 30, "rsi_high": 70, "lookback": "10y"}
+# Tickers whose absence reads as 0.0 in the terminal quotes, which would flip pillars and ratings on no news
+RULE_TICKERS = set(engine.PRICE_FIELDS.values()) | {t for t, _ in engine.SMA_FIELDS.values()}
+
+
+def rsi_band(rsi, low=30, high=70):
+    # Same bands as the sector heatmap
+    return "🔴 OVERBOUGHT" if rsi > high else "🔵 OVERSOLD" if rsi < low else "⚪ NEUTRAL"
+
+
+def watch_tickers(watchlist):
+    tickers = list(engine.LIVE_TICKERS) if watchlist.get("terminal") else []
+    return list(dict.fromkeys(tickers + list(watchlist.get("sectors", [])) + list(watchlist.get("radar", []))))
+
+
+@metrics.timed(name="watcher.build")
+def build(watchlist, today=None):
+    """Daily base state: running-sum anchors, terminal quotes and seasonal win % by calendar month."""
+    tickers = watch_tickers(watchlist)
+    close = engine.load_close(tickers, period=engine.TERMINAL_PERIOD)  # the store only fetches bars it lacks
+    if close.empty: raise engine.DataUnavailable("No history for the watchlist")
+    radar = list(watchlist.get("radar", []))
+    seasons = {}
+    if radar:
+        index = engine.seasonality_index()
+        index.update(radar)  # no-op until a new month closes
+        for t in radar:
+            stats = index.lookup(t, watchlist.get("lookback", "10y"))
+            if stats is not None: seasons[t] = {str(m): float(w) for m, w in stats["win"].items()}
+    return {"built": (today or datetime.now().date()).isoformat(), "watchlist": watchlist, "anchors": engine.live_anchors(close, tickers),
+            "q": engine.terminal_quotes(close) if watchlist.get("terminal") else None, "seasons": seasons}
+
+
+def evaluate(base, prices, watchlist, now=None):
+    """{signal key: (state, detail)} from the base state and live {ticker: (price, timestamp)} quotes.
+
+    Tickers without a live quote are read at their last close, which reproduces the history-based value.
+    """
+    anchors, out = base["anchors"], {}
+
+    def quote(t):
+        return prices.get(t) or (anchors[t]["last"], anchors[t]["date"])
+
+    q = base.get("q")
+    if watchlist.get("terminal") and q is not None and not set(q["missing"]) & RULE_TICKERS:
+        q = engine.live_quotes(q, anchors, prices)
+        for pillar, state, detail in engine.six_pillars(q):
+            out[f"pillar:{pillar}"] = (state, detail)
+        for asset, rating in engine.scorecard(q).items():
+            out[f"scorecard:{asset}"] = (rating, "")
+
+    for t in watchlist.get("sectors", []):
+        if t not in anchors: continue
+        rsi = engine.live_rsi(anchors[t], *quote(t))
+        if rsi is not None:
+            out[f"rsi:{t}"] = (rsi_band(rsi, watchlist.get("rsi_low", 30), watchlist.get("rsi_high", 70)), f"RSI {rsi:.1f}")
+
+    curr_m, c_name, next_m, n_name = engine.month_names(now)
+    for t in watchlist.get("radar", []):
+        season = base["seasons"].get(t, {})
+        if t not in anchors or str(curr_m) not in season or str(next_m) not in season: continue
+        z = engine.live_zscore(anchors[t], *quote(t))
+        if z is None: continue
+        c_win, n_win = season[str(curr_m)], season[str(next_m)]
+        _, bucket, _ = engine.classify_rotation(z, c_win, n_win, t, n_name)
+        out[f"radar:{t}"] = (bucket, f"Z {z:+.2f} · {c_name} win {c_win:.0f}% · {n_name} win {n_win:.0f}%")
+    return out
+
+
+class FileSink:
+    def __init__(self, path):
+        self.path = path
+
+    def emit(self, events):
+        if os.path.dirname(self.path): os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a") as f:
+            for e in events: f.write(json.dumps(e, ensure_ascii=False) + "\n")
+
+
+class StdoutSink:
+    def emit(self, events):
+        for e in events: print(json.dumps(e, ensure_ascii=False), flush=True)
+
+
+class WebhookSink:
+    def __init__(self, url, timeout=10):
+        self.url, self.timeout = url, timeout
+
+    def emit(self, events):
+        import requests
+        requests.post(self.url, json={"events": events}, timeout=self.timeout).raise_for_status()
+
+
+def make_sink(target):
+    if target == "-": return StdoutSink()
+    if target.startswith(("http://", "https://")): return WebhookSink(target)
+    return FileSink(target)
+
+
+class Watcher:
+    def __init__(self, watchlist=None, sink=None, state_path=STATE_PATH):
+        self.watchlist = json.loads(json.dumps({**WATCHLIST, **(watchlist or {})}))  # as it will read back from the state file
+        self.sink = sink or StdoutSink()
+        self.state_path = state_path
+        self.state = snapshot.read(state_path) or {}
+        self.error = None  # last failed tick, if the most recent one failed
+        self._stop = threading.Event()
+
+    @metrics.timed(name="watcher.tick")
+    def tick(self, now=None):
+        """Evaluate every signal once; emit and return the transitions since the previous tick."""
+        now = now or datetime.now()
+        rewatched = self.state.get("watchlist") != self.watchlist
+        if rewatched or self.state.get("built") != now.date().isoformat():
+            self.state.update(build(self.watchlist, now.date()))
+        prices = ohlcv_store.last_prices(watch_tickers(self.watchlist))
+        current = evaluate(self.state, prices, self.watchlist, now)
+        previous = self.state.get("states", {})
+        if rewatched: previous = {key: state for key, state in previous.items() if key in current}
+        events = [{"time": now.isoformat(timespec="seconds"), "signal": key, "from": previous[key], "to": state, "detail": detail}
+                  for key, (state, detail) in current.items() if key in previous and previous[key] != state]
+        if events: self.sink.emit(events)
+        # Signals that could not be read this tick keep their last state rather than resetting the baseline
+        self.state["states"] = {**previous, **{key: state for key, (state, _) in current.items()}}
+        self.state["as_of"] = time.time()
+        snapshot.write(self.state, self.state_path)
+        return events
+
+    def run(self, every=EVERY):
+        while not self._stop.is_set():
+            try:
+                self.tick()
+                self.error = None
+            except Exception as e:  # the next tick retries; the same transitions are re-sent if delivery failed
+                metrics.swallowed("watcher.tick", e)
+                self.error = str(e)
+            self._stop.wait(every)
+
+    def stop(self):
+        self._stop.set()